@@ -0,0 +1,124 @@
+"""Reproducible full-pipeline runs over the sample data from a recorded LLM cassette
+
+Usage: python benchmarks/bench_cassette.py --record [--fake]
+       python benchmarks/bench_cassette.py [--runs 3] [--latency-scale 0] [--workers 4] [--lean]
+
+--record runs the sample CVs x JDs once against the configured OpenAI API
+(or benchmarks/fake_openai.py with --fake) and stores every call in the
+cassette. Without it, every run replays the cassette (LLM_CASSETTE_MODE=replay),
+so no network or API key is needed: the same prompts get the same answers and
+only the local work (PDF parsing, prompt building, JSON parsing, storage) is
+measured, plus latency-scale x the recorded LLM latency. Each run uses a fresh
+temporary output folder with caches disabled; the script checks that every run
+produced the same scores.
+"""
+import os
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+import tempfile
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def configure(args, workdir):
+    """Environment read by config.settings; must run before src is imported"""
+    os.environ.update({
+        "LLM_CASSETTE_MODE": "record" if args.record else "replay",
+        "LLM_CASSETTE_PATH": os.path.abspath(args.cassette),
+        "LLM_CASSETTE_LATENCY_SCALE": str(args.latency_scale),
+        "EXTRACTION_CACHE_ENABLED": "false",
+        "MATCH_CACHE_ENABLED": "false",
+        "CACHE_DIR": os.path.join(workdir, "cache"),
+        "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING")
+    })
+    if not args.record:
+        # Replay không gọi API nhưng client vẫn cần một key để khởi tạo
+        os.environ.setdefault("OPENAI_API_KEY", "replay")
+
+def run_once(args, workdir):
+    from src.llm.gateway import get_gateway
+    from src.pipeline.bulk_runner import BulkRunner
+    from src.storage.results_store import ResultsStore
+
+    gateway = get_gateway()
+    gateway.reset_stats()
+    os.makedirs(workdir)
+    runner = BulkRunner(
+        cv_folder=args.cv_dir,
+        jd_folder=args.jd_dir,
+        extracted_info_folder=os.path.join(workdir, "extracted_info"),
+        matching_results_folder=os.path.join(workdir, "matching_results"),
+        workers=args.workers,
+        manifest_path=os.path.join(workdir, "bulk_manifest.jsonl"),
+        lean=args.lean,
+        store=ResultsStore(os.path.join(workdir, "results.sqlite"))
+    )
+    try:
+        report = runner.run()
+    finally:
+        runner.close()
+    scores = sorted((r["cv_name"], r["jd_name"], r["score"]) for r in report["results"])
+    return {
+        "elapsed_seconds": report["elapsed_seconds"],
+        "pairs": report["match"].get("done", 0),
+        "failed": report["match"].get("failed", 0) + report["cv"].get("failed", 0),
+        "llm_calls": sum(stats["calls"] for stats in gateway.stats()["purposes"].values()),
+        "fingerprint": hashlib.sha256(json.dumps(scores).encode()).hexdigest()[:12]
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cassette", default=os.path.join(ROOT, "data", "cassettes", "samples.sqlite"))
+    parser.add_argument("--cv-dir", default=os.path.join(ROOT, "data", "input", "CV"))
+    parser.add_argument("--jd-dir", default=os.path.join(ROOT, "data", "input", "JD"))
+    parser.add_argument("--record", action="store_true", help="Call the API once and record the cassette")
+    parser.add_argument("--fake", action="store_true", help="Record against benchmarks/fake_openai.py instead of the API")
+    parser.add_argument("--runs", type=int, default=3, help="Replay runs")
+    parser.add_argument("--latency-scale", type=float, default=0.0, help="Replay this fraction of the recorded LLM latency")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--lean", action="store_true", help="Use lean (scores-only) matching")
+    args = parser.parse_args()
+
+    if not args.record and not os.path.exists(args.cassette):
+        print(f"❌ No cassette at {args.cassette}, record one first with --record")
+        return 1
+
+    workdir = tempfile.mkdtemp(prefix="cvjd-cassette-")
+    configure(args, workdir)
+    fake = None
+    if args.fake:
+        from benchmarks.fake_openai import serve
+        fake = serve(latency=0.05, tokens_per_second=4000.0)
+        os.environ.update({"OPENAI_BASE_URL": fake.base_url, "OPENAI_API_KEY": "fake-key"})
+
+    from src.utils.log import configure_logging
+    from src.llm.gateway import get_gateway
+    configure_logging()
+    try:
+        runs = [run_once(args, os.path.join(workdir, f"run_{index}")) for index in range(1 if args.record else args.runs)]
+        cassette = get_gateway().cassette.stats()
+    finally:
+        if fake is not None:
+            fake.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{'run':>4} {'seconds':>9} {'pairs':>6} {'failed':>7} {'LLM calls':>10}  scores")
+    for index, run in enumerate(runs, 1):
+        print(f"{index:>4} {run['elapsed_seconds']:>9.3f} {run['pairs']:>6} {run['failed']:>7} {run['llm_calls']:>10}  {run['fingerprint']}")
+    if len(runs) > 1:
+        print(f"median {statistics.median(run['elapsed_seconds'] for run in runs):.3f}s")
+    print(f"Cassette {cassette['path']}: {cassette['hits']} hits, {cassette['misses']} misses, {cassette['recorded']} recorded")
+    for purpose, stored in sorted(cassette["interactions"].items()):
+        print(f"  {purpose:<16} {stored['count']:>5} calls {stored['bytes'] / 1024:>8.1f} KB")
+
+    if len({run["fingerprint"] for run in runs}) > 1 or any(run["failed"] or not run["pairs"] for run in runs):
+        print("❌ Runs are not reproducible (different scores or failed pairs)")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""Leaderboard queries on a large results store: top-K per JD and per CV, with feature filters
+
+Usage: python benchmarks/bench_leaderboard.py [--cvs 20000] [--jds 50] [--k 20]
+
+Fills a temporary SQLite results store with cvs x jds synthetic results
+(random feature scores, no LLM calls) and times the top-K queries served
+by the /jds/{jd}/top and /cvs/{cv}/top-jobs endpoints.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.matching.weights import FEATURES, FEATURE_WEIGHTS, compute_final_score
+from src.storage.results_store import ResultsStore
+
+def fill(store, cvs, jds, seed=0):
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    for cv_index in range(cvs):
+        for jd_index in range(jds):
+            scores = {feature: {"score": rng.randint(0, 100)} for feature in FEATURES}
+            store.save_result(f"cv{cv_index}", f"jd{jd_index}", {
+                "scores": scores,
+                "final_matching_score": compute_final_score(scores, FEATURE_WEIGHTS),
+                "weight_profile": "default"
+            })
+    store.flush()
+    return time.perf_counter() - started
+
+def timed(query, repeat):
+    latencies = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        query(i)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+def print_row(label, latencies):
+    ordered = sorted(latencies)
+    print(f"{label:<34} p50 {statistics.median(ordered) * 1000:8.2f}ms  "
+          f"p95 {ordered[int(0.95 * (len(ordered) - 1))] * 1000:8.2f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cvs", type=int, default=20000)
+    parser.add_argument("--jds", type=int, default=50)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        store = ResultsStore(os.path.join(folder, "results.sqlite"), write_batch=5000)
+        elapsed = fill(store, args.cvs, args.jds)
+        pairs = args.cvs * args.jds
+        print(f"{pairs} results stored in {elapsed:.1f}s ({pairs / elapsed:.0f}/s)")
+
+        print_row(f"top {args.k} CVs of a JD", timed(lambda i: store.top_for_jd(f"jd{i % args.jds}", args.k), args.repeat))
+        print_row(f"top {args.k} JDs of a CV", timed(lambda i: store.top_for_cv(f"cv{i % args.cvs}", args.k), args.repeat))
+        print_row(f"top {args.k} CVs, exp_years >= 70", timed(
+            lambda i: store.top_for_jd(f"jd{i % args.jds}", args.k, {"exp_years": 70}), args.repeat
+        ))
+        print_row(f"top {args.k} CVs, 3 features >= 90", timed(
+            lambda i: store.top_for_jd(f"jd{i % args.jds}", args.k, {"exp_years": 90, "education": 90, "certs": 90}),
+            args.repeat
+        ))
+
+if __name__ == "__main__":
+    main()
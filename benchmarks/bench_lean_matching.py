@@ -0,0 +1,90 @@
+"""Full vs lean (scores-only) matching: output tokens and latency per pair
+
+Usage: python benchmarks/bench_lean_matching.py [--justify-top 1]
+
+Scores every extracted CV in data/output/extracted_info against every JD in
+data/input/JD twice, once with the full prompt and once in lean mode, with
+the result cache disabled. Token counts come from the LLM gateway stats, so
+OPENAI_API_KEY (and optionally OPENAI_BASE_URL) must point at a real or fake
+OpenAI-compatible server.
+"""
+import os
+import sys
+import glob
+import time
+import argparse
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.llm.gateway import get_gateway
+from src.matching.matching_engine import MatchingCV
+from src.storage import FileResultsStore
+
+def load_pairs(extracted_dir, jd_dir):
+    cv_infos = FileResultsStore(extracted_dir, extracted_dir).extractions()
+    jd_texts = {}
+    for path in sorted(glob.glob(os.path.join(jd_dir, "*.txt"))):
+        with open(path, encoding="utf-8") as f:
+            jd_texts[os.path.splitext(os.path.basename(path))[0]] = f.read()
+    return [(cv_info, jd_text) for cv_info in cv_infos.values() if cv_info for jd_text in jd_texts.values()]
+
+def run(matching_cv, pairs, lean):
+    """Score every pair, returning per-pair latencies and the gateway stats of the run"""
+    gateway = get_gateway()
+    gateway.reset_stats()
+    latencies = []
+    results = []
+    for cv_info, jd_text in pairs:
+        started = time.perf_counter()
+        results.append(matching_cv.calculate_matching_score(cv_info, jd_text, lean=lean))
+        latencies.append(time.perf_counter() - started)
+    purpose = "matching_lean" if lean else "matching"
+    return latencies, gateway.stats()["purposes"].get(purpose, {}), results
+
+def print_row(label, latencies, stats, pairs):
+    completion = stats.get("completion_tokens", 0)
+    prompt = stats.get("prompt_tokens", 0)
+    print(f"{label:<8} p50 {statistics.median(latencies):7.3f}s  max {max(latencies):7.3f}s  "
+          f"prompt tok/pair {prompt / pairs:8.1f}  output tok/pair {completion / pairs:8.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--extracted-dir", default=os.path.join(ROOT, "data/output/extracted_info"))
+    parser.add_argument("--jd-dir", default=os.path.join(ROOT, "data/input/JD"))
+    parser.add_argument("--justify-top", type=int, default=0, metavar="K",
+                        help="Also justify the K best lean results and report the cost")
+    args = parser.parse_args()
+
+    pairs = load_pairs(args.extracted_dir, args.jd_dir)
+    if not pairs:
+        print("No CV/JD pairs found")
+        return
+    matching_cv = MatchingCV(use_cache=False)
+
+    full_latencies, full_stats, _ = run(matching_cv, pairs, lean=False)
+    lean_latencies, lean_stats, lean_results = run(matching_cv, pairs, lean=True)
+
+    print(f"{len(pairs)} pairs, model {matching_cv.model}")
+    print_row("full", full_latencies, full_stats, len(pairs))
+    print_row("lean", lean_latencies, lean_stats, len(pairs))
+    if full_stats.get("completion_tokens"):
+        saved = 1 - lean_stats.get("completion_tokens", 0) / full_stats["completion_tokens"]
+        print(f"output tokens saved by lean mode: {saved:.0%}")
+
+    if args.justify_top:
+        gateway = get_gateway()
+        gateway.reset_stats()
+        ranked = sorted(
+            zip(pairs, lean_results), key=lambda item: -((item[1] or {}).get("final_matching_score") or 0)
+        )[:args.justify_top]
+        for (cv_info, jd_text), result in ranked:
+            if result:
+                matching_cv.justify(cv_info, jd_text, result)
+        stats = gateway.stats()["purposes"].get("justification", {})
+        print(f"justify top {len(ranked)}: output tokens {stats.get('completion_tokens', 0)}, "
+              f"{stats.get('latency_seconds', 0.0):.3f}s")
+
+if __name__ == "__main__":
+    main()
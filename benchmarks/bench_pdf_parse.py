@@ -0,0 +1,76 @@
+"""Per-upload PDF parsing latency: tempfile + PyPDFLoader vs in-memory pypdf
+
+Usage: python benchmarks/bench_pdf_parse.py [--cv-dir data/input/CV] [--rounds 20]
+
+The legacy path is only measured when langchain-community is installed.
+"""
+import os
+import sys
+import glob
+import time
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.pdf import extract_pdf_text
+
+def legacy_parse(pdf_bytes):
+    """What /extract-cv did before: write a tempfile, load it with PyPDFLoader, concatenate pages"""
+    from langchain_community.document_loaders import PyPDFLoader
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
+        temp_file.write(pdf_bytes)
+        temp_file_path = temp_file.name
+    try:
+        text = ""
+        for page in PyPDFLoader(temp_file_path).load():
+            text += page.page_content + "\n"
+        return text
+    finally:
+        os.unlink(temp_file_path)
+
+def measure(func, uploads, rounds):
+    timings = []
+    for _ in range(rounds):
+        for pdf_bytes in uploads:
+            started = time.perf_counter()
+            func(pdf_bytes)
+            timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "mean": statistics.mean(timings),
+        "p50": timings[len(timings) // 2],
+        "p95": timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cv-dir", default="data/input/CV")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    uploads = []
+    for path in sorted(glob.glob(os.path.join(args.cv_dir, "*.pdf"))):
+        with open(path, 'rb') as f:
+            uploads.append(f.read())
+    if not uploads:
+        print(f"No PDF files found in {args.cv_dir}")
+        return
+
+    candidates = [("in-memory pypdf", extract_pdf_text)]
+    try:
+        import langchain_community  # noqa: F401
+        candidates.insert(0, ("tempfile + PyPDFLoader", legacy_parse))
+    except ImportError:
+        print("langchain-community not installed, skipping the legacy path")
+
+    print(f"{len(uploads)} PDFs x {args.rounds} rounds (ms per upload)")
+    print(f"{'path':<26} {'mean':>8} {'p50':>8} {'p95':>8}")
+    for name, func in candidates:
+        func(uploads[0])  # warm-up
+        result = measure(func, uploads, args.rounds)
+        print(f"{name:<26} {result['mean']:>8.2f} {result['p50']:>8.2f} {result['p95']:>8.2f}")
+
+if __name__ == "__main__":
+    main()
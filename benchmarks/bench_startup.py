@@ -0,0 +1,79 @@
+"""API startup cost: import time, time-to-first-request and per-worker RSS
+
+Usage: python benchmarks/bench_startup.py [--runs 5] [--port 8765]
+
+Each run starts a fresh uvicorn process, polls /health until it answers, then
+reads the worker's resident memory from /proc (Linux only).
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def import_time():
+    """Seconds needed to import the API module in a fresh interpreter"""
+    code = "import time; t = time.perf_counter(); import src.api.routes; print(time.perf_counter() - t)"
+    output = subprocess.check_output([sys.executable, "-c", code], cwd=ROOT)
+    return float(output.decode().strip().splitlines()[-1])
+
+def rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def first_request(port, path, timeout=30):
+    """Start uvicorn and return (seconds until path answers, RSS in MB after that request)"""
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.api.routes:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1) as response:
+                    response.read()
+                elapsed = time.perf_counter() - started
+                # Đợi warm-up ở background chạy xong rồi mới đo RSS
+                time.sleep(1)
+                return elapsed, rss_mb(process.pid)
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError(f"Server did not answer {path} within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+def summarize(values):
+    values = [value for value in values if value is not None]
+    if not values:
+        return "n/a"
+    return f"median {statistics.median(values):.3f}  min {min(values):.3f}  max {max(values):.3f}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--path", default="/health")
+    args = parser.parse_args()
+
+    imports = [import_time() for _ in range(args.runs)]
+    startups = [first_request(args.port, args.path) for _ in range(args.runs)]
+
+    print(f"{args.runs} runs")
+    print(f"import src.api.routes (s):   {summarize(imports)}")
+    print(f"time to first {args.path} (s): {summarize([elapsed for elapsed, _ in startups])}")
+    print(f"worker RSS (MB):              {summarize([rss for _, rss in startups])}")
+
+if __name__ == "__main__":
+    main()
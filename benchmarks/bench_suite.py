@@ -0,0 +1,348 @@
+"""Offline load test of the API and the batch pipeline against a fake OpenAI server
+
+Usage: python benchmarks/bench_suite.py [--concurrency 1 4 16] [--workers 1 4 8]
+                                        [--save-baseline benchmarks/baselines/default.json]
+                                        [--check benchmarks/baselines/default.json]
+
+Starts benchmarks/fake_openai.py (configurable latency, token rate and 429
+injection) and a real uvicorn process serving src.api.routes:app pointed at
+it, then fires POST /match-cv-jd at each concurrency level. The batch
+pipeline (BulkRunner) runs in a fresh process per worker count over the
+sample CVs and copies of the sample JDs. Caches are disabled and every run
+writes to a temporary folder, so nothing touches data/ or the network.
+
+Reports throughput, p50/p95/p99 latency and peak RSS. --save-baseline stores
+the numbers, --check compares against a saved baseline and exits 1 when
+throughput drops, p95 latency or memory grows by more than --tolerance.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import resource
+import tempfile
+import subprocess
+import statistics
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_openai import serve, add_arguments, settings_from
+
+CV_DIR = os.path.join(ROOT, "data", "input", "CV")
+JD_DIR = os.path.join(ROOT, "data", "input", "JD")
+
+# Chỉ số nào tệ hơn thì là regression: throughput giảm, latency/bộ nhớ tăng
+HIGHER_IS_BETTER = {"throughput": True, "p95_seconds": False, "peak_rss_mb": False}
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+def latency_stats(latencies):
+    return {
+        "p50_seconds": percentile(latencies, 0.50),
+        "p95_seconds": percentile(latencies, 0.95),
+        "p99_seconds": percentile(latencies, 0.99),
+        "mean_seconds": statistics.fmean(latencies) if latencies else None
+    }
+
+def proc_mb(pid, field):
+    """VmRSS (current) or VmHWM (peak) of a process in MB, Linux only"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def app_env(base_url, workdir):
+    """Environment of the processes under test: fake LLM, temp storage, no caches"""
+    env = dict(os.environ)
+    env.update({
+        "OPENAI_API_KEY": "fake-key",
+        "OPENAI_BASE_URL": base_url,
+        "CACHE_DIR": os.path.join(workdir, "cache"),
+        "EXTRACTION_CACHE_ENABLED": "false",
+        "MATCH_CACHE_ENABLED": "false",
+        "RESULTS_DB_PATH": os.path.join(workdir, "results.sqlite"),
+        "JOB_DB_PATH": os.path.join(workdir, "jobs.sqlite"),
+        "PROFILE_DIR": os.path.join(workdir, "profiles"),
+        "API_WARMUP": "false",
+        "LOG_LEVEL": "WARNING",
+        "PYTHONPATH": ROOT
+    })
+    return env
+
+# ---------------------------------------------------------------- API load test
+
+def start_api(port, env, timeout=60):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.api.routes:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env
+    )
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if process.poll() is not None:
+            raise RuntimeError("API server exited during startup")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            time.sleep(0.05)
+    process.terminate()
+    raise RuntimeError(f"API server did not answer /health within {timeout}s")
+
+def load_samples():
+    cvs = []
+    for name in sorted(os.listdir(CV_DIR)):
+        if name.lower().endswith(".pdf"):
+            with open(os.path.join(CV_DIR, name), "rb") as f:
+                cvs.append((name, f.read()))
+    jds = []
+    for name in sorted(os.listdir(JD_DIR)):
+        if name.endswith(".txt"):
+            with open(os.path.join(JD_DIR, name), encoding="utf-8") as f:
+                jds.append((name, f.read()))
+    return cvs, jds
+
+async def _fire(port, concurrency, requests, cvs, jds, lean, seed):
+    """Send requests POST /match-cv-jd with at most concurrency in flight"""
+    rng = random.Random(seed)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, statuses = [], {}
+
+    async def one(index, client):
+        cv_name, cv_bytes = cvs[index % len(cvs)]
+        jd_name, jd_text = jds[rng.randrange(len(jds))]
+        # Hậu tố riêng để mỗi request là một cặp mới, không trùng in-flight
+        jd_text = f"{jd_text}\n\nRequisition: load-{seed}-{index}"
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.post(
+                    f"http://127.0.0.1:{port}/match-cv-jd",
+                    params={"lean": "true"} if lean else None,
+                    files={"cv_file": (cv_name, cv_bytes, "application/pdf"), "jd_file": (jd_name, jd_text.encode(), "text/plain")}
+                )
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - started
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+        if status == 200:
+            latencies.append(elapsed)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=300, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(one(index, client) for index in range(requests)))
+        elapsed = time.perf_counter() - started
+    return latencies, statuses, elapsed
+
+def run_api(args, env):
+    cvs, jds = load_samples()
+    process = start_api(args.port, env)
+    levels = {}
+    try:
+        for concurrency in args.concurrency:
+            requests = max(args.requests, concurrency * 2)
+            latencies, statuses, elapsed = asyncio.run(_fire(args.port, concurrency, requests, cvs, jds, args.lean, concurrency))
+            levels[str(concurrency)] = {
+                "requests": requests,
+                "statuses": statuses,
+                "elapsed_seconds": elapsed,
+                "throughput": len(latencies) / elapsed if elapsed else 0.0,
+                **latency_stats(latencies),
+                "rss_mb": proc_mb(process.pid, "VmRSS"),
+                # VmHWM là đỉnh từ lúc process khởi động, tăng dần qua các mức
+                "peak_rss_mb": proc_mb(process.pid, "VmHWM")
+            }
+    finally:
+        process.terminate()
+        process.wait()
+    return levels
+
+# ---------------------------------------------------------------- batch pipeline
+
+def _batch_child(options):
+    """Run one BulkRunner pass in this (fresh) process and print its numbers as JSON"""
+    from src.utils.log import configure_logging
+    from src.pipeline.bulk_runner import BulkRunner
+
+    configure_logging()
+    workdir = options["workdir"]
+    runner = BulkRunner(
+        cv_folder=CV_DIR,
+        jd_folder=options["jd_dir"],
+        extracted_info_folder=os.path.join(workdir, "extracted_info"),
+        matching_results_folder=os.path.join(workdir, "matching_results"),
+        workers=options["workers"],
+        manifest_path=os.path.join(workdir, "bulk_manifest.jsonl"),
+        lean=options["lean"]
+    )
+    latencies = []
+    match_job = runner.match_job
+
+    def timed_match_job(job):
+        started = time.perf_counter()
+        try:
+            return match_job(job)
+        finally:
+            latencies.append(time.perf_counter() - started)
+
+    runner.match_job = timed_match_job
+    try:
+        report = runner.run()
+    finally:
+        runner.close()
+    pipeline_seconds = report["stage_seconds"].get("pipeline", 0.0)
+    print(json.dumps({
+        "pairs": report["match"].get("done", 0),
+        "failed": report["match"].get("failed", 0),
+        "elapsed_seconds": report["elapsed_seconds"],
+        "throughput": report["pairs_per_second"],
+        "pipeline_seconds": pipeline_seconds,
+        **latency_stats(latencies),
+        # ru_maxrss tính bằng KB trên Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }))
+
+def make_jd_copies(jd_dir, copies):
+    """Copies of every sample JD with a distinct footer, so each is a new pair"""
+    os.makedirs(jd_dir, exist_ok=True)
+    for name in sorted(os.listdir(JD_DIR)):
+        if not name.endswith(".txt"):
+            continue
+        with open(os.path.join(JD_DIR, name), encoding="utf-8") as f:
+            text = f.read()
+        stem = os.path.splitext(name)[0]
+        for copy in range(copies):
+            with open(os.path.join(jd_dir, f"{stem}_{copy}.txt"), "w", encoding="utf-8") as f:
+                f.write(f"{text}\n\nRequisition: batch-{copy}")
+
+def run_batch(args, env, workdir):
+    jd_dir = os.path.join(workdir, "jd")
+    make_jd_copies(jd_dir, args.jd_copies)
+    levels = {}
+    for workers in args.workers:
+        run_dir = os.path.join(workdir, f"batch_{workers}")
+        os.makedirs(run_dir)
+        options = {"workdir": run_dir, "jd_dir": jd_dir, "workers": workers, "lean": args.lean}
+        child_env = dict(env, RESULTS_DB_PATH=os.path.join(run_dir, "results.sqlite"), CACHE_DIR=os.path.join(run_dir, "cache"))
+        output = subprocess.check_output(
+            [sys.executable, os.path.abspath(__file__), "--batch-child", json.dumps(options)],
+            cwd=ROOT, env=child_env
+        )
+        levels[str(workers)] = json.loads(output.decode().strip().splitlines()[-1])
+    return levels
+
+# ---------------------------------------------------------------- report / baseline
+
+def _fmt(value, pattern):
+    return "n/a" if value is None else pattern.format(value)
+
+def print_section(title, label, levels, unit):
+    print(f"\n{title}")
+    print(f"{label:>8} {unit:>12} {'p50 (s)':>9} {'p95 (s)':>9} {'p99 (s)':>9} {'peak RSS MB':>12}  notes")
+    for level, row in levels.items():
+        notes = row.get("statuses") or {"failed": row.get("failed", 0)}
+        print(f"{level:>8} {_fmt(row['throughput'], '{:.2f}'):>12} {_fmt(row['p50_seconds'], '{:.3f}'):>9} "
+              f"{_fmt(row['p95_seconds'], '{:.3f}'):>9} {_fmt(row['p99_seconds'], '{:.3f}'):>9} "
+              f"{_fmt(row['peak_rss_mb'], '{:.1f}'):>12}  {notes}")
+
+def compare(results, baseline, tolerance):
+    """Regressions of results against baseline, as readable lines"""
+    problems = []
+    if results["settings"] != baseline.get("settings"):
+        problems.append(f"settings differ from the baseline: {baseline.get('settings')} (rerun with the same options)")
+        return problems
+    for section in ("api", "batch"):
+        for level, row in baseline.get(section, {}).items():
+            current = results.get(section, {}).get(level)
+            if current is None:
+                continue
+            for metric, higher_is_better in HIGHER_IS_BETTER.items():
+                before, after = row.get(metric), current.get(metric)
+                if not before or after is None:
+                    continue
+                change = (after - before) / before
+                if (change < -tolerance) if higher_is_better else (change > tolerance):
+                    problems.append(f"{section}[{level}] {metric}: {before:.3f} -> {after:.3f} ({change:+.0%})")
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16], help="API concurrency levels")
+    parser.add_argument("--requests", type=int, default=32, help="API requests per level (at least 2x the concurrency)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8], help="Batch worker counts")
+    parser.add_argument("--jd-copies", type=int, default=4, help="Copies of each sample JD in the batch run")
+    parser.add_argument("--lean", action="store_true", help="Use lean (scores-only) matching")
+    parser.add_argument("--skip-api", action="store_true")
+    parser.add_argument("--skip-batch", action="store_true")
+    parser.add_argument("--port", type=int, default=8766, help="Port of the API under test")
+    parser.add_argument("--save-baseline", metavar="PATH", help="Write the results as a baseline JSON")
+    parser.add_argument("--check", metavar="PATH", help="Compare with a baseline JSON, exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression (0.25 = 25%%)")
+    parser.add_argument("--batch-child", help=argparse.SUPPRESS)
+    add_arguments(parser)
+    parser.set_defaults(latency=0.05, jitter=0.01, tokens_per_second=4000.0)
+    args = parser.parse_args()
+
+    if args.batch_child:
+        return _batch_child(json.loads(args.batch_child))
+
+    settings = {
+        "fake_openai": settings_from(args),
+        "requests": args.requests,
+        "jd_copies": args.jd_copies,
+        "lean": args.lean
+    }
+    fake = serve(**settings["fake_openai"])
+    workdir = tempfile.mkdtemp(prefix="cvjd-bench-")
+    env = app_env(fake.base_url, workdir)
+    results = {"settings": settings, "created_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    try:
+        if not args.skip_api:
+            results["api"] = run_api(args, env)
+            print_section("API POST /match-cv-jd", "conc.", results["api"], "req/s")
+        if not args.skip_batch:
+            results["batch"] = run_batch(args, env, workdir)
+            print_section("Batch pipeline (BulkRunner)", "workers", results["batch"], "pairs/s")
+        with fake.fake.lock:
+            results["fake_openai_counts"] = dict(fake.fake.counts)
+        print(f"\nFake OpenAI: {results['fake_openai_counts']}")
+    finally:
+        fake.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+    if args.check:
+        with open(args.check, encoding="utf-8") as f:
+            baseline = json.load(f)
+        problems = compare(results, baseline, args.tolerance)
+        if problems:
+            print(f"\n❌ Regressions vs {args.check} (tolerance {args.tolerance:.0%}):")
+            for problem in problems:
+                print(f"  - {problem}")
+            return 1
+        print(f"\n✅ No regression vs {args.check} (tolerance {args.tolerance:.0%})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+"""Offline OpenAI-compatible chat completions stub for benchmarks and local runs
+
+Usage: python benchmarks/fake_openai.py [--port 8799] [--latency 0.2] [--tokens-per-second 80] [--rate-limit 0.05]
+
+Answers POST /v1/chat/completions with deterministic, well-formed responses for
+every prompt of this project (CV extraction, full / lean / packed matching and
+justifications), streamed or not. Response time is latency (+/- jitter) plus
+completion tokens / tokens-per-second; a rate-limit fraction of requests is
+answered with 429 and a Retry-After header. GET /stats returns request counts.
+Point the app at it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1.
+"""
+import re
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+FEATURES = (
+    "exp_years", "prof_skill_advanced", "soft_skill", "education", "prof_skill_basic",
+    "achievements", "relevant_projects", "certs", "language", "activities"
+)
+EXTRACTION_KEYS = (
+    "exp", "language", "education", "prof_skill_advanced", "prof_skill_basic",
+    "soft_skill", "certs", "achievements", "relevant_projects", "activities"
+)
+
+def _scores(text):
+    """Stable 30-95 scores derived from the text being scored"""
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return {feature: 30 + digest[index] % 66 for index, feature in enumerate(FEATURES)}
+
+def _justification(feature, score):
+    return f"The candidate shows a {score}/100 fit on {feature.replace('_', ' ')} based on the CV and the JD requirements."
+
+def _full_scores(text):
+    return {feature: {"score": score, "justification": _justification(feature, score)} for feature, score in _scores(text).items()}
+
+def fake_content(messages):
+    """Response text for a chat request, chosen from the prompt it carries"""
+    prompt = messages[-1]["content"] if messages else ""
+    if "#### JD_" in prompt:
+        lean = "no explanations" in prompt
+        blocks = re.split(r"#### (JD_\d+)", prompt)
+        results = {}
+        for jd_id, block in zip(blocks[1::2], blocks[2::2]):
+            results[jd_id] = {"scores": _scores(block) if lean else _full_scores(block)}
+        return json.dumps({"results": results}, separators=(",", ":") if lean else None)
+    if "Justify each given score" in prompt:
+        return json.dumps({"justifications": {
+            feature: _justification(feature, score) for feature, score in _scores(prompt).items()
+        }})
+    if "no explanations" in prompt:
+        return json.dumps({"scores": _scores(prompt)}, separators=(",", ":"))
+    if "---BEGIN RESUME DATA---" in prompt:
+        resume = prompt.split("---BEGIN RESUME DATA---", 1)[1].split("---END RESUME DATA---", 1)[0]
+        words = re.findall(r"[A-Za-z][A-Za-z+#.]{2,}", resume)
+        return json.dumps({key: " ".join(words[index * 12:(index + 1) * 12]) or 0 for index, key in enumerate(EXTRACTION_KEYS)})
+    return json.dumps({"scores": _full_scores(prompt)})
+
+def _tokens(text):
+    return max(1, len(text) // 4)
+
+class FakeOpenAI:
+    """Latency, token rate and 429 injection settings plus request counters"""
+
+    def __init__(self, latency=0.2, jitter=0.0, tokens_per_second=0.0, rate_limit=0.0, retry_after=1.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.tokens_per_second = tokens_per_second
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = {"requests": 0, "rate_limited": 0, "streamed": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    def _count(self, **values):
+        with self.lock:
+            for key, value in values.items():
+                self.counts[key] += value
+
+    def decide(self):
+        """(rate limited?, base delay) for the next request"""
+        with self.lock:
+            limited = self.rate_limit > 0 and self.random.random() < self.rate_limit
+            delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+        return limited, delay
+
+    def generation_time(self, completion_tokens):
+        return completion_tokens / self.tokens_per_second if self.tokens_per_second else 0.0
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "FakeOpenAI/1.0"
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status, data, headers=None):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/stats"):
+            with self.server.fake.lock:
+                return self._send_json(200, dict(self.server.fake.counts))
+        if self.path.rstrip("/").endswith("/models"):
+            return self._send_json(200, {"object": "list", "data": [{"id": "fake-model", "object": "model"}]})
+        self._send_json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self):
+        fake = self.server.fake
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            return self._send_json(404, {"error": {"message": "Not found"}})
+
+        limited, delay = fake.decide()
+        if limited:
+            fake._count(requests=1, rate_limited=1)
+            return self._send_json(
+                429, {"error": {"message": "Rate limit reached (fake)", "type": "rate_limit_error", "code": "rate_limit_exceeded"}},
+                {"Retry-After": f"{fake.retry_after:g}"}
+            )
+
+        content = fake_content(request.get("messages", []))
+        prompt_tokens = _tokens(json.dumps(request.get("messages", [])))
+        completion_tokens = _tokens(content)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+        fake._count(requests=1, streamed=int(bool(request.get("stream"))), prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        time.sleep(delay)
+
+        model = request.get("model", "fake-model")
+        if request.get("stream"):
+            return self._stream(model, content, usage, fake.generation_time(completion_tokens))
+        time.sleep(fake.generation_time(completion_tokens))
+        self._send_json(200, {
+            "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()), "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage
+        })
+
+    def _stream(self, model, content, usage, generation_time):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        pieces = [content[start:start + 16] for start in range(0, len(content), 16)]
+        pause = generation_time / len(pieces) if pieces else 0.0
+        base = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()), "model": model}
+        for piece in pieces:
+            chunk = {**base, "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            if pause:
+                time.sleep(pause)
+        final = {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        self.wfile.write(f"data: {json.dumps(final)}\n\n".encode("utf-8"))
+        self.wfile.write(f"data: {json.dumps({**base, 'choices': [], 'usage': usage})}\n\n".encode("utf-8"))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+def serve(port=0, host="127.0.0.1", **settings):
+    """Start the stub in a background thread, return the server (server.base_url, server.shutdown())"""
+    server = _Server((host, port), _Handler)
+    server.fake = FakeOpenAI(**settings)
+    server.base_url = f"http://{host}:{server.server_address[1]}/v1"
+    threading.Thread(target=server.serve_forever, name="fake-openai", daemon=True).start()
+    return server
+
+def add_arguments(parser):
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds before the first token")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random +/- seconds added to the latency")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Generation speed (0 = instant)")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds of the 429 responses")
+    parser.add_argument("--seed", type=int, default=0)
+
+def settings_from(args):
+    return {
+        "latency": args.latency, "jitter": args.jitter, "tokens_per_second": args.tokens_per_second,
+        "rate_limit": args.rate_limit, "retry_after": args.retry_after, "seed": args.seed
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8799)
+    add_arguments(parser)
+    args = parser.parse_args()
+    server = serve(args.port, args.host, **settings_from(args))
+    print(f"Fake OpenAI listening on {server.base_url}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,132 @@
 import os
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+def _int_env(name, default):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+def _float_env(name, default):
+    value = os.getenv(name)
+    return float(value) if value else default
 
 class Config:
     """Configuration settings for the CV-JD Matching Score application."""
-    
+
     # Load environment variables
     API_KEY = os.getenv("API_KEY")
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-    
+    OPENAI_MODEL = os.getenv("OPENAI_MODEL") or "gpt-4o-mini"
+
+    # LLM gateway: OpenAI-compatible endpoint, HTTP connection pool and timeouts (seconds)
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
+    OPENAI_TIMEOUT = _float_env("OPENAI_TIMEOUT", 60.0)
+    OPENAI_CONNECT_TIMEOUT = _float_env("OPENAI_CONNECT_TIMEOUT", 5.0)
+    OPENAI_MAX_CONNECTIONS = _int_env("OPENAI_MAX_CONNECTIONS", 100)
+    OPENAI_MAX_KEEPALIVE = _int_env("OPENAI_MAX_KEEPALIVE", 20)
+    OPENAI_KEEPALIVE_EXPIRY = _float_env("OPENAI_KEEPALIVE_EXPIRY", 30.0)
+    OPENAI_MAX_RETRIES = _int_env("OPENAI_MAX_RETRIES", 2)
+
+    # Client-side rate budget shared by all LLM calls of a process (0 = unlimited);
+    # bulk calls leave LLM_INTERACTIVE_RESERVE of each budget to API requests
+    LLM_RPM = _int_env("LLM_RPM", 0)
+    LLM_TPM = _int_env("LLM_TPM", 0)
+    LLM_INTERACTIVE_RESERVE = _float_env("LLM_INTERACTIVE_RESERVE", 0.2)
+    LLM_RATE_LIMIT_RETRIES = _int_env("LLM_RATE_LIMIT_RETRIES", 5)
+    LLM_BACKOFF_BASE = _float_env("LLM_BACKOFF_BASE", 1.0)
+    LLM_BACKOFF_MAX = _float_env("LLM_BACKOFF_MAX", 30.0)
+    # Keep the budget in CACHE_DIR/llm_budget.sqlite so every process using the same API key
+    # (API workers, test_match.py) shares it; false = one budget per process
+    LLM_BUDGET_SHARED = os.getenv("LLM_BUDGET_SHARED", "true").lower() == "true"
+
+    # Record/replay of LLM calls ("off", "record", "replay" or "auto" = replay hits, record misses);
+    # replayed calls take LLM_CASSETTE_LATENCY_SCALE x the recorded latency (0 = instant)
+    LLM_CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE", "off").lower()
+    LLM_CASSETTE_PATH = os.getenv("LLM_CASSETTE_PATH", os.path.join("data", "cassettes", "llm.sqlite"))
+    LLM_CASSETTE_LATENCY_SCALE = _float_env("LLM_CASSETTE_LATENCY_SCALE", 0.0)
+
     # File paths
     INPUT_CVS_PATH = os.path.join("data", "input", "cvs")
     INPUT_JD_PATH = os.path.join("data", "input", "job_descriptions")
     OUTPUT_EXTRACTED_INFO_PATH = os.path.join("data", "output", "extracted_info")
-    OUTPUT_MATCHING_RESULTS_PATH = os.path.join("data", "output", "matching_results")
\ No newline at end of file
+    OUTPUT_MATCHING_RESULTS_PATH = os.path.join("data", "output", "matching_results")
+
+    # Where extractions and match results are stored: "sqlite" (indexed database) or "files" (legacy layout)
+    RESULTS_BACKEND = os.getenv("RESULTS_BACKEND", "sqlite").lower()
+    RESULTS_DB_PATH = os.getenv("RESULTS_DB_PATH", os.path.join("data", "output", "results.sqlite"))
+    RESULTS_WRITE_BATCH = _int_env("RESULTS_WRITE_BATCH", 200)
+
+    # Leaderboards: API match results are recorded in the results store and ranked per JD / per CV
+    LEADERBOARD_RECORD_API = os.getenv("LEADERBOARD_RECORD_API", "true").lower() == "true"
+    LEADERBOARD_MAX_K = _int_env("LEADERBOARD_MAX_K", 500)
+
+    # Cache settings (max sizes/ages of 0 disable that limit)
+    CACHE_DIR = os.getenv("CACHE_DIR", os.path.join("data", "cache"))
+    EXTRACTION_CACHE_ENABLED = os.getenv("EXTRACTION_CACHE_ENABLED", "true").lower() == "true"
+    EXTRACTION_CACHE_MAX_ENTRIES = _int_env("EXTRACTION_CACHE_MAX_ENTRIES", 10000)
+    EXTRACTION_CACHE_MAX_BYTES = _int_env("EXTRACTION_CACHE_MAX_BYTES", 200 * 1024 * 1024)
+    EXTRACTION_CACHE_MAX_AGE = _int_env("EXTRACTION_CACHE_MAX_AGE", 30 * 24 * 3600)
+    MATCH_CACHE_ENABLED = os.getenv("MATCH_CACHE_ENABLED", "true").lower() == "true"
+    MATCH_CACHE_LRU_SIZE = _int_env("MATCH_CACHE_LRU_SIZE", 2048)
+    MATCH_CACHE_MAX_ENTRIES = _int_env("MATCH_CACHE_MAX_ENTRIES", 200000)
+    MATCH_CACHE_MAX_BYTES = _int_env("MATCH_CACHE_MAX_BYTES", 500 * 1024 * 1024)
+    MATCH_CACHE_MAX_AGE = _int_env("MATCH_CACHE_MAX_AGE", 30 * 24 * 3600)
+
+    # Create API components in the background at startup instead of on the first request
+    API_WARMUP = os.getenv("API_WARMUP", "true").lower() == "true"
+
+    # Logging: level and format ("text" = line + key=value fields, "json" = one JSON object per line)
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+
+    # Opt-in request profiling: "X-Profile: 1" header or a sampled fraction of requests ("cprofile" or "sampling")
+    PROFILE_ENABLED = os.getenv("PROFILE_ENABLED", "false").lower() == "true"
+    PROFILE_SAMPLE_RATE = _float_env("PROFILE_SAMPLE_RATE", 0.0)
+    PROFILE_MODE = os.getenv("PROFILE_MODE", "cprofile").lower()
+    PROFILE_INTERVAL = _float_env("PROFILE_INTERVAL", 0.005)
+    PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join("data", "profiles"))
+    PROFILE_KEEP = _int_env("PROFILE_KEEP", 50)
+    # Header X-Profile và /admin/profiles cần X-Admin-Token khớp giá trị này; không đặt thì /admin/profiles trả 404
+    PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN")
+
+    # Background jobs: SQLite job store, worker count, webhook delivery and retention of finished jobs (seconds)
+    JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join("data", "jobs", "jobs.sqlite"))
+    JOB_WORKERS = _int_env("JOB_WORKERS", 4)
+    JOB_WEBHOOK_TIMEOUT = _float_env("JOB_WEBHOOK_TIMEOUT", 10.0)
+    JOB_WEBHOOK_RETRIES = _int_env("JOB_WEBHOOK_RETRIES", 3)
+    # Comma-separated webhook hosts (".example.com" = any subdomain); empty = any host with public IPs only
+    JOB_WEBHOOK_ALLOWED_HOSTS = [
+        host.strip().lower() for host in os.getenv("JOB_WEBHOOK_ALLOWED_HOSTS", "").split(",") if host.strip()
+    ]
+    JOB_RETENTION = _int_env("JOB_RETENTION", 7 * 24 * 3600)
+    # Running jobs are leased for JOB_LEASE_SECONDS and renewed while they run;
+    # jobs of a dead process are requeued once their lease expires
+    JOB_LEASE_SECONDS = _float_env("JOB_LEASE_SECONDS", 60.0)
+
+    # PDF parsing (PDF_PARSE_WORKERS=0 parses in a thread, PDF_PAGES_PER_TASK=0 disables page splitting,
+    # max pages/chars of 0 disable that cap)
+    PDF_PARSE_WORKERS = _int_env("PDF_PARSE_WORKERS", 2)
+    PDF_PAGES_PER_TASK = _int_env("PDF_PAGES_PER_TASK", 0)
+    PDF_MAX_PAGES = _int_env("PDF_MAX_PAGES", 50)
+    PDF_MAX_CHARS = _int_env("PDF_MAX_CHARS", 100000)
+
+    # Lean (scores-only) matching
+    MATCH_LEAN_MAX_TOKENS = _int_env("MATCH_LEAN_MAX_TOKENS", 150)
+
+    # Packed matching: số JD chấm cùng một CV trong một LLM call (0/1 = tắt)
+    MATCH_PACK_SIZE = _int_env("MATCH_PACK_SIZE", 0)
+    MATCH_PACKED_TOKENS_PER_JD = _int_env("MATCH_PACKED_TOKENS_PER_JD", 1500)
+
+    # Batch matching
+    MATCH_BATCH_CONCURRENCY = _int_env("MATCH_BATCH_CONCURRENCY", 8)
+
+    # Local pre-scorer used when the LLM is unavailable
+    LOCAL_FALLBACK_ENABLED = os.getenv("LOCAL_FALLBACK_ENABLED", "false").lower() == "true"
+
+    # Shortlist index over extracted CVs
+    SHORTLIST_INDEX_PATH = os.getenv("SHORTLIST_INDEX_PATH", os.path.join("data", "output", "shortlist_index.pkl"))
+
+    # Weight profiles used to compute final_matching_score locally
+    WEIGHT_PROFILES_PATH = os.getenv("WEIGHT_PROFILES_PATH", os.path.join("config", "weight_profiles.json"))
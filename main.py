@@ -4,7 +4,6 @@ Main application entry point for CV-JD Matching API
 import uvicorn
 import os
 from dotenv import load_dotenv
-from src.api.routes import app
 
 # Load environment variables
 load_dotenv()
@@ -0,0 +1,55 @@
+import threading
+from src.extractors.cv_extractor import AsyncCVExtractor
+from src.extractors.jd_loader import JDLoader
+from src.matching.matching_engine import AsyncMatchingCV
+from src.llm.gateway import get_gateway
+from src.storage import get_results_store
+from config.settings import Config
+
+# Components được tạo khi request đầu tiên cần đến, dùng chung trong cả process
+_components = {}
+_components_lock = threading.RLock()
+
+def _component(name, factory):
+    component = _components.get(name)
+    if component is None:
+        with _components_lock:
+            component = _components.get(name)
+            if component is None:
+                component = _components[name] = factory()
+    return component
+
+def get_cv_extractor():
+    """Return the shared AsyncCVExtractor"""
+    return _component("cv_extractor", lambda: AsyncCVExtractor())
+
+def get_jd_loader():
+    """Return the shared JDLoader"""
+    return _component("jd_loader", JDLoader)
+
+def get_leaderboard():
+    """Return the results store backing the per-JD and per-CV leaderboards
+
+    API results are written straight away (one short transaction each), so
+    every worker sees them at once and a crash loses nothing; only bulk runs
+    buffer their writes.
+    """
+    return _component("leaderboard", lambda: get_results_store(write_batch=1))
+
+def get_matching_cv():
+    """Return the shared AsyncMatchingCV, recording API results in the leaderboards when enabled"""
+    return _component("matching_cv", lambda: AsyncMatchingCV(
+        leaderboard=get_leaderboard() if Config.LEADERBOARD_RECORD_API else None
+    ))
+
+def warm_up():
+    """Create every component and the async LLM client ahead of the first request"""
+    get_cv_extractor()
+    get_jd_loader()
+    get_matching_cv()
+    # openai là import nặng nhất, load luôn ở đây thay vì ở request đầu tiên
+    get_gateway().async_client
+
+def initialized_components():
+    """Names of the components created so far"""
+    return sorted(_components)
@@ -1,18 +1,56 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse, FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 import os
-import tempfile
+import hmac
+import time
+import uuid
+import random
+import asyncio
 import json
-from typing import Dict, Any
-from src.extractors.cv_extractor import CVExtractor
-from src.extractors.jd_loader import JDLoader
-from src.matching.matching_engine import MatchingCV
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Optional
+from config.settings import Config
+from src.api.dependencies import get_cv_extractor, get_matching_cv, get_leaderboard, warm_up
+from src.llm.gateway import get_gateway
+from src.utils.singleflight import singleflight_stats
+from src.matching.batch import match_batch
+from src.matching.weights import FEATURES, load_weight_profiles, resolve_weight_profile
+from src.utils.pdf import get_pdf_parser_pool
+from src.jobs.queue import get_job_queue, check_webhook_url
+from src.utils.log import configure_logging, set_request_id, reset_request_id, current_request_id
+from src.utils.profiling import get_request_profiler
+from src.utils.metrics import (
+    REGISTRY, HTTP_REQUEST_SECONDS, timed, start_request_timings, end_request_timings, request_timings
+)
+
+configure_logging()
+logger = logging.getLogger("src.api")
+
+@asynccontextmanager
+async def lifespan(app):
+    # Server nhận request ngay, components được khởi tạo ở background
+    warm_up_task = asyncio.create_task(asyncio.to_thread(warm_up)) if Config.API_WARMUP else None
+    # Worker pool xử lý job nền, job chưa xong từ lần chạy trước được chạy lại
+    job_queue = get_job_queue()
+    job_queue.register("match", _run_match_job)
+    await job_queue.start()
+    yield
+    await job_queue.stop()
+    if warm_up_task is not None:
+        await warm_up_task
+    # Ghi nốt các kết quả leaderboard còn trong buffer
+    if Config.LEADERBOARD_RECORD_API:
+        await asyncio.to_thread(get_leaderboard().flush)
+    # Dừng các worker process parse PDF khi server tắt
+    get_pdf_parser_pool().shutdown()
 
 app = FastAPI(
     title="CV-JD Matching API",
     description="API for matching CV with Job Descriptions",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -24,10 +62,109 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize components
-cv_extractor = CVExtractor()
-jd_loader = JDLoader()
-matching_cv = MatchingCV()
+def _admin_allowed(request):
+    # Không cấu hình token thì không ai dùng được /admin hay X-Profile
+    return bool(Config.PROFILE_ADMIN_TOKEN) and hmac.compare_digest(
+        request.headers.get("x-admin-token", ""), Config.PROFILE_ADMIN_TOKEN
+    )
+
+def _should_profile(request):
+    if not Config.PROFILE_ENABLED or request.url.path.startswith("/admin/"):
+        return False
+    if request.headers.get("x-profile", "").lower() in ("1", "true", "yes"):
+        return _admin_allowed(request)
+    return Config.PROFILE_SAMPLE_RATE > 0 and random.random() < Config.PROFILE_SAMPLE_RATE
+
+# Khai báo trước observe_request nên chạy bên trong nó và đọc được stage timings của request
+@app.middleware("http")
+async def profile_request(request, call_next):
+    """Profile requests asked for with X-Profile: 1 or sampled with PROFILE_SAMPLE_RATE"""
+    session = get_request_profiler().start() if _should_profile(request) else None
+    if session is None:
+        return await call_next(request)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - started
+        # cProfile phải dừng trên chính thread đã bật nó (event loop)
+        summary = get_request_profiler().finish(
+            session,
+            request_id=current_request_id(),
+            method=request.method,
+            path=request.url.path,
+            status=status,
+            duration_ms=round(elapsed * 1000, 1),
+            stages_ms={stage: round(seconds * 1000, 1) for stage, seconds in (request_timings() or {}).items()}
+        )
+    response.headers["X-Profile-ID"] = summary["id"]
+    return response
+
+@app.middleware("http")
+async def observe_request(request, call_next):
+    """Request id, per-stage timings (Server-Timing header), latency histogram and one log line per request"""
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex
+    id_token = set_request_id(request_id)
+    timings_token = start_request_timings()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - started
+        # Dùng route template (/jobs/{job_id}) làm label để không nổ số series
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        HTTP_REQUEST_SECONDS.observe(elapsed, method=request.method, route=route, status=status)
+        timings = request_timings()
+        logger.log(
+            logging.DEBUG if route in ("/metrics", "/health") else logging.INFO,
+            "Request finished",
+            extra={
+                "method": request.method, "route": route, "status": status, "duration_ms": round(elapsed * 1000, 1),
+                "stages_ms": {stage: round(seconds * 1000, 1) for stage, seconds in timings.items()}
+            }
+        )
+        end_request_timings(timings_token)
+        reset_request_id(id_token)
+    response.headers["X-Request-ID"] = request_id
+    response.headers["Server-Timing"] = ", ".join(
+        [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()] + [f"total;dur={elapsed * 1000:.1f}"]
+    )
+    return response
+
+async def _read_upload(upload):
+    with timed("upload_read"):
+        return await upload.read()
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: per-stage, LLM (queue wait, network, tokens) and HTTP latency histograms"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+def _check_admin(request):
+    if not Config.PROFILE_ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not _admin_allowed(request):
+        raise HTTPException(status_code=403, detail="Invalid or missing X-Admin-Token")
+
+@app.get("/admin/profiles")
+async def list_profiles(request: Request, limit: int = Query(20, ge=1, le=500)):
+    """Most recent request profiles with their stage timings and hottest functions, newest first"""
+    _check_admin(request)
+    return {"profiles": await asyncio.to_thread(get_request_profiler().list, limit)}
+
+@app.get("/admin/profiles/{profile_id}")
+async def download_profile(profile_id: str, request: Request):
+    """Download a profile: .prof (pstats/snakeviz) or .folded stacks (speedscope/flamegraph.pl)"""
+    _check_admin(request)
+    profiler = get_request_profiler()
+    summary = await asyncio.to_thread(profiler.get, profile_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail=f"Profile not found: {profile_id}")
+    return FileResponse(profiler.path(summary), media_type="application/octet-stream", filename=summary["file"])
 
 @app.get("/")
 async def root():
@@ -39,6 +176,32 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": "cv-jd-matching-api"}
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters and size of the LLM result caches"""
+    cv_extractor = get_cv_extractor()
+    matching_cv = get_matching_cv()
+    return {
+        "extraction": await asyncio.to_thread(cv_extractor.cache.stats) if cv_extractor.cache else None,
+        "matching": await asyncio.to_thread(matching_cv.cache.stats) if matching_cv.cache else None
+    }
+
+@app.post("/cache/invalidate")
+async def cache_invalidate():
+    """Drop cached results produced by outdated prompt versions"""
+    return {
+        "extraction_removed": await asyncio.to_thread(get_cv_extractor().invalidate_cache),
+        "matching_removed": await asyncio.to_thread(get_matching_cv().invalidate_cache)
+    }
+
+@app.get("/llm/stats")
+async def llm_stats():
+    """Per-purpose LLM call counts, latency, token usage and coalesced requests of this worker"""
+    # stats() đọc thống kê cassette từ SQLite: chạy ngoài event loop
+    stats = await asyncio.to_thread(get_gateway().stats)
+    stats["coalescing"] = singleflight_stats()
+    return stats
+
 @app.post("/extract-cv")
 async def extract_cv(cv_file: UploadFile = File(...)):
     """
@@ -49,17 +212,9 @@ async def extract_cv(cv_file: UploadFile = File(...)):
         raise HTTPException(status_code=400, detail="Only PDF files are supported for CV")
     
     try:
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            content = await cv_file.read()
-            temp_file.write(content)
-            temp_file_path = temp_file.name
-        
-        # Process CV
-        cv_info = cv_extractor.process_cv(temp_file_path)
-        
-        # Clean up temporary file
-        os.unlink(temp_file_path)
+        # Parse PDF trực tiếp từ bytes upload, không cần file tạm
+        content = await _read_upload(cv_file)
+        cv_info = await get_cv_extractor().process_cv_bytes(content)
         
         if cv_info:
             return JSONResponse(content={
@@ -71,12 +226,6 @@ async def extract_cv(cv_file: UploadFile = File(...)):
             raise HTTPException(status_code=500, detail="Failed to extract CV information")
             
     except Exception as e:
-        # Clean up temporary file if it exists
-        if 'temp_file_path' in locals():
-            try:
-                os.unlink(temp_file_path)
-            except:
-                pass
         raise HTTPException(status_code=500, detail=f"Error processing CV: {str(e)}")
 
 @app.post("/load-jd")
@@ -90,7 +239,7 @@ async def load_jd(jd_file: UploadFile = File(...)):
     
     try:
         # Read file content
-        content = await jd_file.read()
+        content = await _read_upload(jd_file)
         jd_text = content.decode('utf-8')
         
         if jd_text.strip():
@@ -107,14 +256,32 @@ async def load_jd(jd_file: UploadFile = File(...)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error loading JD: {str(e)}")
 
+def _check_weight_profile(weight_profile):
+    """Reject unknown weight profiles before doing any work"""
+    if weight_profile:
+        try:
+            resolve_weight_profile(weight_profile)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/weight-profiles")
+async def weight_profiles():
+    """List the configured weight profiles and their JD/tenant assignments"""
+    return load_weight_profiles()
+
 @app.post("/match-cv-jd")
 async def match_cv_jd(
     cv_file: UploadFile = File(...),
-    jd_file: UploadFile = File(...)
+    jd_file: UploadFile = File(...),
+    weight_profile: Optional[str] = Query(None, description="Weight profile used for final_matching_score"),
+    tenant: Optional[str] = Query(None, description="Tenant whose weight profile should be used"),
+    lean: bool = Query(False, description="Only generate feature scores, without justifications"),
+    justify: bool = Query(False, description="With lean, add justifications in a second call")
 ):
     """
     Upload CV (PDF) and JD (TXT) files to get matching score
     """
+    _check_weight_profile(weight_profile)
     # Validate file types
     if not cv_file.filename.lower().endswith('.pdf'):
         raise HTTPException(status_code=400, detail="CV file must be PDF format")
@@ -122,54 +289,314 @@ async def match_cv_jd(
     if not jd_file.filename.lower().endswith('.txt'):
         raise HTTPException(status_code=400, detail="JD file must be TXT format")
     
-    temp_cv_path = None
-    temp_jd_path = None
-    
     try:
         # Process CV file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_cv:
-            cv_content = await cv_file.read()
-            temp_cv.write(cv_content)
-            temp_cv_path = temp_cv.name
+        cv_content = await _read_upload(cv_file)
         
         # Process JD file
-        jd_content = await jd_file.read()
+        jd_content = await _read_upload(jd_file)
         jd_text = jd_content.decode('utf-8')
         
-        # Extract CV information
-        cv_info = cv_extractor.process_cv(temp_cv_path)
-        if not cv_info:
-            raise HTTPException(status_code=500, detail="Failed to extract CV information")
-        
-        # Calculate matching score
-        matching_result = matching_cv.calculate_matching_score(cv_info, jd_text)
-        if not matching_result:
-            raise HTTPException(status_code=500, detail="Failed to calculate matching score")
-        
-        # Add file information to result
-        matching_result['cv_filename'] = cv_file.filename
-        matching_result['jd_filename'] = jd_file.filename
-        
-        return JSONResponse(content={
-            "status": "success",
-            "cv_filename": cv_file.filename,
-            "jd_filename": jd_file.filename,
-            "extracted_cv_info": cv_info,
-            "jd_text": jd_text[:500] + "..." if len(jd_text) > 500 else jd_text,  # Truncate for response
-            "matching_result": matching_result
-        })
+        return JSONResponse(content=await _match_files(
+            cv_content, jd_text, cv_file.filename, jd_file.filename,
+            weight_profile=weight_profile, tenant=tenant, lean=lean, justify=justify
+        ))
         
     except UnicodeDecodeError:
         raise HTTPException(status_code=400, detail="Unable to decode JD file. Please ensure it's a valid UTF-8 text file")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing files: {str(e)}")
-    finally:
-        # Clean up temporary files
-        if temp_cv_path and os.path.exists(temp_cv_path):
-            try:
-                os.unlink(temp_cv_path)
-            except:
-                pass
+
+async def _match_files(cv_content, jd_text, cv_filename, jd_filename, weight_profile=None, tenant=None, lean=False, justify=False):
+    """Extract a CV and score it against a JD, returning the /match-cv-jd response body"""
+    # Extract CV information
+    cv_info = await get_cv_extractor().process_cv_bytes(cv_content)
+    if not cv_info:
+        raise HTTPException(status_code=500, detail="Failed to extract CV information")
+
+    # Calculate matching score
+    cv_name = os.path.splitext(cv_filename)[0]
+    jd_name = os.path.splitext(jd_filename)[0]
+    matching_result = await get_matching_cv().calculate_matching_score(
+        cv_info, jd_text,
+        weight_profile=weight_profile,
+        jd_name=jd_name,
+        tenant=tenant,
+        lean=lean,
+        cv_name=cv_name
+    )
+    if not matching_result:
+        raise HTTPException(status_code=500, detail="Failed to calculate matching score")
+    if lean and justify:
+        await get_matching_cv().justify(cv_info, jd_text, matching_result)
+        await get_matching_cv().record(matching_result, cv_info, jd_text, cv_name, jd_name)
+
+    # Add file information to result
+    matching_result['cv_filename'] = cv_filename
+    matching_result['jd_filename'] = jd_filename
+
+    return {
+        "status": "success",
+        "cv_filename": cv_filename,
+        "jd_filename": jd_filename,
+        "extracted_cv_info": cv_info,
+        "jd_text": jd_text[:500] + "..." if len(jd_text) > 500 else jd_text,  # Truncate for response
+        "matching_result": matching_result
+    }
+
+async def _run_match_job(cv_content, params):
+    """Job handler for queued /jobs/match-cv-jd requests"""
+    return await _match_files(cv_content, **params)
+
+@app.post("/jobs/match-cv-jd", status_code=202)
+async def submit_match_job(
+    cv_file: UploadFile = File(...),
+    jd_file: UploadFile = File(...),
+    weight_profile: Optional[str] = Query(None, description="Weight profile used for final_matching_score"),
+    tenant: Optional[str] = Query(None, description="Tenant whose weight profile should be used"),
+    lean: bool = Query(False, description="Only generate feature scores, without justifications"),
+    justify: bool = Query(False, description="With lean, add justifications in a second call"),
+    webhook_url: Optional[str] = Query(None, description="URL that receives the finished job as a JSON POST")
+):
+    """
+    Queue a CV/JD match and return a job id right away; poll GET /jobs/{job_id} or wait for the webhook
+    """
+    _check_weight_profile(weight_profile)
+    if not cv_file.filename.lower().endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="CV file must be PDF format")
+    if not jd_file.filename.lower().endswith('.txt'):
+        raise HTTPException(status_code=400, detail="JD file must be TXT format")
+    if webhook_url:
+        try:
+            await asyncio.to_thread(check_webhook_url, webhook_url)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+    cv_content = await _read_upload(cv_file)
+    try:
+        jd_text = (await _read_upload(jd_file)).decode('utf-8')
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Unable to decode JD file. Please ensure it's a valid UTF-8 text file")
+
+    job = await get_job_queue().submit("match", cv_content, {
+        "jd_text": jd_text,
+        "cv_filename": cv_file.filename,
+        "jd_filename": jd_file.filename,
+        "weight_profile": weight_profile,
+        "tenant": tenant,
+        "lean": lean,
+        "justify": justify
+    }, webhook_url=webhook_url)
+    return {"job_id": job["id"], "status": job["status"], "status_url": f"/jobs/{job['id']}"}
+
+@app.get("/jobs/metrics")
+async def job_metrics():
+    """Queue depth, running jobs and wait/processing time percentiles of the job workers"""
+    return await get_job_queue().metrics()
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status of a queued job, with its result once it has finished"""
+    job = await asyncio.to_thread(get_job_queue().store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    # Params chứa cả JD text, không cần trả lại cho client
+    job.pop("params", None)
+    return job
+
+def _parse_min_scores(min_score):
+    """Parse repeated "feature:value" filters into {feature: minimum}"""
+    min_scores = {}
+    for item in min_score:
+        feature, _, value = item.partition(":")
+        if feature not in FEATURES:
+            raise HTTPException(status_code=400, detail=f"Unknown feature: {feature}. Available: {', '.join(FEATURES)}")
+        try:
+            min_scores[feature] = float(value)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid min_score, expected feature:value: {item}")
+    return min_scores
+
+async def _leaderboard_id(kind, key):
+    """Id for a leaderboard path key, which may also be a display name (CV/JD file name)"""
+    ids = await asyncio.to_thread(get_leaderboard().resolve_id, kind, key)
+    if len(ids) > 1:
+        raise HTTPException(status_code=409, detail={
+            "message": f"Several {kind.upper()}s are named {key}, use one of their ids", f"{kind}_ids": ids
+        })
+    return ids[0] if ids else key
+
+@app.get("/jds/{jd_id}/top")
+async def top_candidates(
+    jd_id: str,
+    k: int = Query(20, ge=1, le=Config.LEADERBOARD_MAX_K, description="Number of CVs to return"),
+    min_score: List[str] = Query([], description="Minimum feature score as feature:value, e.g. exp_years:70 (repeatable)"),
+    min_final: Optional[float] = Query(None, description="Minimum final_matching_score")
+):
+    """Best k CVs of a JD (by jd_id or JD name) from the stored match results, best first"""
+    min_scores = _parse_min_scores(min_score)
+    jd_id = await _leaderboard_id("jd", jd_id)
+    results = await asyncio.to_thread(get_leaderboard().top_for_jd, jd_id, k, min_scores, min_final)
+    return {"jd_id": jd_id, "k": k, "min_scores": min_scores, "min_final": min_final, "results": results}
+
+@app.get("/cvs/{cv_id}/top-jobs")
+async def top_jobs(
+    cv_id: str,
+    k: int = Query(20, ge=1, le=Config.LEADERBOARD_MAX_K, description="Number of JDs to return"),
+    min_score: List[str] = Query([], description="Minimum feature score as feature:value, e.g. prof_skill_advanced:60 (repeatable)"),
+    min_final: Optional[float] = Query(None, description="Minimum final_matching_score")
+):
+    """Best k JDs of a CV (by cv_id or CV name) from the stored match results, best first"""
+    min_scores = _parse_min_scores(min_score)
+    cv_id = await _leaderboard_id("cv", cv_id)
+    results = await asyncio.to_thread(get_leaderboard().top_for_cv, cv_id, k, min_scores, min_final)
+    return {"cv_id": cv_id, "k": k, "min_scores": min_scores, "min_final": min_final, "results": results}
+
+def _sse(event, data):
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/match-cv-jd/stream")
+async def match_cv_jd_stream(
+    cv_file: UploadFile = File(...),
+    jd_file: UploadFile = File(...),
+    weight_profile: Optional[str] = Query(None, description="Weight profile used for final_matching_score"),
+    tenant: Optional[str] = Query(None, description="Tenant whose weight profile should be used")
+):
+    """
+    Same as /match-cv-jd, streamed as server-sent events:
+    `cv_extracted`, one `score` per feature as soon as it is generated, then `result` (or `error`)
+    """
+    _check_weight_profile(weight_profile)
+    if not cv_file.filename.lower().endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="CV file must be PDF format")
+    if not jd_file.filename.lower().endswith('.txt'):
+        raise HTTPException(status_code=400, detail="JD file must be TXT format")
+
+    # Đọc upload trước khi trả response, file sẽ bị đóng khi handler kết thúc
+    cv_content = await _read_upload(cv_file)
+    try:
+        jd_text = (await _read_upload(jd_file)).decode('utf-8')
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Unable to decode JD file. Please ensure it's a valid UTF-8 text file")
+
+    async def events():
+        try:
+            cv_info = await get_cv_extractor().process_cv_bytes(cv_content)
+            if not cv_info:
+                yield _sse("error", {"detail": "Failed to extract CV information"})
+                return
+            yield _sse("cv_extracted", {"cv_filename": cv_file.filename, "extracted_cv_info": cv_info})
+
+            async for event, data in get_matching_cv().stream_matching_score(
+                cv_info, jd_text,
+                weight_profile=weight_profile,
+                jd_name=os.path.splitext(jd_file.filename)[0],
+                tenant=tenant,
+                cv_name=os.path.splitext(cv_file.filename)[0]
+            ):
+                if event == "result":
+                    if not data:
+                        yield _sse("error", {"detail": "Failed to calculate matching score"})
+                        return
+                    data['cv_filename'] = cv_file.filename
+                    data['jd_filename'] = jd_file.filename
+                yield _sse(event, data)
+        except Exception as e:
+            yield _sse("error", {"detail": f"Error processing files: {str(e)}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _unique_name(filename, used):
+    """Filename without extension, suffixed when the same name was uploaded twice"""
+    name = os.path.splitext(os.path.basename(filename))[0]
+    candidate = name
+    index = 2
+    while candidate in used:
+        candidate = f"{name}_{index}"
+        index += 1
+    used.add(candidate)
+    return candidate
+
+async def _extract_uploaded_cv(cv_file, semaphore):
+    """Extract one uploaded CV, returning (cv_info, error)"""
+    try:
+        async with semaphore:
+            cv_info = await get_cv_extractor().process_cv_bytes(await _read_upload(cv_file))
+        if not cv_info:
+            return None, "Failed to extract CV information"
+        return cv_info, None
+    except Exception as e:
+        return None, f"Error processing CV: {str(e)}"
+
+@app.post("/match-batch")
+async def match_batch_endpoint(
+    cv_files: List[UploadFile] = File(...),
+    jd_files: List[UploadFile] = File(...),
+    weight_profile: Optional[str] = Query(None, description="Weight profile used for final_matching_score"),
+    lean: bool = Query(False, description="Only generate feature scores, without justifications"),
+    justify_top: int = Query(0, ge=0, description="Add justifications to the best N CVs of each JD"),
+    pack_size: int = Query(Config.MATCH_PACK_SIZE, ge=0, description="Score each CV against up to N JDs per LLM call (0/1 = one pair per call)")
+):
+    """
+    Upload one or more CVs (PDF) and a list of JDs (TXT) to get a ranked matching matrix
+    """
+    _check_weight_profile(weight_profile)
+    for cv_file in cv_files:
+        if not cv_file.filename.lower().endswith('.pdf'):
+            raise HTTPException(status_code=400, detail=f"CV file must be PDF format: {cv_file.filename}")
+    for jd_file in jd_files:
+        if not jd_file.filename.lower().endswith('.txt'):
+            raise HTTPException(status_code=400, detail=f"JD file must be TXT format: {jd_file.filename}")
+
+    # Load JDs
+    jd_texts = {}
+    used_names = set()
+    for jd_file in jd_files:
+        try:
+            jd_text = (await _read_upload(jd_file)).decode('utf-8').strip()
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail=f"Unable to decode JD file {jd_file.filename}. Please ensure it's a valid UTF-8 text file")
+        if not jd_text:
+            raise HTTPException(status_code=400, detail=f"JD file is empty: {jd_file.filename}")
+        jd_texts[_unique_name(jd_file.filename, used_names)] = jd_text
+
+    # Extract mỗi CV đúng một lần, song song có giới hạn
+    semaphore = asyncio.Semaphore(Config.MATCH_BATCH_CONCURRENCY)
+    used_names = set()
+    cv_names = [_unique_name(cv_file.filename, used_names) for cv_file in cv_files]
+    extracted = await asyncio.gather(*[_extract_uploaded_cv(cv_file, semaphore) for cv_file in cv_files])
+
+    cv_infos = {}
+    cv_errors = {}
+    for cv_name, (cv_info, error) in zip(cv_names, extracted):
+        if error:
+            cv_errors[cv_name] = error
+        else:
+            cv_infos[cv_name] = cv_info
+
+    batch_result = await match_batch(
+        get_matching_cv(), cv_infos, jd_texts,
+        concurrency=Config.MATCH_BATCH_CONCURRENCY,
+        cv_errors=cv_errors,
+        weight_profile=weight_profile,
+        lean=lean,
+        justify_top=justify_top,
+        pack_size=pack_size
+    )
+
+    return JSONResponse(content={
+        "status": "success",
+        "cv_files": [cv_file.filename for cv_file in cv_files],
+        "jd_files": [jd_file.filename for jd_file in jd_files],
+        **batch_result
+    })
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,7 +1,7 @@
 """
 Extractors module for CV and JD processing
 """
-from .cv_extractor import CVExtractor
+from .cv_extractor import CVExtractor, AsyncCVExtractor
 from .jd_loader import JDLoader
 
-__all__ = ['CVExtractor', 'JDLoader']
\ No newline at end of file
+__all__ = ['CVExtractor', 'AsyncCVExtractor', 'JDLoader']
\ No newline at end of file
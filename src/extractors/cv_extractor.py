@@ -1,102 +1,252 @@
-import os
+import logging
 import json
-import openai
-from dotenv import load_dotenv
-from langchain_community.document_loaders import PyPDFLoader
-from ..utils.file_handler import ensure_directory_exists
+import asyncio
+from config.settings import Config
+from ..utils.file_handler import file_stem, save_json_file
+from ..utils.cache import content_hash, get_extraction_cache
+from ..utils.singleflight import get_singleflight
+from ..utils.metrics import timed
+from ..utils.pdf import extract_pdf_text, get_pdf_parser_pool
+from ..utils.profiling import profiling_request
 from ..utils import prompt
+from ..llm.gateway import get_gateway
 
-# Load environment variables
-load_dotenv()
+logger = logging.getLogger(__name__)
+
+def _read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
 
 class CVExtractor:
-    def __init__(self):
-        self.client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        
+    def __init__(self, use_cache=None, gateway=None):
+        # Gateway dùng chung connection pool, cấu hình model và thống kê token
+        self.gateway = gateway or get_gateway()
+        self.model = self.gateway.model
+
         # Template để extract thông tin CV
         self.extraction_template = prompt.EXTRACTOR_PROMPT
+        self.prompt_version = prompt.prompt_version(self.extraction_template)
+
+        # Cache kết quả extract theo nội dung PDF
+        if use_cache is None:
+            use_cache = Config.EXTRACTION_CACHE_ENABLED
+        self.cache = get_extraction_cache() if use_cache else None
+
+        # Gộp các request extract trùng nội dung đang chạy đồng thời thành một LLM call
+        self.inflight = get_singleflight("extraction")
+
+    def invalidate_cache(self):
+        """Remove cached extractions produced by other prompt versions"""
+        if self.cache is None:
+            return 0
+        removed = self.cache.purge_tags(self.prompt_version)
+        logger.info("Removed stale CV extractions from cache", extra={"removed": removed})
+        return removed
+
+    def cache_key(self, pdf_bytes):
+        """Cache key from PDF content, prompt version and model"""
+        return content_hash(pdf_bytes, self.prompt_version, self.model)
+
+    def cached_extraction(self, cache_key):
+        """Return a cached extraction for cache_key, or None"""
+        if self.cache is None or cache_key is None:
+            return None
+        return self.cache.get(cache_key)
+
+    def store_extraction(self, cache_key, cv_info):
+        """Store an extraction result under cache_key"""
+        if self.cache is not None and cache_key is not None:
+            self.cache.set(cache_key, cv_info, tag=self.prompt_version)
 
     def load_pdf(self, pdf_path):
         """Load PDF và extract text"""
         try:
-            loader = PyPDFLoader(pdf_path)
-            documents = loader.load()
-            
-            # Combine all pages
-            full_text = ""
-            for doc in documents:
-                full_text += doc.page_content + "\n"
-            
-            return full_text
+            with open(pdf_path, 'rb') as f:
+                pdf_bytes = f.read()
+        except OSError as e:
+            logger.error("Error loading PDF", extra={"error": str(e)})
+            return None
+        return self.load_pdf_bytes(pdf_bytes)
+
+    def load_pdf_bytes(self, pdf_bytes):
+        """Extract text từ nội dung PDF trong memory, không ghi ra disk"""
+        try:
+            with timed("pdf_parse"):
+                return extract_pdf_text(pdf_bytes, Config.PDF_MAX_PAGES, Config.PDF_MAX_CHARS)
         except Exception as e:
-            print(f"Error loading PDF: {e}")
+            logger.error("Error loading PDF", extra={"error": str(e)})
             return None
 
+    @timed("prompt_build")
+    def _build_request(self, cv_text):
+        """Build chat completion arguments for a CV text"""
+        # Format prompt với CV text
+        prompt = self.extraction_template.format(cv_text=cv_text)
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": "You are an expert HR data structuring bot. Always respond with valid JSON only."},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0,
+            "max_tokens": 2000,
+            "purpose": "extraction"
+        }
+
+    @timed("json_parse")
+    def _parse_response(self, result_text):
+        """Clean up markdown fences and parse the JSON response"""
+        if result_text.startswith('```json'):
+            result_text = result_text.replace('```json', '').replace('```', '').strip()
+        elif result_text.startswith('```'):
+            result_text = result_text.replace('```', '').strip()
+        return json.loads(result_text)
+
+    def inflight_key(self, cv_text):
+        """Key under which concurrent extractions of the same text are coalesced"""
+        return content_hash(cv_text, self.prompt_version, self.model)
+
     def extract_cv_info(self, cv_text):
         """Extract thông tin quan trọng từ CV text"""
+        return self.inflight.do(self.inflight_key(cv_text), self._extract_cv_info, cv_text)
+
+    def _extract_cv_info(self, cv_text):
+        result_text = None
         try:
-            # Format prompt với CV text
-            prompt = self.extraction_template.format(cv_text=cv_text)
-            
             # Generate response using OpenAI
-            response = self.client.chat.completions.create(
-                model= os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-                messages=[
-                    {"role": "system", "content": "You are an expert HR data structuring bot. Always respond with valid JSON only."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0,
-                max_tokens=2000
-            )
-            
-            # Extract text from response
-            result_text = response.choices[0].message.content
-            
-            # Clean up the response text (remove any markdown formatting)
-            if result_text.startswith('```json'):
-                result_text = result_text.replace('```json', '').replace('```', '').strip()
-            elif result_text.startswith('```'):
-                result_text = result_text.replace('```', '').strip()
-            
+            result_text = self.gateway.complete(**self._build_request(cv_text))
+
             # Parse JSON response
-            cv_info = json.loads(result_text)
+            cv_info = self._parse_response(result_text)
             return cv_info
         except json.JSONDecodeError as e:
-            print(f"Error parsing JSON: {e}")
-            print(f"Raw response: {result_text}")
+            logger.error("Error parsing JSON", extra={"error": str(e), "raw_response": result_text})
             return None
         except Exception as e:
-            print(f"Error extracting CV info: {e}")
+            logger.error("Error extracting CV info", extra={"error": str(e)})
             return None
 
     def process_cv(self, pdf_path):
         """Process CV từ PDF file"""
-        print(f"Processing CV: {pdf_path}")
-        
+        logger.info("Processing CV", extra={"path": pdf_path})
+        try:
+            with open(pdf_path, 'rb') as f:
+                pdf_bytes = f.read()
+        except OSError as e:
+            logger.error("Error reading PDF", extra={"error": str(e)})
+            return None
+        return self.process_cv_bytes(pdf_bytes)
+
+    def process_cv_bytes(self, pdf_bytes):
+        """Process CV từ nội dung PDF (bytes), ví dụ file upload"""
+        # Check cache trước khi parse PDF và gọi API
+        cache_key = self.cache_key(pdf_bytes) if self.cache is not None else None
+        cv_info = self.cached_extraction(cache_key)
+        if cv_info is not None:
+            logger.info("CV information loaded from cache")
+            return cv_info
+
         # Load PDF
-        cv_text = self.load_pdf(pdf_path)
+        cv_text = self.load_pdf_bytes(pdf_bytes)
         if not cv_text:
             return None
-        
-        print("PDF loaded successfully")
-        print(f"Text length: {len(cv_text)} characters")
-        
+
+        logger.info("PDF loaded", extra={"chars": len(cv_text)})
+
         # Extract information
         cv_info = self.extract_cv_info(cv_text)
         if not cv_info:
             return None
-        
-        print("CV information extracted successfully")
+
+        logger.info("CV information extracted")
+        self.store_extraction(cache_key, cv_info)
         return cv_info
 
-    def save_extracted_info(self, cv_info, output_path):
-        """Save extracted information to JSON file"""
+    def save_extracted_info(self, cv_info, output_path=None, store=None, cv_id=None):
+        """Save extracted information to a results store, or to the JSON file output_path
+
+        With a store, the record is keyed by cv_id, else by the {cv} part of an
+        extracted_{cv}.json output_path.
+        """
+        if store is not None:
+            if not cv_id and not output_path:
+                raise ValueError("save_extracted_info needs a cv_id or an output_path to key the store record")
+            # cv_id mặc định lấy từ tên file extracted_{cv}.json
+            store.save_extraction(cv_id or file_stem(output_path, "extracted_"), cv_info)
+        elif output_path:
+            save_json_file(cv_info, output_path)
+        else:
+            raise ValueError("save_extracted_info needs an output_path or a store")
+
+class AsyncCVExtractor(CVExtractor):
+    """CVExtractor variant that calls the async LLM client inside the event loop"""
+
+    async def load_pdf(self, pdf_path):
+        """Load PDF và extract text (async)"""
+        try:
+            pdf_bytes = await asyncio.to_thread(_read_file, pdf_path)
+        except OSError as e:
+            logger.error("Error loading PDF", extra={"error": str(e)})
+            return None
+        return await self.load_pdf_bytes(pdf_bytes)
+
+    async def load_pdf_bytes(self, pdf_bytes):
+        """Extract text từ nội dung PDF trong process pool (async)"""
         try:
-            # Ensure output directory exists
-            ensure_directory_exists(os.path.dirname(output_path))
-            
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(cv_info, f, ensure_ascii=False, indent=2)
-            print(f"CV information saved to: {output_path}")
+            with timed("pdf_parse"):
+                if profiling_request():
+                    # Request đang được profile: parse ngay trên thread này để pypdf có trong profile
+                    return extract_pdf_text(pdf_bytes, Config.PDF_MAX_PAGES, Config.PDF_MAX_CHARS)
+                return await get_pdf_parser_pool().parse(pdf_bytes)
         except Exception as e:
-            print(f"Error saving CV info: {e}")
\ No newline at end of file
+            logger.error("Error loading PDF", extra={"error": str(e)})
+            return None
+
+    async def extract_cv_info(self, cv_text):
+        """Extract thông tin quan trọng từ CV text (async)"""
+        return await self.inflight.do_async(self.inflight_key(cv_text), self._extract_cv_info, cv_text)
+
+    async def _extract_cv_info(self, cv_text):
+        result_text = None
+        try:
+            result_text = await self.gateway.acomplete(**self._build_request(cv_text))
+            return self._parse_response(result_text)
+        except json.JSONDecodeError as e:
+            logger.error("Error parsing JSON", extra={"error": str(e), "raw_response": result_text})
+            return None
+        except Exception as e:
+            logger.error("Error extracting CV info", extra={"error": str(e)})
+            return None
+
+    async def process_cv(self, pdf_path):
+        """Process CV từ PDF file (async)"""
+        logger.info("Processing CV", extra={"path": pdf_path})
+        try:
+            pdf_bytes = await asyncio.to_thread(_read_file, pdf_path)
+        except OSError as e:
+            logger.error("Error reading PDF", extra={"error": str(e)})
+            return None
+        return await self.process_cv_bytes(pdf_bytes)
+
+    async def process_cv_bytes(self, pdf_bytes):
+        """Process CV từ nội dung PDF (bytes) (async)"""
+        # SQLite chạy trong thread, parse PDF trong process pool để không block event loop
+        cache_key = self.cache_key(pdf_bytes) if self.cache is not None else None
+        cv_info = await asyncio.to_thread(self.cached_extraction, cache_key)
+        if cv_info is not None:
+            logger.info("CV information loaded from cache")
+            return cv_info
+
+        cv_text = await self.load_pdf_bytes(pdf_bytes)
+        if not cv_text:
+            return None
+
+        logger.info("PDF loaded", extra={"chars": len(cv_text)})
+
+        cv_info = await self.extract_cv_info(cv_text)
+        if not cv_info:
+            return None
+
+        logger.info("CV information extracted")
+        await asyncio.to_thread(self.store_extraction, cache_key, cv_info)
+        return cv_info
@@ -1,5 +1,8 @@
 import os
-from ..utils.file_handler import ensure_directory_exists
+import logging
+from ..utils.file_handler import file_stem, save_text_file
+
+logger = logging.getLogger(__name__)
 
 class JDLoader:
     def load_pdf(self, file_path):
@@ -7,7 +10,7 @@ class JDLoader:
         try:
             # Check if file exists
             if not os.path.exists(file_path):
-                print(f"File not found: {file_path}")
+                logger.error("File not found", extra={"path": file_path})
                 return None
             
             # Read text file
@@ -16,21 +19,24 @@ class JDLoader:
             
             return content.strip()
         except Exception as e:
-            print(f"Error loading file: {e}")
+            logger.error("Error loading file", extra={"error": str(e)})
             return None
     
     def load_txt(self, txt_path):
         """Load text file - alias for load_pdf for backward compatibility"""
         return self.load_pdf(txt_path)
     
-    def save_loaded_info(self, jd_info, output_path):
-        """Save extracted information to txt file"""
-        try:
-            # Ensure output directory exists
-            ensure_directory_exists(os.path.dirname(output_path))
-            
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(jd_info)
-            print(f"JD information saved to: {output_path}")
-        except Exception as e:
-            print(f"Error saving JD info: {e}")
\ No newline at end of file
+    def save_loaded_info(self, jd_info, output_path=None, store=None, jd_id=None):
+        """Save loaded JD text to a results store, or to the text file output_path
+
+        With a store, the record is keyed by jd_id, else by the {jd} part of an
+        extracted_{jd}.txt output_path.
+        """
+        if store is not None:
+            if not jd_id and not output_path:
+                raise ValueError("save_loaded_info needs a jd_id or an output_path to key the store record")
+            store.save_jd(jd_id or file_stem(output_path, "extracted_"), jd_info)
+        elif output_path:
+            save_text_file(jd_info, output_path)
+        else:
+            raise ValueError("save_loaded_info needs an output_path or a store")
@@ -0,0 +1,7 @@
+"""
+Background jobs for long-running API requests
+"""
+from .store import JobStore, QUEUED, RUNNING, SUCCEEDED, FAILED
+from .queue import JobQueue, get_job_queue, check_webhook_url
+
+__all__ = ['JobStore', 'JobQueue', 'get_job_queue', 'check_webhook_url', 'QUEUED', 'RUNNING', 'SUCCEEDED', 'FAILED']
@@ -0,0 +1,273 @@
+import os
+import json
+import uuid
+import socket
+import logging
+import time
+import asyncio
+import ipaddress
+import threading
+import ssl
+import http.client
+import urllib.parse
+from collections import deque
+from config.settings import Config
+from .store import JobStore, QUEUED
+from ..utils.log import set_request_id
+
+logger = logging.getLogger(__name__)
+
+def _summary(samples):
+    """Count, mean and percentiles of a list of durations in seconds"""
+    if not samples:
+        return {"count": 0, "avg": None, "p50": None, "p95": None, "max": None}
+    ordered = sorted(samples)
+    def percentile(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {
+        "count": len(ordered),
+        "avg": sum(ordered) / len(ordered),
+        "p50": percentile(0.5),
+        "p95": percentile(0.95),
+        "max": ordered[-1]
+    }
+
+def check_webhook_url(url, allowed_hosts=None):
+    """Raise ValueError unless url is an http(s) URL the server may POST to
+
+    With allowed_hosts, the host must be listed (".example.com" also allows
+    subdomains) and None is returned. Otherwise every address the host
+    resolves to must be public: loopback, private, link-local (cloud
+    metadata) and reserved ranges are refused so clients cannot make the
+    server call internal services. The checked addresses are returned so
+    the caller connects to them and not to a later, possibly rebound, DNS
+    answer.
+    """
+    parsed = urllib.parse.urlsplit(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise ValueError("webhook_url must be an http(s) URL")
+    host = parsed.hostname.lower().rstrip(".")
+    allowed_hosts = Config.JOB_WEBHOOK_ALLOWED_HOSTS if allowed_hosts is None else allowed_hosts
+    if allowed_hosts:
+        if not any(host == entry or (entry.startswith(".") and host.endswith(entry)) for entry in allowed_hosts):
+            raise ValueError(f"webhook host {host} is not in JOB_WEBHOOK_ALLOWED_HOSTS")
+        return None
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, parsed.port or 443, proto=socket.IPPROTO_TCP)}
+    except (socket.gaierror, UnicodeError):
+        raise ValueError(f"webhook host {host} does not resolve")
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%", 1)[0])
+        if not ip.is_global or ip.is_multicast:
+            raise ValueError(f"webhook host {host} resolves to a non-public address ({ip})")
+    return sorted(addresses)
+
+class _PinnedHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection to an address checked by check_webhook_url instead of a new DNS lookup"""
+
+    def __init__(self, host, address, **kwargs):
+        super().__init__(host, **kwargs)
+        self.address = address
+
+    def connect(self):
+        self.sock = socket.create_connection((self.address, self.port), self.timeout)
+
+class _PinnedHTTPSConnection(http.client.HTTPSConnection):
+    """HTTPS connection to a checked address; SNI and the certificate still use the host name"""
+
+    def __init__(self, host, address, **kwargs):
+        self.ssl_context = ssl.create_default_context()
+        super().__init__(host, context=self.ssl_context, **kwargs)
+        self.address = address
+
+    def connect(self):
+        sock = socket.create_connection((self.address, self.port), self.timeout)
+        self.sock = self.ssl_context.wrap_socket(sock, server_hostname=self.host)
+
+def _post_json(url, data, timeout):
+    # Kiểm tra lại lúc gửi và kết nối thẳng tới địa chỉ vừa kiểm tra (chống DNS rebinding)
+    addresses = check_webhook_url(url)
+    parsed = urllib.parse.urlsplit(url)
+    https = parsed.scheme == "https"
+    port = parsed.port or (443 if https else 80)
+    if addresses:
+        connection_class = _PinnedHTTPSConnection if https else _PinnedHTTPConnection
+        conn = connection_class(parsed.hostname, addresses[0], port=port, timeout=timeout)
+    else:
+        connection_class = http.client.HTTPSConnection if https else http.client.HTTPConnection
+        conn = connection_class(parsed.hostname, port=port, timeout=timeout)
+    path = (parsed.path or "/") + (f"?{parsed.query}" if parsed.query else "")
+    try:
+        conn.request(
+            "POST", path, body=json.dumps(data, ensure_ascii=False).encode("utf-8"),
+            headers={"Content-Type": "application/json"}
+        )
+        response = conn.getresponse()
+        response.read()
+    finally:
+        conn.close()
+    # Không theo redirect: đích mới có thể là địa chỉ nội bộ
+    if response.status >= 300:
+        raise http.client.HTTPException(f"Webhook answered HTTP {response.status}")
+    return response.status
+
+class JobQueue:
+    """Worker pool running persisted jobs inside the API event loop
+
+    Handlers are registered per job kind as async functions taking
+    (payload, params) and returning a JSON-serialisable result. Jobs queued
+    before a restart are picked up again by start(). Running jobs hold a
+    lease renewed in the background; jobs whose worker died (lease expired)
+    are requeued by any live process sharing the store.
+    """
+
+    def __init__(self, store, workers=4, webhook_timeout=10.0, webhook_retries=3, retention=0, worker_id=None):
+        self.store = store
+        # Id duy nhất của process này, ghi vào job để biết ai đang giữ lease
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.workers = max(1, workers)
+        self.webhook_timeout = webhook_timeout
+        self.webhook_retries = webhook_retries
+        self.retention = retention
+        self.handlers = {}
+        self._queue = None
+        self._tasks = []
+        self._running = 0
+        # Mẫu gần nhất để tính p50/p95 thời gian chờ và xử lý
+        self._wait_times = deque(maxlen=1000)
+        self._processing_times = deque(maxlen=1000)
+        self._processed = {"succeeded": 0, "failed": 0}
+
+    def register(self, kind, handler):
+        self.handlers[kind] = handler
+
+    @property
+    def started(self):
+        return self._queue is not None
+
+    async def start(self):
+        """Requeue unfinished jobs from the store and start the workers"""
+        if self.started:
+            return
+        self._queue = asyncio.Queue()
+        if self.retention:
+            await asyncio.to_thread(self.store.purge, self.retention)
+        for job_id in await asyncio.to_thread(self.store.requeue_interrupted):
+            self._queue.put_nowait(job_id)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._maintain_leases()))
+
+    async def stop(self):
+        """Stop the workers and hand the jobs they were running back to the queue"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        await asyncio.to_thread(self.store.release, self.worker_id)
+
+    async def _maintain_leases(self):
+        """Renew the leases of our running jobs and take over jobs of dead workers"""
+        interval = max(0.1, self.store.lease_seconds / 3)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.store.renew_leases, self.worker_id)
+                for job_id in await asyncio.to_thread(self.store.requeue_expired):
+                    logger.warning("Requeued job with expired lease", extra={"job_id": job_id})
+                    self._queue.put_nowait(job_id)
+            except Exception as e:
+                logger.error("Error maintaining job leases", extra={"error": str(e)})
+
+    async def submit(self, kind, payload, params, webhook_url=None):
+        """Persist a job and queue it, returning its record"""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if not self.started:
+            raise RuntimeError("JobQueue.submit() called before start()")
+        job = await asyncio.to_thread(self.store.create, kind, payload, params, webhook_url)
+        self._queue.put_nowait(job["id"])
+        return job
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                logger.error("Error running job", extra={"job_id": job_id, "error": str(e)})
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id):
+        if not await asyncio.to_thread(self.store.start, job_id, self.worker_id):
+            return
+        job = await asyncio.to_thread(self.store.get, job_id)
+        payload = await asyncio.to_thread(self.store.payload, job_id)
+        # Log của job mang job id như một request id
+        set_request_id(job_id)
+        self._running += 1
+        self._wait_times.append(job["wait_seconds"])
+        started = time.perf_counter()
+        result = error = None
+        try:
+            result = await self.handlers[job["kind"]](payload, job["params"])
+        except Exception as e:
+            error = getattr(e, "detail", None) or str(e) or type(e).__name__
+        finally:
+            self._running -= 1
+        self._processing_times.append(time.perf_counter() - started)
+        self._processed["failed" if error else "succeeded"] += 1
+
+        job = await asyncio.to_thread(self.store.finish, job_id, self.worker_id, result, error)
+        if job is None:
+            # Lease đã hết và job được worker khác chạy lại: không báo kết quả hai lần
+            logger.warning("Job lease lost, result dropped", extra={"job_id": job_id})
+            return
+        if job["webhook_url"]:
+            await self._notify(job)
+
+    async def _notify(self, job):
+        """POST the finished job to its webhook, retrying with backoff"""
+        webhook_status = "failed"
+        body = {key: value for key, value in job.items() if key != "params"}
+        for attempt in range(self.webhook_retries + 1):
+            try:
+                status = await asyncio.to_thread(_post_json, job["webhook_url"], body, self.webhook_timeout)
+                webhook_status = f"delivered ({status})"
+                break
+            except Exception as e:
+                logger.warning("Webhook delivery failed", extra={"job_id": job["id"], "attempt": attempt + 1, "error": str(e)})
+                if attempt < self.webhook_retries:
+                    await asyncio.sleep(min(30.0, 2 ** attempt))
+        await asyncio.to_thread(self.store.set_webhook_status, job["id"], webhook_status)
+
+    async def metrics(self):
+        """Queue depth, running jobs and wait/processing time percentiles"""
+        counts = await asyncio.to_thread(self.store.counts)
+        return {
+            "workers": self.workers,
+            "queue_depth": self._queue.qsize() if self._queue is not None else counts[QUEUED],
+            "running": self._running,
+            "jobs_by_status": counts,
+            "processed": dict(self._processed),
+            "wait_seconds": _summary(list(self._wait_times)),
+            "processing_seconds": _summary(list(self._processing_times))
+        }
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+def get_job_queue():
+    """Return the process-wide job queue"""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(
+                JobStore(Config.JOB_DB_PATH, lease_seconds=Config.JOB_LEASE_SECONDS),
+                workers=Config.JOB_WORKERS,
+                webhook_timeout=Config.JOB_WEBHOOK_TIMEOUT,
+                webhook_retries=Config.JOB_WEBHOOK_RETRIES,
+                retention=Config.JOB_RETENTION
+            )
+        return _job_queue
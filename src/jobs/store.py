@@ -0,0 +1,182 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from ..utils.file_handler import ensure_directory_exists
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+STATUSES = (QUEUED, RUNNING, SUCCEEDED, FAILED)
+
+_COLUMNS = (
+    "id, kind, status, params, result, error, webhook_url, webhook_status, "
+    "attempts, created_at, started_at, finished_at, worker_id, lease_expires_at"
+)
+
+class JobStore:
+    """Persistent job records in SQLite, so queued and finished jobs survive restarts
+
+    The uploaded input of a job is kept in a BLOB column until the job
+    finishes, then dropped; results stay until purge() removes old jobs.
+    A running job is leased to one worker for lease_seconds and the worker
+    renews the lease while it runs; only jobs whose lease expired (their
+    process died) are put back in the queue.
+    """
+
+    def __init__(self, path, lease_seconds=60.0):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self._local = threading.local()
+
+        ensure_directory_exists(os.path.dirname(path))
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, payload BLOB, params TEXT NOT NULL, "
+            "result TEXT, error TEXT, webhook_url TEXT, webhook_status TEXT, attempts INTEGER NOT NULL DEFAULT 0, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL, worker_id TEXT, lease_expires_at REAL)"
+        )
+        # Database tạo trước khi có lease: thêm cột, job running cũ coi như lease đã hết
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("worker_id", "TEXT"), ("lease_expires_at", "REAL")):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (finished_at)")
+
+    def _connect(self):
+        """Return a connection owned by the current thread and process"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _row_to_job(self, row):
+        job = dict(zip([column.strip() for column in _COLUMNS.split(",")], row))
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        # Thời gian chờ trong queue và thời gian xử lý, None nếu chưa tới bước đó
+        job["wait_seconds"] = job["started_at"] - job["created_at"] if job["started_at"] else None
+        job["processing_seconds"] = (
+            job["finished_at"] - job["started_at"] if job["finished_at"] and job["started_at"] else None
+        )
+        return job
+
+    def create(self, kind, payload, params, webhook_url=None):
+        """Insert a queued job and return its record"""
+        job_id = uuid.uuid4().hex
+        self._connect().execute(
+            "INSERT INTO jobs (id, kind, status, payload, params, webhook_url, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, QUEUED, payload, json.dumps(params, ensure_ascii=False), webhook_url, time.time())
+        )
+        return self.get(job_id)
+
+    def get(self, job_id):
+        """Job record without its payload, or None"""
+        row = self._connect().execute(f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row is not None else None
+
+    def payload(self, job_id):
+        row = self._connect().execute("SELECT payload FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row[0] if row is not None else None
+
+    def start(self, job_id, worker_id):
+        """Lease a queued job to worker_id and mark it running; False if another worker already took it"""
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = ?, started_at = ?, attempts = attempts + 1, worker_id = ?, lease_expires_at = ? "
+            "WHERE id = ? AND status = ?",
+            (RUNNING, now, worker_id, now + self.lease_seconds, job_id, QUEUED)
+        )
+        return cursor.rowcount == 1
+
+    def renew_leases(self, worker_id):
+        """Extend the lease of every job worker_id is running, return how many were renewed"""
+        cursor = self._connect().execute(
+            "UPDATE jobs SET lease_expires_at = ? WHERE worker_id = ? AND status = ?",
+            (time.time() + self.lease_seconds, worker_id, RUNNING)
+        )
+        return cursor.rowcount
+
+    def finish(self, job_id, worker_id, result=None, error=None):
+        """Store the outcome of a job leased to worker_id and drop its payload
+
+        Returns None when the lease was lost (the job was requeued and taken
+        by another worker), so the caller must not report it.
+        """
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, payload = NULL, lease_expires_at = NULL "
+            "WHERE id = ? AND worker_id = ? AND status = ?",
+            (
+                FAILED if error else SUCCEEDED,
+                json.dumps(result, ensure_ascii=False) if result is not None else None,
+                error, time.time(), job_id, worker_id, RUNNING
+            )
+        )
+        return self.get(job_id) if cursor.rowcount == 1 else None
+
+    def set_webhook_status(self, job_id, webhook_status):
+        self._connect().execute("UPDATE jobs SET webhook_status = ? WHERE id = ?", (webhook_status, job_id))
+
+    def requeue_expired(self):
+        """Put running jobs whose lease expired back in the queue, return their ids"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            expired = [row[0] for row in conn.execute(
+                "SELECT id FROM jobs WHERE status = ? AND (lease_expires_at IS NULL OR lease_expires_at < ?)",
+                (RUNNING, time.time())
+            )]
+            conn.executemany(
+                "UPDATE jobs SET status = ?, started_at = NULL, worker_id = NULL, lease_expires_at = NULL WHERE id = ?",
+                [(QUEUED, job_id) for job_id in expired]
+            )
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        return expired
+
+    def release(self, worker_id):
+        """Requeue the running jobs of a worker that is shutting down, return their ids"""
+        conn = self._connect()
+        ids = [row[0] for row in conn.execute("SELECT id FROM jobs WHERE worker_id = ? AND status = ?", (worker_id, RUNNING))]
+        conn.execute(
+            "UPDATE jobs SET status = ?, started_at = NULL, worker_id = NULL, lease_expires_at = NULL WHERE worker_id = ? AND status = ?",
+            (QUEUED, worker_id, RUNNING)
+        )
+        return ids
+
+    def requeue_interrupted(self):
+        """Requeue jobs of dead workers, return every queued id oldest first
+
+        Jobs running in live processes keep their lease and are left alone.
+        """
+        self.requeue_expired()
+        return [row[0] for row in self._connect().execute(
+            "SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)
+        )]
+
+    def purge(self, max_age):
+        """Delete finished jobs older than max_age seconds, return the number removed"""
+        cursor = self._connect().execute(
+            "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (time.time() - max_age,)
+        )
+        return cursor.rowcount
+
+    def counts(self):
+        """Number of jobs per status"""
+        counts = {status: 0 for status in STATUSES}
+        for status, count in self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"):
+            counts[status] = count
+        return counts
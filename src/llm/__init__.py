@@ -0,0 +1,8 @@
+"""
+Shared access to the LLM API
+"""
+from .gateway import LLMGateway, get_gateway
+from .cassette import Cassette, CassetteMiss, get_cassette
+from .scheduler import RateScheduler, llm_lane, current_lane, INTERACTIVE, BULK
+
+__all__ = ['LLMGateway', 'get_gateway', 'Cassette', 'CassetteMiss', 'get_cassette', 'RateScheduler', 'llm_lane', 'current_lane', 'INTERACTIVE', 'BULK']
@@ -0,0 +1,162 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import logging
+import threading
+from types import SimpleNamespace
+from config.settings import Config
+from ..utils.cache import content_hash
+from ..utils.file_handler import ensure_directory_exists
+
+logger = logging.getLogger(__name__)
+
+MODES = ("off", "record", "replay", "auto")
+
+# Không phụ thuộc vào việc gọi stream hay không: cùng prompt thì cùng câu trả lời
+_TRANSPORT_KEYS = ("stream", "stream_options")
+
+class CassetteMiss(LookupError):
+    """Replay mode got a request that was never recorded"""
+
+def request_key(request):
+    """Stable key of a chat completion request (model, messages and sampling options)"""
+    canonical = {key: value for key, value in request.items() if key not in _TRANSPORT_KEYS}
+    return content_hash(json.dumps(canonical, sort_keys=True, ensure_ascii=False, separators=(",", ":")))
+
+def _pack(text):
+    return zlib.compress(text.encode("utf-8"), 6)
+
+def _unpack(blob):
+    return zlib.decompress(blob).decode("utf-8")
+
+class Cassette:
+    """Recorded LLM request/response pairs in one indexed SQLite file
+
+    mode "record" calls the API and stores every answer with its usage and
+    latency, "replay" answers only from the cassette (CassetteMiss otherwise),
+    "auto" replays what was recorded and records the rest. Requests and
+    responses are stored zlib-compressed and looked up by request_key().
+    Replayed calls sleep latency_scale times the recorded latency (0 = instant).
+    """
+
+    def __init__(self, path, mode="replay", latency_scale=0.0):
+        if mode not in MODES or mode == "off":
+            raise ValueError(f"Unknown cassette mode: {mode}. Available: {', '.join(MODES[1:])}")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        ensure_directory_exists(os.path.dirname(path))
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS interactions ("
+            "key TEXT PRIMARY KEY, purpose TEXT NOT NULL, model TEXT, request BLOB NOT NULL, response BLOB NOT NULL, "
+            "prompt_tokens INTEGER, completion_tokens INTEGER, total_tokens INTEGER, "
+            "latency REAL NOT NULL, recorded_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_interactions_purpose ON interactions (purpose)")
+
+    def _connect(self):
+        """Return a connection owned by the current thread and process"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @property
+    def replays(self):
+        return self.mode in ("replay", "auto")
+
+    @property
+    def records(self):
+        return self.mode in ("record", "auto")
+
+    def lookup(self, request, purpose="default"):
+        """Recorded interaction for a request, or None (CassetteMiss in replay mode)"""
+        key = request_key(request)
+        row = self._connect().execute(
+            "SELECT response, prompt_tokens, completion_tokens, total_tokens, latency FROM interactions WHERE key = ?",
+            (key,)
+        ).fetchone()
+        with self._lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if row is None:
+            if self.mode == "replay":
+                logger.warning("Cassette miss", extra={"purpose": purpose, "key": key, "path": self.path})
+                raise CassetteMiss(f"No recorded {purpose} call with key {key} in {self.path}")
+            return None
+        response, prompt_tokens, completion_tokens, total_tokens, latency = row
+        return SimpleNamespace(
+            content=_unpack(response),
+            latency=latency,
+            usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, total_tokens=total_tokens)
+        )
+
+    def delay(self, interaction):
+        """Seconds a replayed call should take"""
+        return interaction.latency * self.latency_scale if self.latency_scale > 0 else 0.0
+
+    def record(self, request, purpose, content, usage, latency):
+        """Store one answered request, replacing an older recording of it"""
+        try:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO interactions (key, purpose, model, request, response, prompt_tokens, "
+                "completion_tokens, total_tokens, latency, recorded_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    request_key(request), purpose, request.get("model"),
+                    _pack(json.dumps(request, ensure_ascii=False)), _pack(content or ""),
+                    getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None),
+                    getattr(usage, "total_tokens", None), latency, time.time()
+                )
+            )
+        except sqlite3.Error as e:
+            logger.error("Error writing cassette", extra={"path": self.path, "error": str(e)})
+            return
+        with self._lock:
+            self.recorded += 1
+
+    def stats(self):
+        rows = self._connect().execute(
+            "SELECT purpose, COUNT(*), SUM(LENGTH(request) + LENGTH(response)) FROM interactions GROUP BY purpose"
+        ).fetchall()
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "path": self.path,
+                "hits": self.hits,
+                "misses": self.misses,
+                "recorded": self.recorded,
+                "interactions": {purpose: {"count": count, "bytes": size or 0} for purpose, count, size in rows}
+            }
+
+_cassette = None
+_cassette_lock = threading.Lock()
+
+def get_cassette():
+    """Return the process-wide cassette, or None when LLM_CASSETTE_MODE is off"""
+    global _cassette
+    if Config.LLM_CASSETTE_MODE == "off":
+        return None
+    with _cassette_lock:
+        if _cassette is None:
+            _cassette = Cassette(
+                Config.LLM_CASSETTE_PATH,
+                mode=Config.LLM_CASSETTE_MODE,
+                latency_scale=Config.LLM_CASSETTE_LATENCY_SCALE
+            )
+        return _cassette
@@ -0,0 +1,350 @@
+import os
+import time
+import random
+import asyncio
+import threading
+from types import SimpleNamespace
+from config.settings import Config
+from .scheduler import RateScheduler, estimate_tokens, current_lane
+from .cassette import get_cassette
+from ..utils.cache import content_hash
+from ..utils.metrics import (
+    LLM_QUEUE_WAIT_SECONDS, LLM_REQUEST_SECONDS, LLM_REQUESTS, LLM_TOKENS, observe_stage
+)
+
+def _is_rate_limit(error):
+    return getattr(error, "status_code", None) == 429
+
+def _is_transient(error):
+    """Timeouts, connection errors and 5xx answers, worth retrying after a short backoff"""
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in (408, 409) or status >= 500
+    import openai
+    return isinstance(error, openai.APIConnectionError)
+
+def _retry_after(error):
+    """Seconds from the Retry-After header of a 429 response, or 0"""
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after", 0))
+    except (AttributeError, TypeError, ValueError):
+        return 0.0
+
+class LLMGateway:
+    """Single entry point for chat completions shared by the extractor and the matcher
+
+    Owns one pooled HTTP transport per flavour (sync/async), the model and
+    timeout configuration, the RPM/TPM scheduler with 429 backoff, and
+    per-call latency and token accounting.
+    With a cassette (LLM_CASSETTE_MODE) calls are recorded to or replayed
+    from disk, replayed calls skip the rate budget and the network.
+    Clients are created on first use so importing this module stays cheap.
+    """
+
+    def __init__(self, api_key=None, base_url=None, model=None, timeout=None, connect_timeout=None,
+                 max_connections=None, max_keepalive=None, keepalive_expiry=None, max_retries=None,
+                 scheduler=None, cassette=None):
+        self.api_key = api_key or Config.OPENAI_API_KEY
+        self.base_url = base_url or Config.OPENAI_BASE_URL
+        self.model = model or Config.OPENAI_MODEL
+        self.timeout = timeout or Config.OPENAI_TIMEOUT
+        self.connect_timeout = connect_timeout or Config.OPENAI_CONNECT_TIMEOUT
+        self.max_connections = max_connections or Config.OPENAI_MAX_CONNECTIONS
+        self.max_keepalive = max_keepalive or Config.OPENAI_MAX_KEEPALIVE
+        self.keepalive_expiry = keepalive_expiry or Config.OPENAI_KEEPALIVE_EXPIRY
+        self.max_retries = Config.OPENAI_MAX_RETRIES if max_retries is None else max_retries
+        self.scheduler = scheduler or RateScheduler(
+            rpm=Config.LLM_RPM,
+            tpm=Config.LLM_TPM,
+            interactive_reserve=Config.LLM_INTERACTIVE_RESERVE,
+            # Các process dùng chung API key thì dùng chung budget
+            shared_path=os.path.join(Config.CACHE_DIR, "llm_budget.sqlite") if Config.LLM_BUDGET_SHARED else None,
+            key=content_hash(self.api_key or "", self.base_url or "")
+        )
+        self.rate_limit_retries = Config.LLM_RATE_LIMIT_RETRIES
+        self.backoff_base = Config.LLM_BACKOFF_BASE
+        self.backoff_max = Config.LLM_BACKOFF_MAX
+        self.cassette = cassette if cassette is not None else get_cassette()
+        self._sync_client = None
+        self._async_client = None
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _client_options(self, async_client):
+        # openai/httpx chỉ import khi tạo client lần đầu
+        import openai
+        try:
+            import httpx2 as httpx  # openai bản mới chạy trên httpx2
+        except ImportError:
+            import httpx
+        client_class = openai.DefaultAsyncHttpxClient if async_client else openai.DefaultHttpxClient
+        http_client = client_class(limits=httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive,
+            keepalive_expiry=self.keepalive_expiry
+        ))
+        return {
+            "api_key": self.api_key,
+            "base_url": self.base_url or None,
+            "timeout": openai.Timeout(self.timeout, connect=self.connect_timeout),
+            # SDK không tự retry: mọi retry (kể cả 429) đi qua scheduler và backoff của gateway
+            "max_retries": 0,
+            "http_client": http_client
+        }
+
+    @property
+    def sync_client(self):
+        with self._lock:
+            if self._sync_client is None:
+                import openai
+                self._sync_client = openai.OpenAI(**self._client_options(async_client=False))
+            return self._sync_client
+
+    @property
+    def async_client(self):
+        with self._lock:
+            if self._async_client is None:
+                import openai
+                self._async_client = openai.AsyncOpenAI(**self._client_options(async_client=True))
+            return self._async_client
+
+    def _request(self, messages, max_tokens, temperature, model, extra):
+        request = {
+            "model": model or self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+        request.update(extra)
+        return request
+
+    def _queued(self, purpose, started):
+        """Record how long a call waited for the rate budget"""
+        waited = time.perf_counter() - started
+        LLM_QUEUE_WAIT_SECONDS.observe(waited, purpose=purpose, lane=current_lane())
+        observe_stage("llm_queue_wait", waited)
+
+    def _record(self, purpose, started, response=None, error=None, outcome=None):
+        latency = time.perf_counter() - started
+        usage = getattr(response, "usage", None)
+        outcome = outcome or ("ok" if error is None else "rate_limited" if _is_rate_limit(error) else "error")
+        LLM_REQUEST_SECONDS.observe(latency, purpose=purpose, outcome=outcome)
+        LLM_REQUESTS.inc(purpose=purpose, outcome=outcome)
+        observe_stage("llm_call", latency)
+        if usage is not None:
+            LLM_TOKENS.inc(getattr(usage, "prompt_tokens", 0) or 0, purpose=purpose, kind="prompt")
+            LLM_TOKENS.inc(getattr(usage, "completion_tokens", 0) or 0, purpose=purpose, kind="completion")
+        with self._lock:
+            stats = self._stats.setdefault(purpose, {
+                "calls": 0, "errors": 0, "rate_limited": 0, "cancelled": 0, "latency_seconds": 0.0, "max_latency_seconds": 0.0,
+                "prompt_tokens": 0, "completion_tokens": 0
+            })
+            stats["calls"] += 1
+            if outcome == "cancelled":
+                stats["cancelled"] += 1
+            stats["latency_seconds"] += latency
+            stats["max_latency_seconds"] = max(stats["max_latency_seconds"], latency)
+            if error is not None:
+                stats["errors"] += 1
+                if _is_rate_limit(error):
+                    stats["rate_limited"] += 1
+            if usage is not None:
+                stats["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+                stats["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+
+    def _finish(self, purpose, started, estimated, response):
+        self._record(purpose, started, response)
+        usage = getattr(response, "usage", None)
+        self.scheduler.settle(estimated, getattr(usage, "total_tokens", None) if usage else None)
+        return response.choices[0].message.content
+
+    def _lookup(self, request, purpose):
+        """Recorded answer to replay for this request, or None to call the API"""
+        if self.cassette is None or not self.cassette.replays:
+            return None
+        return self.cassette.lookup(request, purpose)
+
+    async def _alookup(self, request, purpose):
+        # Cassette là SQLite: đọc ở worker thread như DiskCache, không chặn event loop
+        if self.cassette is None or not self.cassette.replays:
+            return None
+        return await asyncio.to_thread(self.cassette.lookup, request, purpose)
+
+    def _save(self, request, purpose, content, usage, latency):
+        if self.cassette is not None and self.cassette.records:
+            self.cassette.record(request, purpose, content, usage, latency)
+
+    async def _asave(self, request, purpose, content, usage, latency):
+        if self.cassette is not None and self.cassette.records:
+            await asyncio.to_thread(self.cassette.record, request, purpose, content, usage, latency)
+
+    def _retry_delay(self, purpose, started, estimated, error, attempt):
+        """Record a failed call and refund its token reservation; return the backoff before retrying it, or None to give up"""
+        self._record(purpose, started, error=error)
+        # Call lỗi không trả usage: hoàn lại token đã giữ, lần retry sẽ giữ lại từ đầu
+        self.scheduler.settle(estimated, 0)
+        delay = min(self.backoff_max, self.backoff_base * 2 ** attempt) * random.uniform(0.5, 1.0)
+        if _is_rate_limit(error):
+            if attempt >= self.rate_limit_retries:
+                return None
+            delay = max(delay, _retry_after(error))
+            # Server đã trả 429: dừng cấp quota cho mọi lane trong khoảng backoff
+            self.scheduler.pause(delay)
+            return delay
+        # Lỗi mạng/5xx: retry tối đa OPENAI_MAX_RETRIES lần, lần sau vẫn phải qua scheduler
+        if _is_transient(error) and attempt < self.max_retries:
+            return delay
+        return None
+
+    def complete(self, messages, max_tokens, temperature=0, model=None, purpose="default", **extra):
+        """Run a chat completion within the rate budget and return the message text"""
+        request = self._request(messages, max_tokens, temperature, model, extra)
+        estimated = estimate_tokens(messages, max_tokens)
+        interaction = self._lookup(request, purpose)
+        if interaction is not None:
+            started = time.perf_counter()
+            time.sleep(self.cassette.delay(interaction))
+            self._record(purpose, started, interaction)
+            return interaction.content
+        attempt = 0
+        while True:
+            queued = time.perf_counter()
+            self.scheduler.acquire(estimated)
+            self._queued(purpose, queued)
+            started = time.perf_counter()
+            try:
+                response = self.sync_client.chat.completions.create(**request)
+            except Exception as e:
+                delay = self._retry_delay(purpose, started, estimated, e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            latency = time.perf_counter() - started
+            content = self._finish(purpose, started, estimated, response)
+            self._save(request, purpose, content, getattr(response, "usage", None), latency)
+            return content
+
+    async def acomplete(self, messages, max_tokens, temperature=0, model=None, purpose="default", **extra):
+        """Run a chat completion on the async client within the rate budget and return the message text"""
+        request = self._request(messages, max_tokens, temperature, model, extra)
+        estimated = estimate_tokens(messages, max_tokens)
+        interaction = await self._alookup(request, purpose)
+        if interaction is not None:
+            started = time.perf_counter()
+            await asyncio.sleep(self.cassette.delay(interaction))
+            self._record(purpose, started, interaction)
+            return interaction.content
+        attempt = 0
+        while True:
+            queued = time.perf_counter()
+            await self.scheduler.acquire_async(estimated)
+            self._queued(purpose, queued)
+            started = time.perf_counter()
+            try:
+                response = await self.async_client.chat.completions.create(**request)
+            except Exception as e:
+                delay = self._retry_delay(purpose, started, estimated, e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            latency = time.perf_counter() - started
+            content = self._finish(purpose, started, estimated, response)
+            await self._asave(request, purpose, content, getattr(response, "usage", None), latency)
+            return content
+
+    async def astream(self, messages, max_tokens, temperature=0, model=None, purpose="default", **extra):
+        """Stream a chat completion on the async client within the rate budget, yielding text deltas"""
+        request = self._request(messages, max_tokens, temperature, model, extra)
+        request["stream"] = True
+        request["stream_options"] = {"include_usage": True}
+        estimated = estimate_tokens(messages, max_tokens)
+        interaction = await self._alookup(request, purpose)
+        if interaction is not None:
+            async for delta in self._replay_stream(purpose, interaction):
+                yield delta
+            return
+        attempt = 0
+        while True:
+            queued = time.perf_counter()
+            await self.scheduler.acquire_async(estimated)
+            self._queued(purpose, queued)
+            started = time.perf_counter()
+            try:
+                stream = await self.async_client.chat.completions.create(**request)
+                break
+            except Exception as e:
+                delay = self._retry_delay(purpose, started, estimated, e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+
+        usage = None
+        parts = []
+        error = None
+        completed = False
+        try:
+            async for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+            completed = True
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            # Client ngắt kết nối (aclose/cancel) vẫn phải được ghi nhận và trả lại budget
+            latency = time.perf_counter() - started
+            outcome = None if completed or error is not None else "cancelled"
+            self._record(purpose, started, SimpleNamespace(usage=usage), error=error, outcome=outcome)
+            self.scheduler.settle(estimated, getattr(usage, "total_tokens", None))
+            await stream.close()
+        await self._asave(request, purpose, "".join(parts), usage, latency)
+
+    async def _replay_stream(self, purpose, interaction, piece_size=32):
+        """Yield a recorded answer in small deltas, spread over the simulated latency"""
+        started = time.perf_counter()
+        content = interaction.content
+        pieces = [content[index:index + piece_size] for index in range(0, len(content), piece_size)]
+        pause = self.cassette.delay(interaction) / len(pieces) if pieces else 0.0
+        for piece in pieces:
+            if pause:
+                await asyncio.sleep(pause)
+            yield piece
+        self._record(purpose, started, interaction)
+
+    def stats(self):
+        """Per-purpose call counts, latency and token usage"""
+        with self._lock:
+            snapshot = {purpose: dict(stats) for purpose, stats in self._stats.items()}
+        for stats in snapshot.values():
+            stats["avg_latency_seconds"] = stats["latency_seconds"] / stats["calls"] if stats["calls"] else 0.0
+        return {
+            "model": self.model,
+            "base_url": self.base_url,
+            "purposes": snapshot,
+            "scheduler": self.scheduler.stats(),
+            "cassette": self.cassette.stats() if self.cassette is not None else None
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {}
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+def get_gateway():
+    """Return the process-wide LLM gateway"""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = LLMGateway()
+        return _gateway
@@ -0,0 +1,298 @@
+import os
+import time
+import uuid
+import asyncio
+import sqlite3
+import threading
+import contextvars
+from contextlib import contextmanager
+from ..utils.file_handler import ensure_directory_exists
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+# Lane của LLM call hiện tại; batch/bulk code đặt "bulk" để nhường quota cho API
+_current_lane = contextvars.ContextVar("llm_lane", default=INTERACTIVE)
+
+def current_lane():
+    return _current_lane.get()
+
+@contextmanager
+def llm_lane(lane):
+    """Run the enclosed LLM calls in the given lane ("interactive" or "bulk")"""
+    token = _current_lane.set(lane)
+    try:
+        yield
+    finally:
+        _current_lane.reset(token)
+
+def estimate_tokens(messages, max_tokens):
+    """Rough token cost of a request: ~4 characters per prompt token plus the completion budget"""
+    chars = sum(len(message.get("content") or "") for message in messages)
+    return chars // 4 + (max_tokens or 0)
+
+class _Bucket:
+    """Token bucket refilled continuously at capacity per minute"""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+
+    def refill(self, elapsed):
+        self.level = min(self.capacity, self.level + elapsed * self.rate)
+
+    def wait_time(self, amount, floor):
+        # Request lớn hơn capacity vẫn được chạy khi bucket đầy, tránh chờ vĩnh viễn
+        amount = min(amount, self.capacity - floor)
+        missing = amount + floor - self.level
+        return missing / self.rate if missing > 0 else 0.0
+
+# Process đang có interactive call chờ quá lâu không cập nhật thì coi như đã chết
+_WAITER_TTL = 5.0
+
+class _SharedState:
+    """Bucket levels, pause and interactive waiters of one API key in a SQLite file
+
+    Every process using the same key reads and updates the same row inside
+    a write transaction, so the budget is shared across processes.
+    """
+
+    def __init__(self, path, key):
+        self.path = path
+        self.key = key
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._local = threading.local()
+        ensure_directory_exists(os.path.dirname(path))
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS budgets ("
+            "key TEXT PRIMARY KEY, requests REAL, tokens REAL, updated_at REAL NOT NULL, "
+            "paused_until REAL NOT NULL DEFAULT 0, rate_limited INTEGER NOT NULL DEFAULT 0)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS waiters ("
+            "key TEXT NOT NULL, owner TEXT NOT NULL, waiting INTEGER NOT NULL, updated_at REAL NOT NULL, "
+            "PRIMARY KEY (key, owner))"
+        )
+
+    def _connect(self):
+        """Return a connection owned by the current thread and process"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+    def set_waiting(self, waiting):
+        with self.transaction() as conn:
+            self.write_waiting(conn, waiting, time.time())
+
+    def write_waiting(self, conn, waiting, now):
+        conn.execute(
+            "INSERT OR REPLACE INTO waiters (key, owner, waiting, updated_at) VALUES (?, ?, ?, ?)",
+            (self.key, self.owner, waiting, now)
+        )
+
+    def others_waiting(self, conn, now):
+        row = conn.execute(
+            "SELECT COALESCE(SUM(waiting), 0) FROM waiters WHERE key = ? AND owner != ? AND updated_at > ?",
+            (self.key, self.owner, now - _WAITER_TTL)
+        ).fetchone()
+        return row[0]
+
+class RateScheduler:
+    """Client-side RPM/TPM budget shared by every LLM call of the process
+
+    Interactive calls go first: bulk calls wait while an interactive call is
+    waiting, and may only draw the buckets down to interactive_reserve of
+    their capacity, so API requests keep some headroom while a batch
+    saturates the rest. A budget of 0 disables that bucket.
+    With shared_path, the bucket levels, 429 pauses and waiting interactive
+    calls live in a SQLite file keyed by key (the API key), so a bulk
+    test_match.py run and the API processes draw from one budget and bulk
+    calls really leave the reserve to the API.
+    """
+
+    def __init__(self, rpm=0, tpm=0, interactive_reserve=0.2, shared_path=None, key="default"):
+        self.requests = _Bucket(rpm) if rpm else None
+        self.tokens = _Bucket(tpm) if tpm else None
+        self.interactive_reserve = interactive_reserve
+        self.shared = _SharedState(shared_path, key) if shared_path and self.enabled else None
+        # Thời gian dùng chung giữa các process phải là wall clock
+        self._clock = time.time if self.shared is not None else time.monotonic
+        self._updated = self._clock()
+        self._paused_until = 0.0
+        self._interactive_waiting = 0
+        self._others_waiting = 0
+        self._lock = threading.Lock()
+        self._stats = {lane: {"calls": 0, "waited": 0, "wait_seconds": 0.0} for lane in (INTERACTIVE, BULK)}
+        self._rate_limited = 0
+
+    @property
+    def enabled(self):
+        return self.requests is not None or self.tokens is not None
+
+    def _refill(self, now):
+        elapsed = max(0.0, now - self._updated)
+        self._updated = now
+        for bucket in (self.requests, self.tokens):
+            if bucket is not None:
+                bucket.refill(elapsed)
+
+    @contextmanager
+    def _state(self):
+        """Hold the lock (and the shared row) while the budget is read and updated, yield now"""
+        with self._lock:
+            now = self._clock()
+            if self.shared is None:
+                self._refill(now)
+                yield now
+                return
+            with self.shared.transaction() as conn:
+                row = conn.execute(
+                    "SELECT requests, tokens, updated_at, paused_until, rate_limited FROM budgets WHERE key = ?",
+                    (self.shared.key,)
+                ).fetchone()
+                if row is not None:
+                    requests, tokens, self._updated, self._paused_until, self._rate_limited = row
+                    if self.requests is not None and requests is not None:
+                        self.requests.level = min(self.requests.capacity, requests)
+                    if self.tokens is not None and tokens is not None:
+                        self.tokens.level = min(self.tokens.capacity, tokens)
+                self._refill(now)
+                self._others_waiting = self.shared.others_waiting(conn, now)
+                yield now
+                conn.execute(
+                    "INSERT OR REPLACE INTO budgets (key, requests, tokens, updated_at, paused_until, rate_limited) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        self.shared.key,
+                        self.requests.level if self.requests is not None else None,
+                        self.tokens.level if self.tokens is not None else None,
+                        self._updated, self._paused_until, self._rate_limited
+                    )
+                )
+                # Làm mới heartbeat của process này khi nó còn interactive call đang chờ
+                if self._interactive_waiting:
+                    self.shared.write_waiting(conn, self._interactive_waiting, now)
+
+    def _try_acquire(self, tokens, lane):
+        """Consume budget and return 0, or return how long to wait before trying again"""
+        with self._state() as now:
+            if now < self._paused_until:
+                return self._paused_until - now
+            if lane != INTERACTIVE and (self._interactive_waiting or self._others_waiting):
+                return 0.05
+            reserve = self.interactive_reserve if lane != INTERACTIVE else 0.0
+            wait = 0.0
+            if self.requests is not None:
+                wait = max(wait, self.requests.wait_time(1, self.requests.capacity * reserve))
+            if self.tokens is not None:
+                wait = max(wait, self.tokens.wait_time(tokens, self.tokens.capacity * reserve))
+            if wait > 0:
+                # Budget dùng chung có thể được process khác trả lại sớm hơn dự tính
+                return min(wait, _WAITER_TTL / 5) if self.shared is not None else wait
+            if self.requests is not None:
+                self.requests.level -= 1
+            if self.tokens is not None:
+                self.tokens.level -= min(tokens, self.tokens.capacity)
+            return 0.0
+
+    def _set_waiting(self, lane, delta):
+        if lane == INTERACTIVE:
+            with self._lock:
+                self._interactive_waiting += delta
+                waiting = self._interactive_waiting
+            if self.shared is not None:
+                self.shared.set_waiting(waiting)
+
+    def _record(self, lane, waited):
+        with self._lock:
+            stats = self._stats.setdefault(lane, {"calls": 0, "waited": 0, "wait_seconds": 0.0})
+            stats["calls"] += 1
+            if waited > 0:
+                stats["waited"] += 1
+                stats["wait_seconds"] += waited
+
+    def acquire(self, tokens, lane=None):
+        """Block the calling thread until the request fits in the budget"""
+        lane = lane or current_lane()
+        if not self.enabled:
+            return self._record(lane, 0.0)
+        started = time.monotonic()
+        wait = self._try_acquire(tokens, lane)
+        if not wait:
+            return self._record(lane, 0.0)
+        self._set_waiting(lane, 1)
+        try:
+            while wait:
+                time.sleep(wait)
+                wait = self._try_acquire(tokens, lane)
+        finally:
+            self._set_waiting(lane, -1)
+        self._record(lane, time.monotonic() - started)
+
+    async def acquire_async(self, tokens, lane=None):
+        """Wait without blocking the event loop until the request fits in the budget"""
+        lane = lane or current_lane()
+        if not self.enabled:
+            return self._record(lane, 0.0)
+        started = time.monotonic()
+        wait = await self._call(self._try_acquire, tokens, lane)
+        if not wait:
+            return self._record(lane, 0.0)
+        await self._call(self._set_waiting, lane, 1)
+        try:
+            while wait:
+                await asyncio.sleep(wait)
+                wait = await self._call(self._try_acquire, tokens, lane)
+        finally:
+            await self._call(self._set_waiting, lane, -1)
+        self._record(lane, time.monotonic() - started)
+
+    async def _call(self, func, *args):
+        # Budget dùng chung nằm trong SQLite: đọc/ghi ở worker thread để không chặn event loop
+        if self.shared is not None:
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
+
+    def settle(self, estimated, actual):
+        """Correct the token bucket once the real usage of a call is known"""
+        if self.tokens is None or actual is None:
+            return
+        with self._state():
+            self.tokens.level = min(self.tokens.capacity, self.tokens.level + estimated - actual)
+
+    def pause(self, seconds):
+        """Stop handing out budget for a while, e.g. after the server answered 429"""
+        with self._state() as now:
+            self._rate_limited += 1
+            self._paused_until = max(self._paused_until, now + seconds)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rpm": self.requests.capacity if self.requests else None,
+                "tpm": self.tokens.capacity if self.tokens else None,
+                "interactive_reserve": self.interactive_reserve,
+                "shared_path": self.shared.path if self.shared is not None else None,
+                "rate_limited": self._rate_limited,
+                "lanes": {lane: dict(stats) for lane, stats in self._stats.items()}
+            }
@@ -1,6 +1,22 @@
 """
 Matching module for CV-JD comparison
 """
-from .matching_engine import MatchingCV
+import importlib
+from .matching_engine import MatchingCV, AsyncMatchingCV
+from .batch import match_batch
+from .weights import FEATURE_WEIGHTS, FEATURES
 
-__all__ = ['MatchingCV']
\ No newline at end of file
+# Các module dùng NumPy chỉ import khi được dùng lần đầu, để API khởi động nhanh
+_LAZY_EXPORTS = {
+    'LocalScorer': '.local_scorer',
+    'ShortlistIndex': '.shortlist',
+    'rerank_results': '.rerank'
+}
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        return getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+__all__ = ['MatchingCV', 'AsyncMatchingCV', 'match_batch', 'FEATURE_WEIGHTS', 'FEATURES',
+           'LocalScorer', 'ShortlistIndex', 'rerank_results']
@@ -0,0 +1,141 @@
+import asyncio
+from ..llm.scheduler import llm_lane, BULK
+
+def _chunks(items, size):
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+def _final_score(matching_result):
+    """Return the final score of a result as float, or None if missing"""
+    try:
+        return float(matching_result.get("final_matching_score"))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+async def match_batch(matching_cv, cv_infos, jd_texts, concurrency=8, cv_errors=None, weight_profile=None,
+                      lean=None, justify_top=0, pack_size=0):
+    """Score every CV against every JD with at most `concurrency` LLM calls in flight
+
+    cv_infos maps CV name -> extracted CV JSON, jd_texts maps JD name -> JD text.
+    cv_errors maps CV name -> error message for CVs whose extraction failed; their
+    pairs are reported as failed instead of being scored. A failing pair never
+    fails the batch. Final scores use weight_profile, or the profile assigned
+    to each JD name. LLM calls run in the bulk lane of the rate scheduler.
+    With lean=True only the scores are generated; justify_top then adds
+    justifications to the best justify_top CVs of each JD after ranking.
+    With pack_size > 1 each CV is scored against up to pack_size JDs per call.
+    """
+    cv_errors = cv_errors or {}
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def score_pair(cv_name, jd_name):
+        if cv_name in cv_errors:
+            return cv_name, jd_name, None, cv_errors[cv_name]
+        async with semaphore:
+            try:
+                with llm_lane(BULK):
+                    matching_result = await matching_cv.calculate_matching_score(
+                        cv_infos[cv_name], jd_texts[jd_name], weight_profile=weight_profile, jd_name=jd_name, lean=lean,
+                        cv_name=cv_name
+                    )
+            except Exception as e:
+                return cv_name, jd_name, None, str(e)
+        if not matching_result:
+            return cv_name, jd_name, None, "Failed to calculate matching score"
+        return cv_name, jd_name, matching_result, None
+
+    async def score_group(cv_name, jd_names):
+        if cv_name in cv_errors:
+            return [(cv_name, jd_name, None, cv_errors[cv_name]) for jd_name in jd_names]
+        async with semaphore:
+            try:
+                with llm_lane(BULK):
+                    matching_results = await matching_cv.calculate_packed_scores(
+                        cv_infos[cv_name], {jd_name: jd_texts[jd_name] for jd_name in jd_names},
+                        weight_profile=weight_profile, lean=lean, pack_size=len(jd_names), cv_name=cv_name
+                    )
+            except Exception as e:
+                return [(cv_name, jd_name, None, str(e)) for jd_name in jd_names]
+        return [
+            (cv_name, jd_name, matching_results[jd_name], None) if matching_results.get(jd_name)
+            else (cv_name, jd_name, None, "Failed to calculate matching score")
+            for jd_name in jd_names
+        ]
+
+    cv_names = list(cv_infos) + [name for name in cv_errors if name not in cv_infos]
+    if pack_size > 1:
+        groups = await asyncio.gather(*[
+            score_group(cv_name, jd_names) for cv_name in cv_names for jd_names in _chunks(list(jd_texts), pack_size)
+        ])
+        pairs = [pair for group in groups for pair in group]
+    else:
+        pairs = await asyncio.gather(*[
+            score_pair(cv_name, jd_name) for cv_name in cv_names for jd_name in jd_texts
+        ])
+    batch_result = build_ranked_matrix(cv_names, list(jd_texts), pairs)
+    if justify_top:
+        await justify_top_results(matching_cv, batch_result, cv_infos, jd_texts, justify_top, semaphore)
+    return batch_result
+
+def top_results_by_jd(batch_result, top_k):
+    """The top_k scored results of each JD, best first"""
+    top = {}
+    for item in batch_result["results"]:
+        if item["final_matching_score"] is None:
+            continue
+        ranked = top.setdefault(item["jd_name"], [])
+        if len(ranked) < top_k:
+            ranked.append(item)
+    return top
+
+async def justify_top_results(matching_cv, batch_result, cv_infos, jd_texts, top_k, semaphore):
+    """Add justifications to the top_k results of each JD of a ranked batch (in place)"""
+    async def justify(item):
+        async with semaphore:
+            with llm_lane(BULK):
+                await matching_cv.justify(cv_infos[item["cv_name"]], jd_texts[item["jd_name"]], item["matching_result"])
+        # Cập nhật bản ghi leaderboard với justification vừa thêm
+        await matching_cv.record(
+            item["matching_result"], cv_infos[item["cv_name"]], jd_texts[item["jd_name"]], item["cv_name"], item["jd_name"]
+        )
+
+    items = [item for ranked in top_results_by_jd(batch_result, top_k).values() for item in ranked]
+    await asyncio.gather(*[justify(item) for item in items])
+
+def build_ranked_matrix(cv_names, jd_names, pairs):
+    """Arrange pair results into a score matrix plus per-CV and per-JD rankings"""
+    matrix = {cv_name: {jd_name: None for jd_name in jd_names} for cv_name in cv_names}
+    results = []
+    errors = []
+
+    for cv_name, jd_name, matching_result, error in pairs:
+        if error:
+            errors.append({"cv_name": cv_name, "jd_name": jd_name, "error": error})
+            continue
+        score = _final_score(matching_result)
+        matrix[cv_name][jd_name] = score
+        results.append({
+            "cv_name": cv_name,
+            "jd_name": jd_name,
+            "final_matching_score": score,
+            "matching_result": matching_result
+        })
+
+    # Xếp hạng theo điểm giảm dần, cặp không có điểm xuống cuối
+    results.sort(key=lambda item: (item["final_matching_score"] is None, -(item["final_matching_score"] or 0)))
+
+    rankings_by_cv = {cv_name: [] for cv_name in cv_names}
+    rankings_by_jd = {jd_name: [] for jd_name in jd_names}
+    for item in results:
+        rankings_by_cv[item["cv_name"]].append({"jd_name": item["jd_name"], "final_matching_score": item["final_matching_score"]})
+        rankings_by_jd[item["jd_name"]].append({"cv_name": item["cv_name"], "final_matching_score": item["final_matching_score"]})
+
+    return {
+        "total_pairs": len(pairs),
+        "succeeded": len(results),
+        "failed": len(errors),
+        "matrix": matrix,
+        "rankings_by_cv": rankings_by_cv,
+        "rankings_by_jd": rankings_by_jd,
+        "results": results,
+        "errors": errors
+    }
@@ -0,0 +1,254 @@
+import re
+import threading
+import numpy as np
+from .weights import FEATURE_WEIGHTS, FEATURES
+
+# Thứ bậc học vấn, số lớn hơn là cao hơn
+EDUCATION_LEVELS = [
+    (4, re.compile(r"\b(ph\.?\s?d|doctor(ate)?)\b")),
+    (3, re.compile(r"\b(master'?s?|m\.?\s?sc?\b|m\.?\s?s\b|mba)")),
+    (2, re.compile(r"\b(bachelor'?s?|b\.?\s?sc?\b|b\.?\s?s\b|b\.?\s?a\b|undergraduate|engineer'?s degree)")),
+    (1, re.compile(r"\b(associate'?s?|diploma|college)\b")),
+]
+
+LANGUAGES = (
+    "english", "vietnamese", "french", "german", "spanish", "japanese", "korean",
+    "chinese", "mandarin", "cantonese", "italian", "portuguese", "russian", "arabic", "thai", "hindi"
+)
+
+YEARS_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*\+?\s*(?:years?|yrs?)", re.IGNORECASE)
+NUMBER_PATTERN = re.compile(r"\d+(?:\.\d+)?")
+TERM_SPLIT_PATTERN = re.compile(r"[,;\n|•:]+|\s+-\s+")
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#./-]*")
+MAX_NGRAM = 4
+
+SKILL_CATEGORIES = {
+    "hard": ("prof_skill_advanced", "prof_skill_basic"),
+    "soft": ("soft_skill",),
+    "certs": ("certs",)
+}
+
+def flatten_values(value):
+    """Yield the string leaves of an extracted CV field"""
+    if isinstance(value, dict):
+        for item in value.values():
+            yield from flatten_values(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from flatten_values(item)
+    elif value not in (None, 0, "0", ""):
+        yield str(value)
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+def _normalize_term(term):
+    return " ".join(tokenize(term))
+
+def extract_terms(value):
+    """Split an extracted field (list, comma separated text, dict...) into normalized terms"""
+    terms = set()
+    for text in flatten_values(value):
+        for part in TERM_SPLIT_PATTERN.split(text):
+            term = _normalize_term(part)
+            if term and len(term.split()) <= MAX_NGRAM:
+                terms.add(term)
+    return terms
+
+def _text_ngrams(text):
+    """All 1..MAX_NGRAM token n-grams of a text"""
+    tokens = tokenize(text)
+    ngrams = set()
+    for size in range(1, MAX_NGRAM + 1):
+        for start in range(len(tokens) - size + 1):
+            ngrams.add(" ".join(tokens[start:start + size]))
+    return ngrams
+
+def cv_experience_years(cv_info):
+    """Best-effort total years of experience from exp_years or the exp section"""
+    value = cv_info.get("exp_years")
+    if value not in (None, ""):
+        match = NUMBER_PATTERN.search(str(value))
+        if match:
+            return float(match.group())
+    # exp dạng {"role": "7 years"} hoặc text: cộng số năm của từng vai trò
+    years = [float(match) for text in flatten_values(cv_info.get("exp")) for match in YEARS_PATTERN.findall(text)]
+    return sum(years)
+
+def jd_required_years(jd_text):
+    """Largest "N+ years" requirement in the JD, or 0 if none"""
+    years = [float(match) for match in YEARS_PATTERN.findall(jd_text)]
+    return max(years) if years else 0.0
+
+def education_level(text, lowest=False):
+    """Highest (or lowest) education level mentioned in text, 0 if none"""
+    text = text.lower()
+    levels = [level for level, pattern in EDUCATION_LEVELS if pattern.search(text)]
+    if not levels:
+        return 0
+    return min(levels) if lowest else max(levels)
+
+def _languages(text):
+    text = text.lower()
+    return {language for language in LANGUAGES if re.search(rf"\b{language}\b", text)}
+
+class LocalScorer:
+    """Deterministic, offline approximation of the LLM matching score
+
+    Skill features are scored as the share of the JD's recognised skill terms
+    covered by the CV, where a term is recognised if it appears in the skill
+    lexicon learned with fit() or in one of the CVs being scored. Experience,
+    education and language use simple rules, and features that need judgement
+    (achievements, projects, activities) get a neutral score. Scores are
+    computed as NumPy matrices over all CVs x JDs at once.
+    """
+
+    def __init__(self, weights=None, neutral_score=50.0):
+        self.weights = dict(weights or FEATURE_WEIGHTS)
+        self.neutral_score = neutral_score
+        # Từ điển skill học từ các CV đã extract, dùng để nhận ra yêu cầu trong JD
+        self.lexicon = {category: set() for category in SKILL_CATEGORIES}
+        self._lock = threading.Lock()
+
+    def fit(self, cv_infos):
+        """Add the skill terms of extracted CVs to the lexicon used to read JD requirements"""
+        with self._lock:
+            for cv_info in cv_infos:
+                for category, fields in SKILL_CATEGORIES.items():
+                    for field in fields:
+                        self.lexicon[category] |= extract_terms(cv_info.get(field))
+        return self
+
+    def _skill_matrices(self, cv_infos, jd_texts):
+        """Binary CV x term and JD x term matrices plus per-category term masks
+
+        Only terms that occur in at least one JD are kept, so the matrices stay
+        small however many CVs are scored.
+        """
+        jd_ngrams = [_text_ngrams(text) for text in jd_texts]
+        all_jd_ngrams = set().union(*jd_ngrams) if jd_ngrams else set()
+
+        fields = [field for category_fields in SKILL_CATEGORIES.values() for field in category_fields]
+        cv_terms = [{field: extract_terms(cv_info.get(field)) & all_jd_ngrams for field in fields} for cv_info in cv_infos]
+
+        with self._lock:
+            lexicon = {category: terms & all_jd_ngrams for category, terms in self.lexicon.items()}
+        for terms in cv_terms:
+            for category, category_fields in SKILL_CATEGORIES.items():
+                for field in category_fields:
+                    lexicon[category] |= terms[field]
+
+        vocabulary = {}
+        for category in SKILL_CATEGORIES:
+            for term in sorted(lexicon[category]):
+                vocabulary.setdefault(term, len(vocabulary))
+
+        size = max(1, len(vocabulary))
+        cv_matrices = {field: np.zeros((len(cv_infos), size), dtype=np.float32) for field in fields}
+        for row, terms in enumerate(cv_terms):
+            for field, field_terms in terms.items():
+                cv_matrices[field][row, [vocabulary[term] for term in field_terms]] = 1.0
+
+        jd_matrix = np.zeros((len(jd_texts), size), dtype=np.float32)
+        for row, ngrams in enumerate(jd_ngrams):
+            jd_matrix[row, [vocabulary[term] for term in ngrams if term in vocabulary]] = 1.0
+
+        masks = {}
+        for category in SKILL_CATEGORIES:
+            masks[category] = np.zeros(size, dtype=np.float32)
+            masks[category][[vocabulary[term] for term in lexicon[category]]] = 1.0
+        return cv_matrices, jd_matrix, masks
+
+    def _coverage(self, cv_matrix, jd_matrix, term_mask):
+        """Percentage of each JD's masked terms covered by each CV"""
+        required = jd_matrix * term_mask
+        matched = cv_matrix @ required.T
+        total = required.sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            coverage = np.where(total > 0, 100.0 * matched / np.maximum(total, 1.0), self.neutral_score)
+        return np.clip(coverage, 0.0, 100.0)
+
+    def feature_matrix(self, cv_infos, jd_texts):
+        """Return a (n_cv, n_jd, n_features) array of 0-100 feature scores in FEATURES order"""
+        n_cv, n_jd = len(cv_infos), len(jd_texts)
+        features = np.full((n_cv, n_jd, len(FEATURES)), self.neutral_score, dtype=np.float32)
+        if n_cv == 0 or n_jd == 0:
+            return features
+        index = {feature: position for position, feature in enumerate(FEATURES)}
+
+        # Skills
+        cv_matrices, jd_matrix, masks = self._skill_matrices(cv_infos, jd_texts)
+        hard_all = np.clip(cv_matrices["prof_skill_advanced"] + cv_matrices["prof_skill_basic"], 0, 1)
+        features[:, :, index["prof_skill_advanced"]] = self._coverage(cv_matrices["prof_skill_advanced"], jd_matrix, masks["hard"])
+        features[:, :, index["prof_skill_basic"]] = self._coverage(hard_all, jd_matrix, masks["hard"])
+        features[:, :, index["soft_skill"]] = self._coverage(cv_matrices["soft_skill"], jd_matrix, masks["soft"])
+        features[:, :, index["certs"]] = self._coverage(cv_matrices["certs"], jd_matrix, masks["certs"])
+
+        # Experience: tỉ lệ số năm so với yêu cầu "N+ years"
+        cv_years = np.array([cv_experience_years(cv_info) for cv_info in cv_infos], dtype=np.float32)
+        jd_years = np.array([jd_required_years(text) for text in jd_texts], dtype=np.float32)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            exp = np.where(jd_years[None, :] > 0, 100.0 * cv_years[:, None] / np.maximum(jd_years[None, :], 1e-6), 100.0)
+        features[:, :, index["exp_years"]] = np.clip(exp, 0.0, 100.0)
+
+        # Education: đạt mức yêu cầu thấp nhất JD chấp nhận thì 100
+        cv_levels = np.array([education_level(" ".join(flatten_values(cv_info.get("education")))) for cv_info in cv_infos], dtype=np.float32)
+        jd_levels = np.array([education_level(text, lowest=True) for text in jd_texts], dtype=np.float32)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            education = np.where(jd_levels[None, :] > 0, 100.0 * cv_levels[:, None] / np.maximum(jd_levels[None, :], 1.0), 100.0)
+        features[:, :, index["education"]] = np.clip(education, 0.0, 100.0)
+
+        # Language: JD không yêu cầu ngôn ngữ thì mặc định 100, giống MATCHING_PROMPT
+        cv_languages = [_languages(" ".join(flatten_values(cv_info.get("language")))) for cv_info in cv_infos]
+        jd_languages = [_languages(text) for text in jd_texts]
+        language_list = sorted(set().union(*jd_languages)) if jd_languages else []
+        if language_list:
+            cv_lang = np.array([[language in langs for language in language_list] for langs in cv_languages], dtype=np.float32)
+            jd_lang = np.array([[language in langs for language in language_list] for langs in jd_languages], dtype=np.float32)
+            features[:, :, index["language"]] = self._coverage(cv_lang, jd_lang, np.ones(len(language_list), dtype=np.float32))
+            features[:, jd_lang.sum(axis=1) == 0, index["language"]] = 100.0
+        else:
+            features[:, :, index["language"]] = 100.0
+
+        return features
+
+    def weight_vector(self):
+        return np.array([self.weights.get(feature, 0.0) for feature in FEATURES], dtype=np.float32)
+
+    def score_matrix(self, cv_infos, jd_texts):
+        """Score every CV against every JD
+
+        cv_infos and jd_texts may be dicts (name -> value) or lists. Returns a dict
+        with cv_names, jd_names, the (n_cv, n_jd) final score matrix and the
+        (n_cv, n_jd, n_features) feature matrix.
+        """
+        cv_names = list(cv_infos) if isinstance(cv_infos, dict) else list(range(len(cv_infos)))
+        jd_names = list(jd_texts) if isinstance(jd_texts, dict) else list(range(len(jd_texts)))
+        cv_values = list(cv_infos.values()) if isinstance(cv_infos, dict) else list(cv_infos)
+        jd_values = list(jd_texts.values()) if isinstance(jd_texts, dict) else list(jd_texts)
+
+        features = self.feature_matrix(cv_values, jd_values)
+        final = features @ self.weight_vector()
+        return {
+            "cv_names": cv_names,
+            "jd_names": jd_names,
+            "feature_names": list(FEATURES),
+            "features": features,
+            "final": final
+        }
+
+    def to_matching_result(self, feature_scores, final_score):
+        """Build a result in the same shape as the LLM matching output"""
+        return {
+            "scores": {
+                feature: {"score": round(float(score), 1), "justification": "Local estimate (no LLM call)"}
+                for feature, score in zip(FEATURES, feature_scores)
+            },
+            "final_matching_score": round(float(final_score), 1),
+            "source": "local"
+        }
+
+    def score_pair(self, cv_info, jd_text):
+        """Score a single CV/JD pair, returning a matching result dict"""
+        matrix = self.score_matrix([cv_info], [jd_text])
+        return self.to_matching_result(matrix["features"][0, 0], matrix["final"][0, 0])
@@ -1,59 +1,434 @@
-import os
+import logging
 import json
-import openai
-from dotenv import load_dotenv
-from ..utils.file_handler import ensure_directory_exists
+import asyncio
+from config.settings import Config
+from ..utils.file_handler import file_stem, save_json_file
+from ..utils.cache import content_hash, get_match_cache
 from ..utils import prompt
+from ..utils.singleflight import get_singleflight
+from ..utils.metrics import timed
+from ..llm.gateway import get_gateway
+from .streaming import ScoreStreamParser
+from .weights import FEATURES, FEATURE_WEIGHTS, feature_score, resolve_weight_profile, compute_final_score
 
-# Load environment variables
-load_dotenv()
+logger = logging.getLogger(__name__)
+
+def canonical_cv_json(cv_json):
+    """Serialize CV JSON deterministically so equal CVs produce equal keys"""
+    return json.dumps(cv_json, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+def normalize_jd_text(jd_text):
+    """Collapse whitespace so formatting-only JD edits hit the same cache entry"""
+    return " ".join(jd_text.split())
+
+def _chunks(items, size):
+    return [items[start:start + size] for start in range(0, len(items), size)]
 
 class MatchingCV:
-    def __init__(self):
-        self.client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        
+    def __init__(self, use_cache=None, gateway=None, lean=False, leaderboard=None):
+        # Gateway dùng chung connection pool, cấu hình model và thống kê token
+        self.gateway = gateway or get_gateway()
+        self.model = self.gateway.model
+
         # Template để matching CV với JD
         self.matching_template = prompt.MATCHING_PROMPT
+        self.prompt_version = prompt.prompt_version(self.matching_template)
 
-    def calculate_matching_score(self, cv_json, jd_text):
-        """Tính toán matching score giữa CV và JD"""
-        try:
-            # Format prompt với CV JSON và JD text
-            prompt = self.matching_template.format(
-                CV_JSON_HERE=json.dumps(cv_json, ensure_ascii=False),
-                JD_TEXT_HERE=jd_text
+        # Lean mode: prompt chỉ trả điểm số, justification lấy sau khi cần
+        self.lean = lean
+        self.lean_template = prompt.MATCHING_SCORES_PROMPT
+        self.lean_prompt_version = prompt.prompt_version(self.lean_template)
+        self.justify_template = prompt.MATCHING_JUSTIFY_PROMPT
+        self.justify_prompt_version = prompt.prompt_version(self.justify_template)
+
+        # Packed mode: một CV với nhiều JD trong một call
+        self.packed_template = prompt.MATCHING_PACKED_PROMPT
+        self.packed_prompt_version = prompt.prompt_version(self.packed_template)
+        self.packed_lean_template = prompt.MATCHING_PACKED_SCORES_PROMPT
+        self.packed_lean_prompt_version = prompt.prompt_version(self.packed_lean_template)
+
+        # Memoize kết quả matching (LRU trong process + SQLite trên disk)
+        if use_cache is None:
+            use_cache = Config.MATCH_CACHE_ENABLED
+        self.cache = get_match_cache() if use_cache else None
+
+        # Gộp các request matching trùng CV/JD đang chạy đồng thời thành một LLM call
+        self.inflight = get_singleflight("matching")
+
+        # Results store nhận mọi kết quả có cv_name/jd_name, làm leaderboard theo JD và theo CV
+        self.leaderboard = leaderboard
+
+    def _use_lean(self, lean):
+        return self.lean if lean is None else lean
+
+    def cache_key(self, cv_json, jd_text, lean=False):
+        """Cache key from canonical CV JSON, normalized JD, prompt version and model"""
+        return content_hash(
+            canonical_cv_json(cv_json), normalize_jd_text(jd_text),
+            self.lean_prompt_version if lean else self.prompt_version, self.model
+        )
+
+    def packed_cache_key(self, cv_json, jd_text, lean=False):
+        """Cache key of a pair scored inside a packed multi-JD call"""
+        return content_hash(
+            canonical_cv_json(cv_json), normalize_jd_text(jd_text),
+            self.packed_lean_prompt_version if lean else self.packed_prompt_version, self.model
+        )
+
+    def justification_key(self, cv_json, jd_text, scores):
+        """Cache key of the justifications for a set of lean scores"""
+        return content_hash(
+            canonical_cv_json(cv_json), normalize_jd_text(jd_text),
+            json.dumps(scores, sort_keys=True), self.justify_prompt_version, self.model
+        )
+
+    def invalidate_cache(self):
+        """Remove cached results produced by other prompt versions"""
+        if self.cache is None:
+            return 0
+        removed = self.cache.purge_tags((
+            self.prompt_version, self.lean_prompt_version, self.justify_prompt_version,
+            self.packed_prompt_version, self.packed_lean_prompt_version
+        ))
+        logger.info("Removed stale matching results from cache", extra={"removed": removed})
+        return removed
+
+    @timed("prompt_build")
+    def _build_request(self, cv_json, jd_text, lean=False):
+        """Build chat completion arguments for a CV/JD pair"""
+        # Format prompt với CV JSON và JD text
+        template = self.lean_template if lean else self.matching_template
+        prompt = template.format(
+            CV_JSON_HERE=json.dumps(cv_json, ensure_ascii=False),
+            JD_TEXT_HERE=jd_text
+        )
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": "You are an expert recruiter AI. Always respond with valid JSON only. No additional text or formatting."},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0,
+            "max_tokens": Config.MATCH_LEAN_MAX_TOKENS if lean else 3000,
+            "purpose": "matching_lean" if lean else "matching"
+        }
+
+    @timed("prompt_build")
+    def _build_justify_request(self, cv_json, jd_text, scores):
+        """Build chat completion arguments asking to justify existing scores"""
+        prompt = self.justify_template.format(
+            CV_JSON_HERE=json.dumps(cv_json, ensure_ascii=False),
+            JD_TEXT_HERE=jd_text,
+            SCORES_HERE=json.dumps(scores)
+        )
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": "You are an expert recruiter AI. Always respond with valid JSON only. No additional text or formatting."},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0,
+            "max_tokens": 2000,
+            "purpose": "justification"
+        }
+
+    @timed("prompt_build")
+    def _build_packed_request(self, cv_json, jd_texts, lean=False):
+        """Build chat completion arguments scoring one CV against a list of JDs"""
+        jd_ids = [f"JD_{index}" for index in range(1, len(jd_texts) + 1)]
+        template = self.packed_lean_template if lean else self.packed_template
+        prompt = template.format(
+            CV_JSON_HERE=json.dumps(cv_json, ensure_ascii=False),
+            JDS_HERE="\n\n".join(f"#### {jd_id}\n{jd_text}" for jd_id, jd_text in zip(jd_ids, jd_texts)),
+            JD_IDS_HERE=", ".join(jd_ids)
+        )
+        per_jd_tokens = Config.MATCH_LEAN_MAX_TOKENS if lean else Config.MATCH_PACKED_TOKENS_PER_JD
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": "You are an expert recruiter AI. Always respond with valid JSON only. No additional text or formatting."},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0,
+            "max_tokens": per_jd_tokens * len(jd_texts),
+            "purpose": "matching_packed_lean" if lean else "matching_packed"
+        }
+
+    def _valid_block(self, block, lean):
+        """True when a JD block of a packed response has a 0-100 score for every feature"""
+        scores = block.get("scores") if isinstance(block, dict) else None
+        if not isinstance(scores, dict):
+            return False
+        for feature in FEATURES:
+            score_info = scores.get(feature)
+            if not lean and not isinstance(score_info, dict):
+                return False
+            score = score_info.get("score") if isinstance(score_info, dict) else score_info
+            if isinstance(score, bool) or not isinstance(score, (int, float)) or not 0 <= score <= 100:
+                return False
+        return True
+
+    def _split_packed(self, response, count, lean):
+        """Split a packed response into per-JD results, None for missing or malformed blocks"""
+        blocks = response.get("results") if isinstance(response, dict) else None
+        if not isinstance(blocks, dict):
+            return [None] * count
+        results = []
+        for index in range(1, count + 1):
+            block = blocks.get(f"JD_{index}")
+            if not self._valid_block(block, lean):
+                results.append(None)
+            elif lean:
+                results.append(self._expand_lean_result(block))
+            else:
+                results.append({"scores": block["scores"]})
+        return results
+
+    def _expand_lean_result(self, result):
+        """Turn {"scores": {feature: number}} into the regular {"scores": {feature: {"score": n}}} shape"""
+        scores = result.get("scores", result) if isinstance(result, dict) else {}
+        return {
+            "scores": {feature: value if isinstance(value, dict) else {"score": value} for feature, value in scores.items()},
+            "mode": "lean"
+        }
+
+    def needs_justification(self, matching_result):
+        """True when some feature score of the result has no justification yet"""
+        scores = (matching_result or {}).get("scores", {})
+        return any(isinstance(info, dict) and not info.get("justification") for info in scores.values())
+
+    def _lean_scores(self, matching_result):
+        return {feature: feature_score(info) for feature, info in matching_result.get("scores", {}).items()}
+
+    def _merge_justifications(self, matching_result, justifications):
+        for feature, justification in (justifications or {}).items():
+            score_info = matching_result.get("scores", {}).get(feature)
+            if isinstance(score_info, dict):
+                score_info["justification"] = justification
+        return matching_result
+
+    @timed("json_parse")
+    def _parse_response(self, result_text):
+        """Clean up markdown fences and parse the JSON response"""
+        if result_text.startswith('```json'):
+            result_text = result_text.replace('```json', '').replace('```', '').strip()
+        elif result_text.startswith('```'):
+            result_text = result_text.replace('```', '').strip()
+        return json.loads(result_text)
+
+    def apply_weights(self, matching_result, weight_profile=None, jd_name=None, tenant=None):
+        """Compute final_matching_score locally from the per-feature scores"""
+        if matching_result is None:
+            return None
+        profile_name, weights = resolve_weight_profile(weight_profile, jd_name, tenant)
+        matching_result["final_matching_score"] = compute_final_score(matching_result.get("scores", {}), weights)
+        matching_result["weight_profile"] = profile_name
+        return matching_result
+
+    @staticmethod
+    def pair_ids(cv_json, jd_text):
+        """Leaderboard ids of a CV and a JD, derived from their content like the cache keys"""
+        return (
+            "cv_" + content_hash(canonical_cv_json(cv_json))[:16],
+            "jd_" + content_hash(normalize_jd_text(jd_text))[:16]
+        )
+
+    def assign_ids(self, matching_result, cv_json, jd_text):
+        """Set the content ids (pair_ids) on a result and return them"""
+        cv_id, jd_id = self.pair_ids(cv_json, jd_text)
+        matching_result["cv_id"] = cv_id
+        matching_result["jd_id"] = jd_id
+        return cv_id, jd_id
+
+    def _leaderboard_row(self, matching_result, cv_json, jd_text, cv_name, jd_name):
+        """Add cv_id/jd_id to the result and return (cv_id, jd_id, stored result)"""
+        cv_id, jd_id = self.assign_ids(matching_result, cv_json, jd_text)
+        # Tên file chỉ để hiển thị: hai ứng viên cùng upload "CV.pdf" vẫn là hai dòng khác nhau
+        return cv_id, jd_id, {**matching_result, "cv_name": cv_name or cv_id, "jd_name": jd_name or jd_id}
+
+    def record(self, matching_result, cv_json, jd_text, cv_name=None, jd_name=None):
+        """Set the content ids of a weighted result and upsert it into the leaderboards of its CV and JD
+
+        Rows are keyed by content ids (pair_ids) in the API and in bulk runs
+        alike, so uploads sharing a file name never overwrite each other and
+        every result of a JD lands in one leaderboard; cv_name/jd_name are
+        display names.
+        """
+        if not matching_result:
+            return matching_result
+        if self.leaderboard is not None:
+            self.leaderboard.save_result(*self._leaderboard_row(matching_result, cv_json, jd_text, cv_name, jd_name))
+        else:
+            self.assign_ids(matching_result, cv_json, jd_text)
+        return matching_result
+
+    def calculate_matching_score(self, cv_json, jd_text, weight_profile=None, jd_name=None, tenant=None, lean=None,
+                                 cv_name=None):
+        """Tính toán matching score giữa CV và JD
+
+        The LLM only scores the features; the final score is the weighted sum
+        for the profile chosen by weight_profile, jd_name or tenant. In lean
+        mode (lean=True, or the instance default) only the numbers are
+        generated; use justify() to add justifications later. With a
+        leaderboard store, the result is recorded under pair_ids() with
+        cv_name/jd_name as display names.
+        """
+        lean = self._use_lean(lean)
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache_key(cv_json, jd_text, lean)
+            matching_result = self.cache.get(cache_key)
+            if matching_result is not None:
+                return self.record(
+                    self.apply_weights(matching_result, weight_profile, jd_name, tenant), cv_json, jd_text, cv_name, jd_name
+                )
+
+        matching_result = self.inflight.do(
+            cache_key or self.cache_key(cv_json, jd_text, lean), self._score_and_store, cv_json, jd_text, cache_key, lean
+        )
+        return self.record(
+            self.apply_weights(matching_result, weight_profile, jd_name, tenant), cv_json, jd_text, cv_name, jd_name
+        )
+
+    def _score_and_store(self, cv_json, jd_text, cache_key, lean=False):
+        """Score a pair with the LLM (or the local fallback) and cache LLM results"""
+        matching_result = self._score(cv_json, jd_text, lean)
+        if matching_result is None:
+            return self._local_fallback(cv_json, jd_text)
+        if cache_key is not None:
+            self.cache.set(cache_key, matching_result, tag=self.lean_prompt_version if lean else self.prompt_version)
+        return matching_result
+
+    def justify(self, cv_json, jd_text, matching_result):
+        """Add justifications to a lean matching result in place (one cached LLM call)"""
+        if not self.needs_justification(matching_result):
+            return matching_result
+        scores = self._lean_scores(matching_result)
+        cache_key = self.justification_key(cv_json, jd_text, scores) if self.cache is not None else None
+        justifications = self.cache.get(cache_key) if cache_key else None
+        if justifications is None:
+            result_text = None
+            try:
+                result_text = self.gateway.complete(**self._build_justify_request(cv_json, jd_text, scores))
+                justifications = self._parse_response(result_text).get("justifications")
+            except json.JSONDecodeError as e:
+                logger.error("Error parsing JSON", extra={"error": str(e), "raw_response": result_text})
+                return matching_result
+            except Exception as e:
+                logger.error("Error generating justifications", extra={"error": str(e)})
+                return matching_result
+            if justifications and cache_key:
+                self.cache.set(cache_key, justifications, tag=self.justify_prompt_version)
+        return self._merge_justifications(matching_result, justifications)
+
+    def calculate_packed_scores(self, cv_json, jd_texts, weight_profile=None, tenant=None, lean=None, pack_size=None,
+                                cv_name=None):
+        """Score one CV against several JDs, packing up to pack_size JDs in one LLM call
+
+        jd_texts maps JD name -> JD text; returns JD name -> matching result in
+        the same format as calculate_matching_score. The CV JSON is sent once
+        per group instead of once per JD. Cached pairs are not sent again, and
+        a JD whose block of the packed response is missing or malformed is
+        scored with a single-pair call instead.
+        """
+        lean = self._use_lean(lean)
+        pack_size = max(1, pack_size if pack_size is not None else Config.MATCH_PACK_SIZE)
+        results = {}
+        pending = []
+        for jd_name, jd_text in jd_texts.items():
+            matching_result = self._cached_pair(cv_json, jd_text, lean)
+            if matching_result is None:
+                pending.append(jd_name)
+            else:
+                results[jd_name] = matching_result
+
+        for group in _chunks(pending, pack_size):
+            results.update(self._score_packed_group(cv_json, {jd_name: jd_texts[jd_name] for jd_name in group}, lean))
+        return {
+            jd_name: self.record(
+                self.apply_weights(results[jd_name], weight_profile, jd_name, tenant), cv_json, jd_texts[jd_name], cv_name, jd_name
             )
-            
+            for jd_name in jd_texts
+        }
+
+    def _cached_pair(self, cv_json, jd_text, lean):
+        """Cached result of a pair from a single-pair or a packed call, or None"""
+        if self.cache is None:
+            return None
+        for cache_key in (self.cache_key(cv_json, jd_text, lean), self.packed_cache_key(cv_json, jd_text, lean)):
+            matching_result = self.cache.get(cache_key)
+            if matching_result is not None:
+                return matching_result
+        return None
+
+    def _score_packed_group(self, cv_json, group, lean):
+        jd_names = list(group)
+        blocks = [None] * len(jd_names)
+        if len(jd_names) > 1:
+            response = self._score_packed(cv_json, list(group.values()), lean)
+            blocks = self._split_packed(response, len(jd_names), lean)
+
+        results = {}
+        for jd_name, block in zip(jd_names, blocks):
+            if block is None:
+                # Block thiếu hoặc sai format: chỉ cặp này gọi lại theo kiểu một CV - một JD
+                if len(jd_names) > 1:
+                    logger.warning("Invalid packed block, falling back to a single-pair call", extra={"jd_name": jd_name})
+                results[jd_name] = self._score_pair(cv_json, group[jd_name], lean)
+                continue
+            if self.cache is not None:
+                tag = self.packed_lean_prompt_version if lean else self.packed_prompt_version
+                self.cache.set(self.packed_cache_key(cv_json, group[jd_name], lean), block, tag=tag)
+            results[jd_name] = block
+        return results
+
+    def _score_pair(self, cv_json, jd_text, lean):
+        """Unweighted single-pair result, coalesced with identical calls in flight"""
+        cache_key = self.cache_key(cv_json, jd_text, lean)
+        return self.inflight.do(
+            cache_key, self._score_and_store, cv_json, jd_text, cache_key if self.cache is not None else None, lean
+        )
+
+    def _score_packed(self, cv_json, jd_texts, lean=False):
+        """Call the LLM once for a CV and a list of JDs, returning the parsed response or None"""
+        result_text = None
+        try:
+            result_text = self.gateway.complete(**self._build_packed_request(cv_json, jd_texts, lean))
+            return self._parse_response(result_text)
+        except json.JSONDecodeError as e:
+            logger.error("Error parsing JSON", extra={"error": str(e), "raw_response": result_text})
+            return None
+        except Exception as e:
+            logger.error("Error calculating packed matching scores", extra={"error": str(e)})
+            return None
+
+    def _local_fallback(self, cv_json, jd_text):
+        """Score with the local pre-scorer when the LLM call failed (not cached)"""
+        if not Config.LOCAL_FALLBACK_ENABLED:
+            return None
+        from .local_scorer import LocalScorer
+
+        logger.warning("LLM matching failed, falling back to local scorer")
+        matching_result = LocalScorer().score_pair(cv_json, jd_text)
+        matching_result["source"] = "local_fallback"
+        return matching_result
+
+    def _score(self, cv_json, jd_text, lean=False):
+        """Call the LLM to score a CV/JD pair"""
+        result_text = None
+        try:
             # Generate response using OpenAI
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "You are an expert recruiter AI. Always respond with valid JSON only. No additional text or formatting."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0,
-                max_tokens=3000
-            )
-            
-            # Extract text from response
-            result_text = response.choices[0].message.content
-            
-            # Clean up the response text
-            if result_text.startswith('```json'):
-                result_text = result_text.replace('```json', '').replace('```', '').strip()
-            elif result_text.startswith('```'):
-                result_text = result_text.replace('```', '').strip()
-            
+            result_text = self.gateway.complete(**self._build_request(cv_json, jd_text, lean))
+
             # Parse JSON response
-            matching_result = json.loads(result_text)
-            return matching_result
-            
+            matching_result = self._parse_response(result_text)
+            return self._expand_lean_result(matching_result) if lean else matching_result
+
         except json.JSONDecodeError as e:
-            print(f"Error parsing JSON: {e}")
-            print(f"Raw response: {result_text}")
+            logger.error("Error parsing JSON", extra={"error": str(e), "raw_response": result_text})
             return None
         except Exception as e:
-            print(f"Error calculating matching score: {e}")
+            logger.error("Error calculating matching score", extra={"error": str(e)})
             return None
 
     def process_matching(self, cv_json_path, jd_text_path):
@@ -67,38 +442,52 @@ class MatchingCV:
             with open(jd_text_path, "r", encoding="utf-8") as f:
                 jd_text = f.read()
             
-            print("Files loaded successfully")
-            print(f"CV keys: {list(cv_json.keys())}")
-            print(f"JD text length: {len(jd_text)} characters")
+            logger.info("Files loaded", extra={"cv_keys": list(cv_json.keys()), "jd_chars": len(jd_text)})
             
             # Calculate matching score
             matching_result = self.calculate_matching_score(cv_json, jd_text)
             
             if matching_result:
-                print("Matching score calculated successfully")
+                logger.info("Matching score calculated")
                 return matching_result
             else:
-                print("Failed to calculate matching score")
+                logger.error("Failed to calculate matching score")
                 return None
                 
         except FileNotFoundError as e:
-            print(f"File not found: {e}")
+            logger.error("File not found", extra={"error": str(e)})
             return None
         except Exception as e:
-            print(f"Error processing matching: {e}")
+            logger.error("Error processing matching", extra={"error": str(e)})
             return None
 
-    def save_matching_result(self, matching_result, output_path):
-        """Save matching result to JSON file"""
-        try:
-            # Ensure output directory exists
-            ensure_directory_exists(os.path.dirname(output_path))
-            
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(matching_result, f, ensure_ascii=False, indent=2)
-            print(f"Matching result saved to: {output_path}")
-        except Exception as e:
-            print(f"Error saving matching result: {e}")
+    @staticmethod
+    def result_ids(matching_result, output_path=None):
+        """(cv_id, jd_id) a result is stored under
+
+        The cv_id/jd_id of the result, else its cv_name/jd_name, else the
+        {cv}_{jd}.json name of output_path.
+        """
+        if matching_result.get("cv_id") and matching_result.get("jd_id"):
+            return matching_result["cv_id"], matching_result["jd_id"]
+        if matching_result.get("cv_name") and matching_result.get("jd_name"):
+            return matching_result["cv_name"], matching_result["jd_name"]
+        cv_id, _, jd_id = file_stem(output_path or "").partition("_")
+        if not cv_id or not jd_id:
+            raise ValueError("Matching result has no cv_id/jd_id; pass an output_path named {cv}_{jd}.json")
+        return cv_id, jd_id
+
+    def save_matching_result(self, matching_result, output_path=None, store=None):
+        """Save matching result to a results store, or to the JSON file output_path
+
+        The store key comes from result_ids().
+        """
+        if store is not None:
+            store.save_result(*self.result_ids(matching_result, output_path), matching_result)
+        elif output_path:
+            save_json_file(matching_result, output_path)
+        else:
+            raise ValueError("save_matching_result needs an output_path or a store")
 
     def display_matching_summary(self, matching_result):
         """Display a formatted summary of matching results"""
@@ -113,18 +502,10 @@ class MatchingCV:
         scores = matching_result.get("scores", {})
         
         # Define weights for calculation verification
-        weights = {
-            "exp_years": 0.20,
-            "prof_skill_advanced": 0.18,
-            "soft_skill": 0.14,
-            "education": 0.13,
-            "prof_skill_basic": 0.10,
-            "achievements": 0.08,
-            "relevant_projects": 0.07,
-            "certs": 0.05,
-            "language": 0.04,
-            "activities": 0.01
-        }
+        try:
+            _, weights = resolve_weight_profile(matching_result.get("weight_profile"))
+        except ValueError:
+            weights = FEATURE_WEIGHTS
         
         print(f"📊 FINAL MATCHING SCORE: {matching_result.get('final_matching_score', 0):.1f}/100")
         print("\n🔍 DETAILED BREAKDOWN:")
@@ -136,6 +517,211 @@ class MatchingCV:
                 score = score_info.get("score", 0)
                 justification = score_info.get("justification", "No justification provided")
                 
-                print(f"• {feature.replace('_', ' ').title()}: {score}/100 (Weight: {weight*100}%)")
+                print(f"• {feature.replace('_', ' ').title()}: {score}/100 (Weight: {round(weight*100, 1):g}%)")
                 print(f"  └─ {justification}")
-                print()
\ No newline at end of file
+                print()
+
+class AsyncMatchingCV(MatchingCV):
+    """MatchingCV variant that calls the async LLM client inside the event loop"""
+
+    async def record(self, matching_result, cv_json, jd_text, cv_name=None, jd_name=None):
+        """Set the content ids of a weighted result and upsert it into the leaderboards of its CV and JD (async)"""
+        if self.leaderboard is not None and matching_result:
+            # save_result ghi xuống SQLite, chạy ngoài event loop
+            await asyncio.to_thread(super().record, matching_result, cv_json, jd_text, cv_name, jd_name)
+            return matching_result
+        return super().record(matching_result, cv_json, jd_text, cv_name, jd_name)
+
+    async def calculate_matching_score(self, cv_json, jd_text, weight_profile=None, jd_name=None, tenant=None, lean=None,
+                                       cv_name=None):
+        """Tính toán matching score giữa CV và JD (async)"""
+        lean = self._use_lean(lean)
+        cache_key = self.cache_key(cv_json, jd_text, lean) if self.cache is not None else None
+        matching_result = await self._cached_result(cache_key)
+        if matching_result is not None:
+            return await self.record(
+                self.apply_weights(matching_result, weight_profile, jd_name, tenant), cv_json, jd_text, cv_name, jd_name
+            )
+
+        matching_result = await self.inflight.do_async(
+            cache_key or self.cache_key(cv_json, jd_text, lean), self._score_and_store, cv_json, jd_text, cache_key, lean
+        )
+        return await self.record(
+            self.apply_weights(matching_result, weight_profile, jd_name, tenant), cv_json, jd_text, cv_name, jd_name
+        )
+
+    async def calculate_packed_scores(self, cv_json, jd_texts, weight_profile=None, tenant=None, lean=None, pack_size=None,
+                                      cv_name=None):
+        """Score one CV against several JDs, packing up to pack_size JDs in one LLM call (async)"""
+        lean = self._use_lean(lean)
+        pack_size = max(1, pack_size if pack_size is not None else Config.MATCH_PACK_SIZE)
+        results = {}
+        pending = []
+        for jd_name, jd_text in jd_texts.items():
+            matching_result = await self._cached_pair(cv_json, jd_text, lean)
+            if matching_result is None:
+                pending.append(jd_name)
+            else:
+                results[jd_name] = matching_result
+
+        groups = await asyncio.gather(*[
+            self._score_packed_group(cv_json, {jd_name: jd_texts[jd_name] for jd_name in group}, lean)
+            for group in _chunks(pending, pack_size)
+        ])
+        for group_results in groups:
+            results.update(group_results)
+        return {
+            jd_name: await self.record(
+                self.apply_weights(results[jd_name], weight_profile, jd_name, tenant), cv_json, jd_texts[jd_name], cv_name, jd_name
+            )
+            for jd_name in jd_texts
+        }
+
+    async def _cached_pair(self, cv_json, jd_text, lean):
+        """Cached result of a pair from a single-pair or a packed call, or None (async)"""
+        if self.cache is None:
+            return None
+        for cache_key in (self.cache_key(cv_json, jd_text, lean), self.packed_cache_key(cv_json, jd_text, lean)):
+            matching_result = await self._cached_result(cache_key)
+            if matching_result is not None:
+                return matching_result
+        return None
+
+    async def _score_packed_group(self, cv_json, group, lean):
+        jd_names = list(group)
+        blocks = [None] * len(jd_names)
+        if len(jd_names) > 1:
+            response = await self._score_packed(cv_json, list(group.values()), lean)
+            blocks = self._split_packed(response, len(jd_names), lean)
+
+        results = {}
+        fallbacks = []
+        for jd_name, block in zip(jd_names, blocks):
+            if block is None:
+                if len(jd_names) > 1:
+                    logger.warning("Invalid packed block, falling back to a single-pair call", extra={"jd_name": jd_name})
+                fallbacks.append(jd_name)
+                continue
+            if self.cache is not None:
+                tag = self.packed_lean_prompt_version if lean else self.packed_prompt_version
+                await asyncio.to_thread(self.cache.set, self.packed_cache_key(cv_json, group[jd_name], lean), block, tag)
+            results[jd_name] = block
+
+        fallback_results = await asyncio.gather(*[self._score_pair(cv_json, group[jd_name], lean) for jd_name in fallbacks])
+        results.update(zip(fallbacks, fallback_results))
+        return results
+
+    async def _score_pair(self, cv_json, jd_text, lean):
+        """Unweighted single-pair result, coalesced with identical calls in flight (async)"""
+        cache_key = self.cache_key(cv_json, jd_text, lean)
+        return await self.inflight.do_async(
+            cache_key, self._score_and_store, cv_json, jd_text, cache_key if self.cache is not None else None, lean
+        )
+
+    async def _score_packed(self, cv_json, jd_texts, lean=False):
+        """Call the LLM once for a CV and a list of JDs (async)"""
+        result_text = None
+        try:
+            result_text = await self.gateway.acomplete(**self._build_packed_request(cv_json, jd_texts, lean))
+            return self._parse_response(result_text)
+        except json.JSONDecodeError as e:
+            logger.error("Error parsing JSON", extra={"error": str(e), "raw_response": result_text})
+            return None
+        except Exception as e:
+            logger.error("Error calculating packed matching scores", extra={"error": str(e)})
+            return None
+
+    async def _cached_result(self, cache_key):
+        """Cached matching result for cache_key, or None"""
+        if cache_key is None:
+            return None
+        # Tier LRU trả về ngay, chỉ xuống SQLite trong thread khi miss
+        matching_result = self.cache.memory.get(cache_key)
+        if matching_result is None:
+            matching_result = await asyncio.to_thread(self.cache.disk.get, cache_key)
+            if matching_result is not None:
+                self.cache.memory.set(cache_key, matching_result)
+        return matching_result
+
+    async def stream_matching_score(self, cv_json, jd_text, weight_profile=None, jd_name=None, tenant=None, cv_name=None):
+        """Yield ("score", {"feature", "score", "justification"}) as each feature completes, then ("result", matching_result)
+
+        The LLM response is streamed and parsed incrementally. Cached and
+        fallback results emit all their features at once. The final result is
+        None when the pair could not be scored.
+        """
+        cache_key = self.cache_key(cv_json, jd_text) if self.cache is not None else None
+        matching_result = await self._cached_result(cache_key)
+        emitted = set()
+
+        if matching_result is None:
+            parser = ScoreStreamParser()
+            try:
+                async for delta in self.gateway.astream(**self._build_request(cv_json, jd_text)):
+                    for feature, score_info in parser.feed(delta):
+                        emitted.add(feature)
+                        yield "score", {"feature": feature, **score_info}
+                matching_result = self._parse_response(parser.text)
+            except json.JSONDecodeError as e:
+                logger.error("Error parsing JSON", extra={"error": str(e), "raw_response": parser.text})
+            except Exception as e:
+                logger.error("Error calculating matching score", extra={"error": str(e)})
+
+            if matching_result is None:
+                matching_result = await asyncio.to_thread(self._local_fallback, cv_json, jd_text)
+            elif cache_key is not None:
+                await asyncio.to_thread(self.cache.set, cache_key, matching_result, self.prompt_version)
+
+        if matching_result is not None:
+            for feature, score_info in matching_result.get("scores", {}).items():
+                if feature not in emitted and isinstance(score_info, dict):
+                    yield "score", {"feature": feature, **score_info}
+        yield "result", await self.record(
+            self.apply_weights(matching_result, weight_profile, jd_name, tenant), cv_json, jd_text, cv_name, jd_name
+        )
+
+    async def _score_and_store(self, cv_json, jd_text, cache_key, lean=False):
+        """Score a pair with the LLM (or the local fallback) and cache LLM results (async)"""
+        matching_result = await self._score(cv_json, jd_text, lean)
+        if matching_result is None:
+            return await asyncio.to_thread(self._local_fallback, cv_json, jd_text)
+        if cache_key is not None:
+            tag = self.lean_prompt_version if lean else self.prompt_version
+            await asyncio.to_thread(self.cache.set, cache_key, matching_result, tag)
+        return matching_result
+
+    async def justify(self, cv_json, jd_text, matching_result):
+        """Add justifications to a lean matching result in place (async)"""
+        if not self.needs_justification(matching_result):
+            return matching_result
+        scores = self._lean_scores(matching_result)
+        cache_key = self.justification_key(cv_json, jd_text, scores) if self.cache is not None else None
+        justifications = await self._cached_result(cache_key)
+        if justifications is None:
+            result_text = None
+            try:
+                result_text = await self.gateway.acomplete(**self._build_justify_request(cv_json, jd_text, scores))
+                justifications = self._parse_response(result_text).get("justifications")
+            except json.JSONDecodeError as e:
+                logger.error("Error parsing JSON", extra={"error": str(e), "raw_response": result_text})
+                return matching_result
+            except Exception as e:
+                logger.error("Error generating justifications", extra={"error": str(e)})
+                return matching_result
+            if justifications and cache_key:
+                await asyncio.to_thread(self.cache.set, cache_key, justifications, self.justify_prompt_version)
+        return self._merge_justifications(matching_result, justifications)
+
+    async def _score(self, cv_json, jd_text, lean=False):
+        """Call the LLM to score a CV/JD pair (async)"""
+        result_text = None
+        try:
+            result_text = await self.gateway.acomplete(**self._build_request(cv_json, jd_text, lean))
+            matching_result = self._parse_response(result_text)
+            return self._expand_lean_result(matching_result) if lean else matching_result
+        except json.JSONDecodeError as e:
+            logger.error("Error parsing JSON", extra={"error": str(e), "raw_response": result_text})
+            return None
+        except Exception as e:
+            logger.error("Error calculating matching score", extra={"error": str(e)})
+            return None
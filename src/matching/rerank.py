@@ -0,0 +1,68 @@
+import numpy as np
+from .weights import FEATURES, feature_score, resolve_weight_profile
+
+def feature_matrix(results):
+    """(n_results, n_features) matrix of per-feature scores in FEATURES order"""
+    return np.array(
+        [[feature_score(result["scores"].get(feature)) for feature in FEATURES] for result in results],
+        dtype=np.float64
+    ).reshape(len(results), len(FEATURES))
+
+def reweight(results, weight_profile=None, tenant=None):
+    """Compute new final scores for stored results in one vectorized pass
+
+    Without weight_profile each result uses the profile assigned to its
+    jd_name (or tenant/default). Returns (final_scores, profile_names).
+    """
+    resolved = {}
+    profile_names = []
+    weight_rows = []
+    for result in results:
+        jd_name = result.get("jd_name")
+        if jd_name not in resolved:
+            resolved[jd_name] = resolve_weight_profile(weight_profile, jd_name, tenant)
+        name, weights = resolved[jd_name]
+        profile_names.append(name)
+        weight_rows.append([weights[feature] for feature in FEATURES])
+
+    weight_matrix = np.array(weight_rows, dtype=np.float64).reshape(len(results), len(FEATURES))
+    final_scores = np.round((feature_matrix(results) * weight_matrix).sum(axis=1), 1)
+    return final_scores, profile_names
+
+def rerank_results(store, weight_profile=None, tenant=None, write=True):
+    """Re-apply a weight profile to every stored result without any API call
+
+    store is a results store (see src.storage) or the folder of a legacy
+    {cv}_{jd}.json layout. Updates final_matching_score/weight_profile in
+    place when write is True and returns the results summary sorted by JD
+    then descending score.
+    """
+    if isinstance(store, str):
+        from ..storage import FileResultsStore
+        store = FileResultsStore(store, store)
+    records = store.results()
+    if not records:
+        return []
+    results = [result for _, _, result in records]
+    final_scores, profile_names = reweight(results, weight_profile, tenant)
+
+    ranking = []
+    changed = []
+    for (cv_id, jd_id, result), score, profile_name in zip(records, final_scores, profile_names):
+        if result.get("final_matching_score") != float(score) or result.get("weight_profile") != profile_name:
+            changed.append((cv_id, jd_id, result))
+        result["final_matching_score"] = float(score)
+        result["weight_profile"] = profile_name
+        ranking.append({
+            "cv_name": result.get("cv_name") or cv_id,
+            "jd_name": result.get("jd_name") or jd_id,
+            "score": float(score),
+            "weight_profile": profile_name,
+            "result_file": f"{cv_id}_{jd_id}.json"
+        })
+    # Ghi lại các kết quả đổi điểm trong một transaction
+    if write and changed:
+        store.save_results(changed)
+
+    ranking.sort(key=lambda item: (item["jd_name"], -item["score"]))
+    return ranking
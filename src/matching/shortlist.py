@@ -0,0 +1,224 @@
+import os
+import logging
+import math
+import pickle
+import threading
+import numpy as np
+from ..utils.file_handler import ensure_directory_exists
+from .local_scorer import flatten_values, tokenize
+
+logger = logging.getLogger(__name__)
+
+# Trọng số từng field khi tính term frequency của CV
+FIELD_WEIGHTS = {
+    "prof_skill_advanced": 3.0,
+    "prof_skill_basic": 2.0,
+    "relevant_projects": 1.5,
+    "exp": 1.0,
+    "exp_years": 0.0,
+    "soft_skill": 1.0,
+    "certs": 1.0,
+    "education": 1.0,
+    "achievements": 0.5
+}
+
+STOPWORDS = frozenset((
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "of", "on",
+    "or", "our", "the", "to", "we", "with", "you", "your", "will", "this", "that", "who", "have"
+))
+
+def _terms(text):
+    return [token for token in tokenize(text) if token not in STOPWORDS and len(token) > 1]
+
+def cv_term_frequencies(cv_info):
+    """Field-weighted term frequencies of an extracted CV"""
+    frequencies = {}
+    for field, weight in FIELD_WEIGHTS.items():
+        if not weight:
+            continue
+        for text in flatten_values(cv_info.get(field)):
+            for term in _terms(text):
+                frequencies[term] = frequencies.get(term, 0.0) + weight
+    return frequencies
+
+class ShortlistIndex:
+    """Offline BM25 index over extracted CV fields for top-K candidate retrieval
+
+    Documents can be added or replaced one at a time; posting lists are turned
+    into NumPy arrays lazily and cached until the term changes again, so a
+    query only does vector arithmetic over the postings of the JD's terms.
+    """
+
+    def __init__(self, path=None, k1=1.2, b=0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.doc_ids = []          # index -> cv_id
+        self.doc_index = {}        # cv_id -> index
+        self.doc_meta = []         # index -> {"path", "mtime"} hoặc None nếu đã xoá
+        self.doc_lengths = []
+        self.doc_terms = []        # index -> {term: tf}
+        self.postings = {}         # term -> {index: tf}
+        self.total_length = 0.0
+        self.live_docs = 0
+        self._arrays = {}
+        self._lengths_array = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.live_docs
+
+    def add(self, cv_id, cv_info, meta=None):
+        """Add or replace one CV in the index"""
+        frequencies = cv_term_frequencies(cv_info)
+        length = sum(frequencies.values())
+        with self._lock:
+            if cv_id in self.doc_index:
+                self._remove_locked(cv_id)
+            index = len(self.doc_ids)
+            self.doc_ids.append(cv_id)
+            self.doc_index[cv_id] = index
+            self.doc_meta.append(meta or {})
+            self.doc_lengths.append(length)
+            self.doc_terms.append(frequencies)
+            for term, tf in frequencies.items():
+                self.postings.setdefault(term, {})[index] = tf
+                self._arrays.pop(term, None)
+            self.total_length += length
+            self.live_docs += 1
+            self._lengths_array = None
+
+    def remove(self, cv_id):
+        """Remove a CV from the index if present"""
+        with self._lock:
+            if cv_id in self.doc_index:
+                self._remove_locked(cv_id)
+
+    def _remove_locked(self, cv_id):
+        index = self.doc_index.pop(cv_id)
+        for term in self.doc_terms[index]:
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(index, None)
+                if not postings:
+                    del self.postings[term]
+                self._arrays.pop(term, None)
+        self.total_length -= self.doc_lengths[index]
+        self.doc_lengths[index] = 0.0
+        self.doc_terms[index] = {}
+        self.doc_meta[index] = None
+        self.live_docs -= 1
+        self._lengths_array = None
+
+    def _term_arrays(self, term):
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            postings = self.postings.get(term)
+            if not postings:
+                return None
+            arrays = (
+                np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                np.fromiter(postings.values(), dtype=np.float32, count=len(postings))
+            )
+            self._arrays[term] = arrays
+        return arrays
+
+    def query(self, jd_text, k=20, candidates=None):
+        """Return the top-k (cv_id, score) pairs for a JD text, best first"""
+        with self._lock:
+            if not self.live_docs or k <= 0:
+                return []
+            if self._lengths_array is None:
+                self._lengths_array = np.asarray(self.doc_lengths, dtype=np.float32)
+            lengths = self._lengths_array
+            avg_length = self.total_length / self.live_docs or 1.0
+            norm = self.k1 * (1 - self.b + self.b * lengths / avg_length)
+            scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+
+            for term in set(_terms(jd_text)):
+                arrays = self._term_arrays(term)
+                if arrays is None:
+                    continue
+                ids, tfs = arrays
+                idf = math.log(1 + (self.live_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+                scores[ids] += idf * tfs * (self.k1 + 1) / (tfs + norm[ids])
+
+            if candidates is not None:
+                mask = np.zeros(len(self.doc_ids), dtype=bool)
+                mask[[self.doc_index[cv_id] for cv_id in candidates if cv_id in self.doc_index]] = True
+                scores[~mask] = 0.0
+
+            k = min(k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [(self.doc_ids[i], float(scores[i])) for i in top if scores[i] > 0 and self.doc_meta[i] is not None]
+
+    def meta(self, cv_id):
+        with self._lock:
+            index = self.doc_index.get(cv_id)
+            return self.doc_meta[index] if index is not None else None
+
+    def sync_folder(self, folder):
+        """Index new or modified extracted_*.json files and drop deleted ones; return number changed"""
+        from ..storage import FileResultsStore
+        return self.sync_store(FileResultsStore(folder, folder))
+
+    def sync_store(self, store):
+        """Index new or modified extractions of a results store and drop deleted ones; return number changed"""
+        changed = 0
+        stamps = store.extraction_stamps()
+        for cv_id, (location, stamp) in stamps.items():
+            meta = self.meta(cv_id)
+            if meta and meta.get("path") == location and meta.get("mtime") == stamp:
+                continue
+            cv_info = store.get_extraction(cv_id)
+            if isinstance(cv_info, dict):
+                self.add(cv_id, cv_info, {"path": location, "mtime": stamp})
+                changed += 1
+        for cv_id in [cv_id for cv_id in list(self.doc_index) if cv_id not in stamps]:
+            self.remove(cv_id)
+            changed += 1
+        return changed
+
+    def save(self, path=None):
+        """Persist the index (compacting removed documents) with an atomic replace"""
+        path = path or self.path
+        ensure_directory_exists(os.path.dirname(path))
+        with self._lock:
+            live = [i for i, meta in enumerate(self.doc_meta) if meta is not None]
+            state = {
+                "k1": self.k1,
+                "b": self.b,
+                "docs": [(self.doc_ids[i], self.doc_meta[i], self.doc_terms[i]) for i in live]
+            }
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Load a saved index, or return an empty one bound to path"""
+        index = cls(path)
+        if not os.path.exists(path):
+            return index
+        try:
+            with open(path, 'rb') as f:
+                state = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            logger.warning("Ignoring unreadable shortlist index", extra={"path": path, "error": str(e)})
+            return index
+        index.k1, index.b = state["k1"], state["b"]
+        for cv_id, meta, frequencies in state["docs"]:
+            position = len(index.doc_ids)
+            index.doc_ids.append(cv_id)
+            index.doc_index[cv_id] = position
+            index.doc_meta.append(meta)
+            index.doc_terms.append(frequencies)
+            length = sum(frequencies.values())
+            index.doc_lengths.append(length)
+            index.total_length += length
+            for term, tf in frequencies.items():
+                index.postings.setdefault(term, {})[position] = tf
+        index.live_docs = len(index.doc_ids)
+        return index
@@ -0,0 +1,65 @@
+import json
+
+class ScoreStreamParser:
+    """Incrementally scan a streamed matching response for completed feature scores
+
+    feed() takes the next piece of model output and returns the
+    (feature, score_info) pairs whose objects under "scores" were closed by
+    it. Text outside the top-level JSON object (e.g. markdown fences) is ignored.
+    """
+
+    def __init__(self, section="scores"):
+        self.section = section
+        self.text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._pending_key = None
+        self._keys = {}
+        self._object_start = None
+
+    def feed(self, chunk):
+        self.text += chunk
+        completed = []
+        text = self.text
+        for pos in range(self._pos, len(text)):
+            char = text[pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    self._pending_key = text[self._string_start:pos + 1]
+                continue
+
+            if char == ":":
+                if self._pending_key is not None:
+                    # Chuỗi vừa đọc là key của object ở depth hiện tại
+                    self._keys[self._depth] = json.loads(self._pending_key)
+                    self._pending_key = None
+                continue
+            if not char.isspace():
+                self._pending_key = None
+
+            if char == '"' and self._depth > 0:
+                self._in_string = True
+                self._string_start = pos
+            elif char == "{":
+                self._depth += 1
+                if self._depth == 3 and self._keys.get(1) == self.section:
+                    self._object_start = pos
+            elif char == "}" and self._depth > 0:
+                if self._depth == 3 and self._object_start is not None:
+                    try:
+                        completed.append((self._keys.get(2), json.loads(text[self._object_start:pos + 1])))
+                    except json.JSONDecodeError:
+                        pass
+                    self._object_start = None
+                self._keys.pop(self._depth, None)
+                self._depth -= 1
+        self._pos = len(text)
+        return completed
@@ -0,0 +1,93 @@
+import os
+import logging
+import json
+import threading
+from config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+# Trọng số mặc định của các feature, dùng chung cho summary, local scorer và tính điểm cuối
+FEATURE_WEIGHTS = {
+    "exp_years": 0.20,
+    "prof_skill_advanced": 0.18,
+    "soft_skill": 0.14,
+    "education": 0.13,
+    "prof_skill_basic": 0.10,
+    "achievements": 0.08,
+    "relevant_projects": 0.07,
+    "certs": 0.05,
+    "language": 0.04,
+    "activities": 0.01
+}
+
+FEATURES = tuple(FEATURE_WEIGHTS)
+DEFAULT_PROFILE = "default"
+
+_profiles_cache = {"mtime": None, "data": None}
+_profiles_lock = threading.Lock()
+
+def normalize_weights(weights):
+    """Return weights for every feature, scaled so they sum to 1"""
+    weights = {feature: float(weights.get(feature, 0.0)) for feature in FEATURES}
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError("Weight profile must have a positive total weight")
+    return {feature: weight / total for feature, weight in weights.items()}
+
+def load_weight_profiles(path=None):
+    """Load weight profiles from JSON, reloading when the file changes
+
+    The file has a "profiles" mapping (name -> feature weights) plus optional
+    "jds" and "tenants" mappings that assign a profile name to a JD or tenant.
+    """
+    path = path or Config.WEIGHT_PROFILES_PATH
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        mtime = None
+
+    with _profiles_lock:
+        if _profiles_cache["data"] is not None and _profiles_cache["mtime"] == mtime and _profiles_cache.get("path") == path:
+            return _profiles_cache["data"]
+
+        data = {"profiles": {}, "jds": {}, "tenants": {}}
+        if mtime is not None:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    loaded = json.load(f)
+                for section in data:
+                    data[section] = loaded.get(section, {})
+            except (OSError, json.JSONDecodeError) as e:
+                logger.error("Error loading weight profiles", extra={"path": path, "error": str(e)})
+        data["profiles"].setdefault(DEFAULT_PROFILE, FEATURE_WEIGHTS)
+        data["profiles"] = {name: normalize_weights(weights) for name, weights in data["profiles"].items()}
+
+        _profiles_cache.update(path=path, mtime=mtime, data=data)
+        return data
+
+def resolve_weight_profile(profile=None, jd_name=None, tenant=None):
+    """Pick weights by explicit profile, then JD assignment, then tenant, then default
+
+    profile may also be a dict of feature weights. Returns (profile_name, weights).
+    """
+    if isinstance(profile, dict):
+        return "custom", normalize_weights(profile)
+
+    profiles = load_weight_profiles()
+    name = profile or profiles["jds"].get(jd_name) or profiles["tenants"].get(tenant) or DEFAULT_PROFILE
+    if name not in profiles["profiles"]:
+        raise ValueError(f"Unknown weight profile: {name}")
+    return name, profiles["profiles"][name]
+
+def feature_score(value):
+    """Numeric score of a feature entry ({"score": x} or a bare number), 0 if missing"""
+    if isinstance(value, dict):
+        value = value.get("score")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+def compute_final_score(scores, weights):
+    """Weighted 0-100 matching score from per-feature scores"""
+    return round(sum(weights.get(feature, 0.0) * feature_score(scores.get(feature)) for feature in FEATURES), 1)
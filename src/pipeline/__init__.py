@@ -0,0 +1,8 @@
+"""
+Bulk pipeline for processing CV/JD folders
+"""
+from .manifest import Manifest
+from .stages import Pipeline, Stage
+from .bulk_runner import BulkRunner, print_report
+
+__all__ = ['Manifest', 'Pipeline', 'Stage', 'BulkRunner', 'print_report']
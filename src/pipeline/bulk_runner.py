@@ -0,0 +1,433 @@
+import os
+import glob
+import time
+import threading
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from ..extractors.cv_extractor import CVExtractor
+from ..extractors.jd_loader import JDLoader
+from ..matching.matching_engine import MatchingCV, canonical_cv_json
+from ..matching.local_scorer import LocalScorer
+from ..matching.weights import resolve_weight_profile
+from ..matching.shortlist import ShortlistIndex
+from ..llm.scheduler import llm_lane, BULK
+from ..utils.cache import content_hash
+from ..utils.file_handler import ensure_directory_exists
+from ..storage import get_results_store
+from .manifest import Manifest
+from .stages import Pipeline, Stage
+
+logger = logging.getLogger(__name__)
+
+def get_filename_without_extension(filepath):
+    """Get filename without extension"""
+    return os.path.splitext(os.path.basename(filepath))[0]
+
+class BulkRunner:
+    """Extract every CV/JD in a folder pair and score the full cross product in parallel
+
+    CVs flow through a parse -> extract -> match pipeline, so each CV's JD
+    matches are queued as soon as its extraction finishes. Completed extractions and {cv}_{jd}.json results are checkpointed in a
+    manifest so an interrupted run resumes where it stopped.
+    """
+
+    def __init__(self, cv_folder, jd_folder, extracted_info_folder, matching_results_folder,
+                 workers=4, parse_workers=2, queue_size=None, manifest_path=None, force=False,
+                 prescore_threshold=None, shortlist_k=None, index_path=None, weight_profile=None,
+                 lean=False, justify_top=0, pack_size=0, store=None, cv_extractor=None, jd_loader=None, matching_cv=None):
+        self.cv_folder = cv_folder
+        self.jd_folder = jd_folder
+        self.extracted_info_folder = extracted_info_folder
+        self.matching_results_folder = matching_results_folder
+        self.workers = max(1, workers)
+        self.parse_workers = max(1, parse_workers)
+        # Queue giới hạn để stage nhanh không chạy quá xa stage chậm
+        self.queue_size = queue_size if queue_size is not None else self.workers * 2
+        self.force = force
+        # Profile sai phải lỗi ngay, không phải sau một LLM call cho mỗi cặp
+        if weight_profile is not None:
+            resolve_weight_profile(weight_profile)
+        self.weight_profile = weight_profile
+        # Lean: chỉ lấy điểm, justification chỉ cho top-K CV của mỗi JD
+        self.lean = lean
+        self.justify_top = justify_top
+        # Packed: chấm một CV với tối đa pack_size JD trong một call
+        self.pack_size = pack_size
+        self.manifest = Manifest(manifest_path or os.path.join(os.path.dirname(matching_results_folder), "bulk_manifest.jsonl"))
+        # Extraction/kết quả ghi vào results store (SQLite) hoặc layout file cũ, theo RESULTS_BACKEND
+        self.store = store or get_results_store(extracted_info_folder, matching_results_folder)
+
+        self.cv_extractor = cv_extractor or CVExtractor()
+        self.jd_loader = jd_loader or JDLoader()
+        self.matching_cv = matching_cv or MatchingCV()
+
+        # Local pre-scorer lọc bớt cặp điểm thấp trước khi gọi LLM
+        self.prescore_threshold = prescore_threshold
+        self.prescorer = LocalScorer() if prescore_threshold is not None else None
+
+        # BM25 index của các CV đã extract, cập nhật dần trong lúc chạy
+        self.shortlist_k = shortlist_k
+        self.index = ShortlistIndex.load(index_path) if index_path else None
+        if shortlist_k and self.index is None:
+            self.index = ShortlistIndex()
+
+        self.counts = {"cv": Counter(), "jd": Counter(), "match": Counter()}
+        self._counts_lock = threading.Lock()
+        self.timings = {}
+        self.stage_stats = {}
+        self.jd_entries = []
+        self.results = []
+
+    def _count(self, stage, status):
+        with self._counts_lock:
+            self.counts[stage][status] += 1
+
+    def _is_done(self, section, name, source_hash, exists):
+        return not self.force and self.manifest.is_done(section, name, source_hash, exists)
+
+    def parse_cv(self, cv_path):
+        """Stage 1: hash the PDF, reuse finished/cached extractions, otherwise parse its text"""
+        cv_name = get_filename_without_extension(cv_path)
+        with open(cv_path, 'rb') as f:
+            pdf_bytes = f.read()
+        source_hash = content_hash(pdf_bytes)
+        job = {"cv_name": cv_name, "source_hash": source_hash, "output": self.store.location("extractions", cv_name), "cv_info": None}
+
+        if self._is_done("extractions", cv_name, source_hash, lambda: self.store.has_extraction(cv_name)):
+            job["cv_info"] = self.store.get_extraction(cv_name)
+            if job["cv_info"] is not None:
+                self._count("cv", "skipped")
+                job["skipped"] = True
+                return [job]
+
+        cache_key = self.cv_extractor.cache_key(pdf_bytes) if self.cv_extractor.cache is not None else None
+        job["cache_key"] = cache_key
+        job["cv_info"] = self.cv_extractor.cached_extraction(cache_key)
+        if job["cv_info"] is None:
+            job["cv_text"] = self.cv_extractor.load_pdf_bytes(pdf_bytes)
+            if not job["cv_text"]:
+                logger.error("Failed to load PDF", extra={"cv_name": cv_name})
+                self._count("cv", "failed")
+                return []
+        return [job]
+
+    def extract_cv(self, job):
+        """Stage 2: call the LLM for CVs that still need it, then fan out one job per JD"""
+        cv_name = job["cv_name"]
+        if not job.get("skipped"):
+            if job["cv_info"] is None:
+                # Bulk lane: nhường quota RPM/TPM cho request interactive của API
+                with llm_lane(BULK):
+                    job["cv_info"] = self.cv_extractor.extract_cv_info(job["cv_text"])
+                if not job["cv_info"]:
+                    logger.error("Failed to extract CV", extra={"cv_name": cv_name})
+                    self._count("cv", "failed")
+                    return []
+                self.cv_extractor.store_extraction(job["cache_key"], job["cv_info"])
+
+            self.cv_extractor.save_extracted_info(job["cv_info"], store=self.store, cv_id=cv_name)
+            self.manifest.mark_done("extractions", cv_name, job["source_hash"], job["output"])
+            self._count("cv", "done")
+            logger.info("CV processed", extra={"cv_name": cv_name})
+
+        if self.index is not None:
+            location, stamp = self.store.extraction_stamp(cv_name)
+            self.index.add(cv_name, job["cv_info"], {"path": location, "mtime": stamp})
+        if self.shortlist_k:
+            # Chế độ shortlist: chỉ match sau khi mọi CV đã vào index
+            return []
+
+        return self.match_jobs((cv_name, job["cv_info"]), self.prescreen(job["cv_info"]))
+
+    def match_jobs(self, cv_entry, jd_entries):
+        """One matching job per JD, or per group of pack_size JDs in packed mode"""
+        if self.pack_size > 1:
+            return [(cv_entry, jd_entries[start:start + self.pack_size]) for start in range(0, len(jd_entries), self.pack_size)]
+        return [(cv_entry, jd_entry) for jd_entry in jd_entries]
+
+    def match_job(self, job):
+        """Run a matching job, returning the list of pair summaries"""
+        cv_entry, jd_entries = job
+        if isinstance(jd_entries, list):
+            return self.match_group(cv_entry, jd_entries)
+        return [self.match_pair(cv_entry, jd_entries)]
+
+    def prescreen(self, cv_info):
+        """JD entries worth an LLM call for this CV according to the local pre-scorer"""
+        if self.prescorer is None:
+            return self.jd_entries
+        self.prescorer.fit([cv_info])
+        local_scores = self.prescorer.score_matrix([cv_info], [jd_entry[2] for jd_entry in self.jd_entries])["final"][0]
+        kept = []
+        for jd_entry, local_score in zip(self.jd_entries, local_scores):
+            if local_score >= self.prescore_threshold:
+                kept.append(jd_entry)
+            else:
+                self._count("match", "prescreened")
+        return kept
+
+    def load_jd(self, jd_path):
+        """Load one JD, returning (jd_name, source_hash, jd_text) with jd_text None on failure"""
+        jd_name = get_filename_without_extension(jd_path)
+        jd_text = self.jd_loader.load_txt(jd_path)
+        if not jd_text:
+            logger.error("Failed to load JD", extra={"jd_name": jd_name})
+            self._count("jd", "failed")
+            return jd_name, None, None
+        try:
+            # Profile gán cho JD (weight_profiles.json) cũng phải hợp lệ trước khi chấm
+            resolve_weight_profile(self.weight_profile, jd_name)
+        except ValueError as e:
+            logger.error("Invalid weight profile for JD", extra={"jd_name": jd_name, "error": str(e)})
+            self._count("jd", "failed")
+            return jd_name, None, None
+
+        source_hash = content_hash(jd_text)
+        if self._is_done("jds", jd_name, source_hash, lambda: self.store.has_jd(jd_name)):
+            self._count("jd", "skipped")
+        else:
+            self.jd_loader.save_loaded_info(jd_text, store=self.store, jd_id=jd_name)
+            self.manifest.mark_done("jds", jd_name, source_hash, self.store.location("jds", jd_name))
+            self._count("jd", "done")
+        return jd_name, source_hash, jd_text
+
+    def _pair_target(self, cv_name, cv_info, jd_entry):
+        """(pair name, result ids, result location, manifest source hash) of a CV/JD pair
+
+        Results are stored under the content ids of MatchingCV.pair_ids, the
+        same ids the API uses, so bulk and API results share one leaderboard.
+        """
+        jd_name, jd_hash, jd_text = jd_entry
+        pair_name = f"{cv_name}_{jd_name}"
+        ids = MatchingCV.pair_ids(cv_info, jd_text)
+        result_path = self.store.location("results", *ids)
+        source_hash = content_hash(canonical_cv_json(cv_info), jd_hash)
+        if self.lean:
+            source_hash = content_hash(source_hash, "lean")
+        return pair_name, ids, result_path, source_hash
+
+    def _skipped(self, cv_name, jd_name, pair_name, ids, result_path):
+        self._count("match", "skipped")
+        entry = self.manifest.get("matches", pair_name)
+        return self._summary(cv_name, jd_name, ids, entry.get("score"), result_path, skipped=True)
+
+    def match_pair(self, cv_entry, jd_entry):
+        """Score one CV/JD pair unless an up-to-date result already exists"""
+        cv_name, cv_info = cv_entry
+        jd_name, _, jd_text = jd_entry
+        pair_name, ids, result_path, source_hash = self._pair_target(cv_name, cv_info, jd_entry)
+        if self._is_done("matches", pair_name, source_hash, lambda: self.store.has_result(*ids)):
+            return self._skipped(cv_name, jd_name, pair_name, ids, result_path)
+
+        with llm_lane(BULK):
+            matching_result = self.matching_cv.calculate_matching_score(
+                cv_info, jd_text, weight_profile=self.weight_profile, jd_name=jd_name, lean=self.lean
+            )
+        return self._save_result(cv_name, jd_name, matching_result, pair_name, ids, result_path, source_hash)
+
+    def match_group(self, cv_entry, jd_entries):
+        """Score one CV against a group of JDs with packed calls, skipping up-to-date pairs"""
+        cv_name, cv_info = cv_entry
+        summaries = []
+        pending = {}
+        for jd_entry in jd_entries:
+            pair_name, ids, result_path, source_hash = self._pair_target(cv_name, cv_info, jd_entry)
+            if self._is_done("matches", pair_name, source_hash, lambda: self.store.has_result(*ids)):
+                summaries.append(self._skipped(cv_name, jd_entry[0], pair_name, ids, result_path))
+            else:
+                pending[jd_entry[0]] = (jd_entry[2], (pair_name, ids, result_path, source_hash))
+        if not pending:
+            return summaries
+
+        with llm_lane(BULK):
+            matching_results = self.matching_cv.calculate_packed_scores(
+                cv_info, {jd_name: jd_text for jd_name, (jd_text, _) in pending.items()},
+                weight_profile=self.weight_profile, lean=self.lean, pack_size=len(pending)
+            )
+        for jd_name, (_, target) in pending.items():
+            summaries.append(self._save_result(cv_name, jd_name, matching_results.get(jd_name), *target))
+        return summaries
+
+    def _save_result(self, cv_name, jd_name, matching_result, pair_name, ids, result_path, source_hash):
+        """Write a pair result, checkpoint it and return its summary (None on failure)"""
+        if not matching_result:
+            logger.error("Failed to calculate matching score", extra={"cv_name": cv_name, "jd_name": jd_name})
+            self._count("match", "failed")
+            return None
+
+        # Lưu theo content id như API; tên file chỉ để hiển thị
+        matching_result['cv_id'], matching_result['jd_id'] = ids
+        matching_result['cv_name'] = cv_name
+        matching_result['jd_name'] = jd_name
+        matching_result['cv_file'] = f"{cv_name}.pdf"
+        matching_result['jd_file'] = f"{jd_name}.txt"
+        self.matching_cv.save_matching_result(matching_result, store=self.store)
+
+        score = matching_result.get('final_matching_score')
+        self.manifest.mark_done("matches", pair_name, source_hash, result_path, score=score)
+        self._count("match", "done")
+        logger.info("Pair scored", extra={"cv_name": cv_name, "jd_name": jd_name, "score": score})
+        return self._summary(cv_name, jd_name, ids, score, result_path)
+
+    def _summary(self, cv_name, jd_name, ids, score, result_path, skipped=False):
+        return {
+            'cv_name': cv_name,
+            'jd_name': jd_name,
+            'cv_id': ids[0],
+            'jd_id': ids[1],
+            'score': score,
+            # Tên file của cặp trong layout file (cũng là tên khi export)
+            'result_file': f"{ids[0]}_{ids[1]}.json",
+            'skipped': skipped
+        }
+
+    def _timed(self, stage, func, items):
+        """Run func over items on the worker pool and record the stage wall time"""
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            outputs = list(executor.map(func, items))
+        self.timings[stage] = time.perf_counter() - start
+        return outputs
+
+    def run(self):
+        """Run the whole bulk job and return the report"""
+        if self.store.backend == "files":
+            ensure_directory_exists(self.extracted_info_folder)
+            ensure_directory_exists(self.matching_results_folder)
+        started = time.perf_counter()
+
+        cv_paths = sorted(glob.glob(os.path.join(self.cv_folder, "*.pdf")))
+        jd_paths = sorted(glob.glob(os.path.join(self.jd_folder, "*.txt")))
+        logger.info("Found input files", extra={"cvs": len(cv_paths), "jds": len(jd_paths)})
+        if not cv_paths or not jd_paths:
+            return self.report(started)
+
+        # JD rẻ nên load hết trước, CV đi qua pipeline parse -> extract -> match
+        logger.info("1. Processing Job Descriptions")
+        self.jd_entries = [entry for entry in self._timed("jd_loading", self.load_jd, jd_paths) if entry[2]]
+
+        if self.prescorer is not None:
+            # Học skill lexicon từ các CV đã extract ở các lần chạy trước
+            self.prescorer.fit(list(self.store.extractions().values()))
+
+        logger.info("2. Pipelining CVs through parse -> extract -> match", extra={"cvs": len(cv_paths), "workers": self.workers})
+        pipeline = Pipeline([
+            Stage("pdf_parse", self.parse_cv, workers=self.parse_workers, queue_size=self.queue_size),
+            Stage("cv_extraction", self.extract_cv, workers=self.workers, queue_size=self.queue_size),
+            Stage("matching", self.match_job, workers=self.workers, queue_size=self.queue_size)
+        ])
+        pipeline_started = time.perf_counter()
+        self.results = [summary for summary in pipeline.run(cv_paths) if summary]
+        self.timings["pipeline"] = time.perf_counter() - pipeline_started
+        self.stage_stats = pipeline.stats()
+
+        if self.index is not None:
+            self.index.sync_store(self.store)
+            if self.index.path:
+                self.index.save()
+        if self.shortlist_k:
+            self.results = self.run_shortlist()
+        if self.justify_top:
+            self.run_justify()
+
+        return self.report(started)
+
+    def run_shortlist(self):
+        """Send only the top-K indexed CVs of each JD to the LLM"""
+        logger.info("3. Shortlisting indexed CVs per JD for LLM rerank", extra={"top_k": self.shortlist_k, "indexed": len(self.index)})
+        shortlisted = {}
+        loaded = {}
+        for jd_entry in self.jd_entries:
+            for cv_name, _ in self.index.query(jd_entry[2], self.shortlist_k):
+                if cv_name not in loaded:
+                    loaded[cv_name] = self.store.get_extraction(cv_name)
+                if loaded[cv_name] is not None:
+                    shortlisted.setdefault(cv_name, []).append(jd_entry)
+        # Gom theo CV để packed mode chấm nhiều JD của cùng một CV trong một call
+        jobs = [job for cv_name, jd_entries in shortlisted.items() for job in self.match_jobs((cv_name, loaded[cv_name]), jd_entries)]
+        summaries = self._timed("matching", self.match_job, jobs)
+        self.timings["pipeline"] += self.timings["matching"]
+        return [summary for group in summaries for summary in group if summary]
+
+    def run_justify(self):
+        """Add justifications to the result files of the top-K CVs of each JD"""
+        logger.info("Justifying the top CVs of each JD", extra={"top_k": self.justify_top})
+        jd_texts = {jd_name: jd_text for jd_name, _, jd_text in self.jd_entries}
+        ranked = sorted((r for r in self.results if r['score'] is not None), key=lambda r: -r['score'])
+        top = []
+        per_jd = Counter()
+        for summary in ranked:
+            if per_jd[summary['jd_name']] < self.justify_top:
+                per_jd[summary['jd_name']] += 1
+                top.append(summary)
+        self._timed("justification", self.justify_result, [(summary, jd_texts[summary['jd_name']]) for summary in top])
+
+    def justify_result(self, item):
+        """Justify one stored result in place, returning True when the file was rewritten"""
+        summary, jd_text = item
+        matching_result = self.store.get_result(summary['cv_id'], summary['jd_id'])
+        cv_info = self.store.get_extraction(summary['cv_name'])
+        if not matching_result or cv_info is None or not self.matching_cv.needs_justification(matching_result):
+            return False
+        with llm_lane(BULK):
+            self.matching_cv.justify(cv_info, jd_text, matching_result)
+        if self.matching_cv.needs_justification(matching_result):
+            self._count("match", "justify_failed")
+            return False
+        self.matching_cv.save_matching_result(matching_result, store=self.store)
+        self._count("match", "justified")
+        return True
+
+    def report(self, started):
+        """Collect counters, stage timings and throughput"""
+        elapsed = time.perf_counter() - started
+        matched = self.counts["match"]["done"]
+        return {
+            "elapsed_seconds": elapsed,
+            "workers": self.workers,
+            "stage_seconds": dict(self.timings),
+            "cv": dict(self.counts["cv"]),
+            "jd": dict(self.counts["jd"]),
+            "match": dict(self.counts["match"]),
+            "pipeline_stages": self.stage_stats,
+            "pairs_per_second": matched / self.timings["pipeline"] if self.timings.get("pipeline") else 0.0,
+            "results": self.results
+        }
+
+    def close(self):
+        self.store.flush()
+        self.manifest.close()
+
+def print_report(report):
+    """Print the results table followed by progress and throughput numbers"""
+    print("\n" + "=" * 80)
+    print("MATCHING RESULTS SUMMARY")
+    print("=" * 80)
+    if report["results"]:
+        print(f"{'CV Name':<15} {'JD Name':<20} {'Score':<10} {'Result File'}")
+        print("-" * 80)
+        for result in sorted(report["results"], key=lambda r: (r['cv_name'], -(r['score'] or 0))):
+            score = result['score'] if result['score'] is not None else 'N/A'
+            print(f"{result['cv_name']:<15} {result['jd_name']:<20} {score:<10} {result['result_file']}")
+    else:
+        print("❌ No successful matches were completed")
+
+    print("\n" + "=" * 80)
+    print("RUN REPORT")
+    print("=" * 80)
+    for stage in ("cv", "jd", "match"):
+        counts = report[stage]
+        line = f"{stage.upper():<6} done: {counts.get('done', 0):<6} skipped: {counts.get('skipped', 0):<6} failed: {counts.get('failed', 0)}"
+        if counts.get('prescreened'):
+            line += f"  prescreened out: {counts['prescreened']}"
+        if counts.get('justified'):
+            line += f"  justified: {counts['justified']}"
+        print(line)
+    for stage, seconds in report["stage_seconds"].items():
+        print(f"⏱  {stage:<15} {seconds:8.2f}s")
+    for stage, stats in report["pipeline_stages"].items():
+        print(f"   {stage:<15} busy {stats['busy_seconds']:8.2f}s  active {stats['active_seconds']:8.2f}s  "
+              f"items {stats['processed']} ({stats['failed']} failed, {stats['workers']} workers)")
+    print(f"⏱  {'total':<15} {report['elapsed_seconds']:8.2f}s with {report['workers']} workers")
+    print(f"🚀 Throughput: {report['pairs_per_second']:.2f} scored pairs/s")
@@ -0,0 +1,62 @@
+import os
+import json
+import time
+import threading
+from ..utils.file_handler import ensure_directory_exists
+
+SECTIONS = ("extractions", "jds", "matches")
+
+class Manifest:
+    """Append-only JSONL checkpoint of completed bulk work
+
+    Each completed unit is one line, so a crash loses at most the line being
+    written and recording progress stays O(1) however large the run gets.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.data = {section: {} for section in SECTIONS}
+        self.load()
+        ensure_directory_exists(os.path.dirname(path))
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def load(self):
+        """Replay an existing manifest, skipping truncated or unknown lines"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    self.data[record.pop("section")][record.pop("name")] = record
+                except (json.JSONDecodeError, KeyError, AttributeError):
+                    continue
+
+    def is_done(self, section, name, source_hash, exists=None):
+        """True if name was completed from the same source and its output still exists
+
+        exists() checks the output when it is not a file (e.g. a record in the results store).
+        """
+        with self._lock:
+            entry = self.data[section].get(name)
+        if not entry or entry.get("source_hash") != source_hash:
+            return False
+        return exists() if exists is not None else os.path.exists(entry.get("output", ""))
+
+    def get(self, section, name):
+        with self._lock:
+            return self.data[section].get(name)
+
+    def mark_done(self, section, name, source_hash, output, **extra):
+        """Record a completed unit of work and flush it to disk"""
+        record = {"source_hash": source_hash, "output": output, "completed_at": time.time(), **extra}
+        line = json.dumps({"section": section, "name": name, **record}, ensure_ascii=False)
+        with self._lock:
+            self.data[section][name] = record
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,115 @@
+import time
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+class Stage:
+    """One pipeline step: func(item) returns an iterable of items for the next stage"""
+
+    def __init__(self, name, func, workers=1, queue_size=0):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.first_start = None
+        self.last_end = None
+        self._lock = threading.Lock()
+
+    def _record(self, started, ended, failed):
+        with self._lock:
+            if failed:
+                self.failed += 1
+            else:
+                self.processed += 1
+            self.busy_seconds += ended - started
+            if self.first_start is None or started < self.first_start:
+                self.first_start = started
+            if self.last_end is None or ended > self.last_end:
+                self.last_end = ended
+
+    def stats(self):
+        with self._lock:
+            active = (self.last_end - self.first_start) if self.first_start is not None else 0.0
+            return {
+                "workers": self.workers,
+                "processed": self.processed,
+                "failed": self.failed,
+                "busy_seconds": self.busy_seconds,
+                "active_seconds": active
+            }
+
+class Pipeline:
+    """Chain of threaded stages connected by bounded queues
+
+    Each item flows to the next stage as soon as the previous one emits it, so
+    downstream stages start working while upstream ones are still busy.
+    """
+
+    def __init__(self, stages):
+        self.stages = stages
+
+    def run(self, items):
+        """Feed items through every stage and return what the last stage emitted"""
+        queues = [queue.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        results = []
+        results_lock = threading.Lock()
+        threads = []
+
+        for index, stage in enumerate(self.stages):
+            in_queue = queues[index]
+            out_queue = queues[index + 1] if index + 1 < len(queues) else None
+            remaining = [stage.workers]
+            remaining_lock = threading.Lock()
+
+            def worker(stage=stage, in_queue=in_queue, out_queue=out_queue,
+                       remaining=remaining, remaining_lock=remaining_lock):
+                while True:
+                    item = in_queue.get()
+                    if item is _DONE:
+                        break
+                    started = time.perf_counter()
+                    failed = False
+                    try:
+                        for output in stage.func(item) or ():
+                            if out_queue is None:
+                                with results_lock:
+                                    results.append(output)
+                            else:
+                                out_queue.put(output)
+                    except Exception as e:
+                        failed = True
+                        logger.error("Stage failed", extra={"stage": stage.name, "error": str(e)})
+                    stage._record(started, time.perf_counter(), failed)
+
+                # Worker cuối cùng của stage báo kết thúc cho stage sau
+                with remaining_lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last and out_queue is not None:
+                    next_stage = self.stages[self.stages.index(stage) + 1]
+                    for _ in range(next_stage.workers):
+                        out_queue.put(_DONE)
+
+            for _ in range(stage.workers):
+                thread = threading.Thread(target=worker, name=f"{stage.name}-worker", daemon=True)
+                thread.start()
+                threads.append(thread)
+
+        for item in items:
+            queues[0].put(item)
+        for _ in range(self.stages[0].workers):
+            queues[0].put(_DONE)
+
+        for thread in threads:
+            thread.join()
+        return results
+
+    def stats(self):
+        return {stage.name: stage.stats() for stage in self.stages}
@@ -0,0 +1,48 @@
+"""
+Storage backends for extractions and matching results
+"""
+import threading
+from config.settings import Config
+from .results_store import ResultsStore
+from .file_store import FileResultsStore
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_results_store(extracted_folder=None, results_folder=None, backend=None, write_batch=None):
+    """Return the configured results store (RESULTS_BACKEND: "sqlite" or "files")
+
+    The SQLite store is shared by the whole process per write_batch
+    (default RESULTS_WRITE_BATCH, buffered for bulk runs; 1 writes every
+    record in its own short transaction); the file store writes the legacy
+    layout under extracted_folder and results_folder.
+    """
+    backend = backend or Config.RESULTS_BACKEND
+    if backend == "files":
+        return FileResultsStore(
+            extracted_folder or Config.OUTPUT_EXTRACTED_INFO_PATH,
+            results_folder or Config.OUTPUT_MATCHING_RESULTS_PATH
+        )
+    if backend != "sqlite":
+        raise ValueError(f"Unknown results backend: {backend}")
+    write_batch = write_batch or Config.RESULTS_WRITE_BATCH
+    with _stores_lock:
+        key = (Config.RESULTS_DB_PATH, write_batch)
+        if key not in _stores:
+            _stores[key] = ResultsStore(Config.RESULTS_DB_PATH, write_batch)
+        return _stores[key]
+
+def copy_store(source, target):
+    """Copy every extraction, JD and result from one store to another, return the numbers copied"""
+    extractions = source.extractions()
+    for cv_id, cv_info in extractions.items():
+        target.save_extraction(cv_id, cv_info)
+    jds = source.jds()
+    for jd_id, jd_text in jds.items():
+        target.save_jd(jd_id, jd_text)
+    results = source.results()
+    target.save_results(results)
+    target.flush()
+    return {"extractions": len(extractions), "jds": len(jds), "results": len(results)}
+
+__all__ = ['ResultsStore', 'FileResultsStore', 'get_results_store', 'copy_store']
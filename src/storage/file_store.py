@@ -0,0 +1,167 @@
+import os
+import logging
+import glob
+import heapq
+from ..utils.file_handler import load_json_file, save_json_file, save_text_file
+from ..matching.weights import FEATURES, feature_score
+from .results_store import leaderboard_entry
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_PREFIX = "extracted_"
+
+class FileResultsStore:
+    """Legacy layout: extracted_{cv}.json / extracted_{jd}.txt and one {cv}_{jd}.json per pair
+
+    Same interface as ResultsStore, used when RESULTS_BACKEND=files and as the
+    target of exports to the old folder layout.
+    """
+
+    backend = "files"
+
+    def __init__(self, extracted_folder, results_folder):
+        self.extracted_folder = extracted_folder
+        self.results_folder = results_folder
+
+    def extraction_path(self, cv_id):
+        return os.path.join(self.extracted_folder, f"{EXTRACTION_PREFIX}{cv_id}.json")
+
+    def jd_path(self, jd_id):
+        return os.path.join(self.extracted_folder, f"{EXTRACTION_PREFIX}{jd_id}.txt")
+
+    def result_path(self, cv_id, jd_id):
+        return os.path.join(self.results_folder, f"{cv_id}_{jd_id}.json")
+
+    def location(self, kind, *ids):
+        if kind == "extractions":
+            return self.extraction_path(*ids)
+        if kind == "jds":
+            return self.jd_path(*ids)
+        return self.result_path(*ids)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def save_extraction(self, cv_id, cv_info):
+        save_json_file(cv_info, self.extraction_path(cv_id))
+
+    def save_jd(self, jd_id, jd_text):
+        save_text_file(jd_text, self.jd_path(jd_id))
+
+    def save_result(self, cv_id, jd_id, result):
+        save_json_file(result, self.result_path(cv_id, jd_id))
+
+    def save_results(self, items):
+        for cv_id, jd_id, result in items:
+            self.save_result(cv_id, jd_id, result)
+
+    def get_extraction(self, cv_id):
+        path = self.extraction_path(cv_id)
+        return load_json_file(path) if os.path.exists(path) else None
+
+    def get_jd(self, jd_id):
+        path = self.jd_path(jd_id)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def get_result(self, cv_id, jd_id):
+        path = self.result_path(cv_id, jd_id)
+        return load_json_file(path) if os.path.exists(path) else None
+
+    def has_extraction(self, cv_id):
+        return os.path.exists(self.extraction_path(cv_id))
+
+    def has_jd(self, jd_id):
+        return os.path.exists(self.jd_path(jd_id))
+
+    def has_result(self, cv_id, jd_id):
+        return os.path.exists(self.result_path(cv_id, jd_id))
+
+    def _extraction_files(self):
+        for path in sorted(glob.glob(os.path.join(self.extracted_folder, f"{EXTRACTION_PREFIX}*.json"))):
+            yield os.path.splitext(os.path.basename(path))[0][len(EXTRACTION_PREFIX):], path
+
+    def extractions(self):
+        extractions = {}
+        for cv_id, path in self._extraction_files():
+            cv_info = load_json_file(path)
+            if isinstance(cv_info, dict):
+                extractions[cv_id] = cv_info
+        return extractions
+
+    def extraction_stamps(self):
+        return {cv_id: (path, os.path.getmtime(path)) for cv_id, path in self._extraction_files()}
+
+    def extraction_stamp(self, cv_id):
+        path = self.extraction_path(cv_id)
+        return (path, os.path.getmtime(path)) if os.path.exists(path) else None
+
+    def jds(self):
+        jds = {}
+        for path in sorted(glob.glob(os.path.join(self.extracted_folder, f"{EXTRACTION_PREFIX}*.txt"))):
+            jd_id = os.path.splitext(os.path.basename(path))[0][len(EXTRACTION_PREFIX):]
+            jds[jd_id] = self.get_jd(jd_id)
+        return jds
+
+    def results(self):
+        """Every readable (cv_id, jd_id, result); ids come from the cv_id/jd_id (else cv_name/jd_name) fields of the result"""
+        results = []
+        for path in sorted(glob.glob(os.path.join(self.results_folder, "*.json"))):
+            result = load_json_file(path)
+            if not isinstance(result, dict) or not isinstance(result.get("scores"), dict):
+                continue
+            cv_id = result.get("cv_id") or result.get("cv_name")
+            jd_id = result.get("jd_id") or result.get("jd_name")
+            if not cv_id or not jd_id:
+                logger.warning("Skipping result without cv_name/jd_name", extra={"path": path})
+                continue
+            results.append((cv_id, jd_id, result))
+        return results
+
+    def result_jd_ids(self):
+        return sorted({jd_id for _, jd_id, _ in self.results()})
+
+    def resolve_id(self, kind, key):
+        """Ids a leaderboard key ("cv" or "jd") refers to: the id itself when stored, else the ids stored under that display name"""
+        if kind not in ("cv", "jd"):
+            raise ValueError(f"Unknown id kind: {kind}")
+        index = 0 if kind == "cv" else 1
+        ids = set()
+        named = set()
+        for record in self.results():
+            ids.add(record[index])
+            if record[2].get(f"{kind}_name") == key:
+                named.add(record[index])
+        return [key] if key in ids else sorted(named)
+
+    def top_for_jd(self, jd_id, k=20, min_scores=None, min_final=None):
+        """Best k CVs of a JD; reads every result file, use the SQLite store for large result sets"""
+        return self._top(lambda cv_id, result_jd_id: result_jd_id == jd_id, k, min_scores, min_final)
+
+    def top_for_cv(self, cv_id, k=20, min_scores=None, min_final=None):
+        """Best k JDs of a CV; reads every result file, use the SQLite store for large result sets"""
+        return self._top(lambda result_cv_id, jd_id: result_cv_id == cv_id, k, min_scores, min_final)
+
+    def _top(self, matches, k, min_scores, min_final):
+        for feature in min_scores or {}:
+            if feature not in FEATURES:
+                raise ValueError(f"Unknown feature: {feature}")
+        entries = []
+        for cv_id, jd_id, result in self.results():
+            if not matches(cv_id, jd_id):
+                continue
+            scores = {feature: feature_score(result["scores"].get(feature)) for feature in FEATURES}
+            final_score = result.get("final_matching_score")
+            if any(scores[feature] < minimum for feature, minimum in (min_scores or {}).items()):
+                continue
+            if min_final is not None and (final_score is None or final_score < min_final):
+                continue
+            entries.append(leaderboard_entry(
+                cv_id, jd_id, final_score, result.get("weight_profile"), scores, result.get("cv_name"), result.get("jd_name")
+            ))
+        return heapq.nlargest(k, entries, key=lambda entry: entry["final_matching_score"] or 0)
@@ -0,0 +1,276 @@
+import os
+import logging
+import json
+import time
+import sqlite3
+import threading
+from ..utils.file_handler import ensure_directory_exists
+from ..utils.metrics import timed
+from ..matching.weights import FEATURES, feature_score
+
+logger = logging.getLogger(__name__)
+
+def _compact(data):
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+def _final_score(result):
+    try:
+        return float(result.get("final_matching_score"))
+    except (TypeError, ValueError):
+        return None
+
+def leaderboard_entry(cv_id, jd_id, final_score, weight_profile, scores, cv_name=None, jd_name=None):
+    return {
+        "cv_id": cv_id,
+        "jd_id": jd_id,
+        "cv_name": cv_name or cv_id,
+        "jd_name": jd_name or jd_id,
+        "final_matching_score": final_score,
+        "weight_profile": weight_profile,
+        "scores": scores
+    }
+
+class ResultsStore:
+    """Extractions, JDs and match results in one indexed SQLite database
+
+    Results are indexed on cv_id, jd_id and final score, and every feature
+    score has its own column so rankings and filters never parse JSON.
+    Writes are buffered and inserted in one transaction per write_batch
+    records; reads flush the buffer first.
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, path, write_batch=200):
+        self.path = path
+        self.write_batch = max(1, write_batch)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending = {"extractions": [], "jds": [], "results": []}
+
+        ensure_directory_exists(os.path.dirname(path))
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS extractions ("
+            "cv_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jds ("
+            "jd_id TEXT PRIMARY KEY, text TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        feature_columns = "".join(f"{feature} REAL, " for feature in FEATURES)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            f"cv_id TEXT NOT NULL, jd_id TEXT NOT NULL, final_score REAL, weight_profile TEXT, {feature_columns}"
+            "data TEXT NOT NULL, updated_at REAL NOT NULL, cv_name TEXT, jd_name TEXT, PRIMARY KEY (cv_id, jd_id))"
+        )
+        # Tên hiển thị (tên file upload) thêm sau; database cũ được bổ sung cột
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(results)")}
+        for column in ("cv_name", "jd_name"):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE results ADD COLUMN {column} TEXT")
+        # Xếp hạng theo JD / theo CV và lọc theo điểm đều đi qua index
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_results_jd_score ON results (jd_id, final_score DESC)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_results_cv_score ON results (cv_id, final_score DESC)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_results_score ON results (final_score)")
+        # Tra id theo tên hiển thị (tên file) cho các endpoint leaderboard
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_results_cv_name ON results (cv_name)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_results_jd_name ON results (jd_name)")
+
+    def _connect(self):
+        """Return a connection owned by the current thread and process"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _queue(self, table, row):
+        with self._lock:
+            self._pending[table].append(row)
+            full = sum(len(rows) for rows in self._pending.values()) >= self.write_batch
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Write every buffered record in a single transaction
+
+        On a transient error (database locked or busy) the records stay
+        buffered and are written by the next flush.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {"extractions": [], "jds": [], "results": []}
+            if not any(pending.values()):
+                return
+            conn = self._connect()
+            feature_names = ", ".join(FEATURES)
+            placeholders = ", ".join("?" * (len(FEATURES) + 8))
+            try:
+                with timed("persist"):
+                    conn.execute("BEGIN IMMEDIATE")
+                    conn.executemany("INSERT OR REPLACE INTO extractions (cv_id, data, updated_at) VALUES (?, ?, ?)", pending["extractions"])
+                    conn.executemany("INSERT OR REPLACE INTO jds (jd_id, text, updated_at) VALUES (?, ?, ?)", pending["jds"])
+                    conn.executemany(
+                        f"INSERT OR REPLACE INTO results (cv_id, jd_id, final_score, weight_profile, {feature_names}, "
+                        "data, updated_at, cv_name, jd_name) "
+                        f"VALUES ({placeholders})",
+                        pending["results"]
+                    )
+                    conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                # BEGIN có thể đã lỗi (database is locked): chỉ rollback khi transaction đã mở
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                if isinstance(e, sqlite3.OperationalError):
+                    # Lỗi tạm thời (locked, busy, disk): giữ lại các dòng cho lần flush sau
+                    for table, rows in pending.items():
+                        self._pending[table] = rows + self._pending[table]
+                    logger.error(
+                        "Error writing results store, records kept for the next flush",
+                        extra={"path": self.path, "error": str(e), "pending": sum(len(rows) for rows in pending.values())}
+                    )
+                else:
+                    logger.error("Error writing results store", extra={"path": self.path, "error": str(e)})
+
+    def close(self):
+        self.flush()
+
+    def location(self, kind, *ids):
+        """Human-readable address of a stored record, used in manifests"""
+        return f"{self.path}#{kind}/{'/'.join(ids)}"
+
+    def save_extraction(self, cv_id, cv_info):
+        self._queue("extractions", (cv_id, _compact(cv_info), time.time()))
+
+    def save_jd(self, jd_id, jd_text):
+        self._queue("jds", (jd_id, jd_text, time.time()))
+
+    def save_result(self, cv_id, jd_id, result):
+        scores = result.get("scores") or {}
+        self._queue("results", (
+            cv_id, jd_id, _final_score(result), result.get("weight_profile"),
+            *[feature_score(scores.get(feature)) for feature in FEATURES],
+            _compact(result), time.time(), result.get("cv_name"), result.get("jd_name")
+        ))
+
+    def save_results(self, items):
+        """Store many (cv_id, jd_id, result) triples in one transaction"""
+        for cv_id, jd_id, result in items:
+            self.save_result(cv_id, jd_id, result)
+        self.flush()
+
+    def _one(self, sql, params):
+        self.flush()
+        return self._connect().execute(sql, params).fetchone()
+
+    def get_extraction(self, cv_id):
+        row = self._one("SELECT data FROM extractions WHERE cv_id = ?", (cv_id,))
+        return json.loads(row[0]) if row else None
+
+    def get_jd(self, jd_id):
+        row = self._one("SELECT text FROM jds WHERE jd_id = ?", (jd_id,))
+        return row[0] if row else None
+
+    def get_result(self, cv_id, jd_id):
+        row = self._one("SELECT data FROM results WHERE cv_id = ? AND jd_id = ?", (cv_id, jd_id))
+        return json.loads(row[0]) if row else None
+
+    def has_extraction(self, cv_id):
+        return self._one("SELECT 1 FROM extractions WHERE cv_id = ?", (cv_id,)) is not None
+
+    def has_jd(self, jd_id):
+        return self._one("SELECT 1 FROM jds WHERE jd_id = ?", (jd_id,)) is not None
+
+    def has_result(self, cv_id, jd_id):
+        return self._one("SELECT 1 FROM results WHERE cv_id = ? AND jd_id = ?", (cv_id, jd_id)) is not None
+
+    def extraction_stamp(self, cv_id):
+        """(location, updated_at) of one extraction, or None"""
+        row = self._one("SELECT updated_at FROM extractions WHERE cv_id = ?", (cv_id,))
+        return (self.location("extractions", cv_id), row[0]) if row else None
+
+    def extractions(self):
+        """cv_id -> extracted CV JSON of every stored extraction"""
+        self.flush()
+        return {cv_id: json.loads(data) for cv_id, data in self._connect().execute("SELECT cv_id, data FROM extractions")}
+
+    def extraction_stamps(self):
+        """cv_id -> (location, updated_at), used to sync the shortlist index"""
+        self.flush()
+        return {
+            cv_id: (self.location("extractions", cv_id), updated_at)
+            for cv_id, updated_at in self._connect().execute("SELECT cv_id, updated_at FROM extractions")
+        }
+
+    def jds(self):
+        """jd_id -> JD text of every stored JD"""
+        self.flush()
+        return dict(self._connect().execute("SELECT jd_id, text FROM jds"))
+
+    def results(self):
+        """Every stored (cv_id, jd_id, result), ordered by CV then JD"""
+        self.flush()
+        return [
+            (cv_id, jd_id, json.loads(data))
+            for cv_id, jd_id, data in self._connect().execute("SELECT cv_id, jd_id, data FROM results ORDER BY cv_id, jd_id")
+        ]
+
+    def result_jd_ids(self):
+        """Ids of every JD with at least one stored result"""
+        self.flush()
+        return [row[0] for row in self._connect().execute("SELECT DISTINCT jd_id FROM results ORDER BY jd_id")]
+
+    def resolve_id(self, kind, key):
+        """Ids a leaderboard key ("cv" or "jd") refers to: the id itself when stored, else the ids stored under that display name"""
+        if kind not in ("cv", "jd"):
+            raise ValueError(f"Unknown id kind: {kind}")
+        self.flush()
+        conn = self._connect()
+        if conn.execute(f"SELECT 1 FROM results WHERE {kind}_id = ? LIMIT 1", (key,)).fetchone():
+            return [key]
+        return [row[0] for row in conn.execute(
+            f"SELECT DISTINCT {kind}_id FROM results WHERE {kind}_name = ? ORDER BY {kind}_id", (key,)
+        )]
+
+    def top_for_jd(self, jd_id, k=20, min_scores=None, min_final=None):
+        """Best k CVs of a JD by final score, optionally requiring minimum feature scores"""
+        return self._top("jd_id", jd_id, k, min_scores, min_final)
+
+    def top_for_cv(self, cv_id, k=20, min_scores=None, min_final=None):
+        """Best k JDs of a CV by final score, optionally requiring minimum feature scores"""
+        return self._top("cv_id", cv_id, k, min_scores, min_final)
+
+    def _top(self, key_column, key, k, min_scores, min_final):
+        conditions = [f"{key_column} = ?"]
+        params = [key]
+        for feature, minimum in (min_scores or {}).items():
+            if feature not in FEATURES:
+                raise ValueError(f"Unknown feature: {feature}")
+            conditions.append(f"{feature} >= ?")
+            params.append(minimum)
+        if min_final is not None:
+            conditions.append("final_score >= ?")
+            params.append(min_final)
+        self.flush()
+        # Index (jd_id|cv_id, final_score DESC) trả về theo thứ tự điểm, chỉ đọc k dòng đầu khi không lọc
+        rows = self._connect().execute(
+            f"SELECT cv_id, jd_id, final_score, weight_profile, cv_name, jd_name, {', '.join(FEATURES)} FROM results "
+            f"WHERE {' AND '.join(conditions)} ORDER BY final_score DESC LIMIT ?",
+            params + [k]
+        ).fetchall()
+        return [
+            leaderboard_entry(row[0], row[1], row[2], row[3], dict(zip(FEATURES, row[6:])), row[4], row[5])
+            for row in rows
+        ]
+
+    def counts(self):
+        self.flush()
+        conn = self._connect()
+        return {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("extractions", "jds", "results")
+        }
@@ -1,6 +1,6 @@
 """
 Utility functions and helpers
 """
-from .file_handler import ensure_directory_exists, load_json_file, save_json_file
+from .file_handler import ensure_directory_exists, file_stem, load_json_file, save_json_file, save_text_file
 
-__all__ = ['ensure_directory_exists', 'load_json_file', 'save_json_file']
\ No newline at end of file
+__all__ = ['ensure_directory_exists', 'file_stem', 'load_json_file', 'save_json_file', 'save_text_file']
\ No newline at end of file
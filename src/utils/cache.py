@@ -0,0 +1,371 @@
+import os
+import atexit
+import logging
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from config.settings import Config
+from .file_handler import ensure_directory_exists
+from .metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# Số entry cũ nhất xóa mỗi lượt khi vượt giới hạn, và số lần ghi giữa hai lần quét entry hết hạn
+EVICT_CHUNK = 64
+EXPIRE_EVERY = 100
+# accessed_at chỉ cần chính xác tới mức này cho LRU; hit/miss ghi xuống đĩa theo chu kỳ
+ACCESS_RESOLUTION = 60.0
+COUNTER_FLUSH_INTERVAL = 30.0
+
+
+def content_hash(*parts):
+    """Build a stable sha256 key from bytes/str parts"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        digest.update(hashlib.sha256(part).digest())
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """Persistent JSON cache stored in SQLite, safe to share between processes
+
+    The total size and number of entries are kept in the counters table by
+    triggers, in the same transaction as every insert, update and delete, so
+    a write only compares two counters with the limits instead of scanning
+    the entries. Reads stay read-only in the common case: accessed_at is
+    refreshed at most once per ACCESS_RESOLUTION seconds and hit/miss counts
+    are buffered in memory and added to the shared counters every
+    COUNTER_FLUSH_INTERVAL seconds (and by stats() and at exit).
+    """
+
+    def __init__(self, path, max_entries=None, max_bytes=None, max_age=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._pending = {"hits": 0, "misses": 0}
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        ensure_directory_exists(os.path.dirname(path))
+        conn = self._connect()
+        # WAL cho phép nhiều worker đọc đồng thời trong khi một worker ghi
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, tag TEXT, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_created ON entries (created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_tag ON entries (tag)")
+        conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        atexit.register(self.flush_counters)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._create_triggers(conn)
+            # Cache tạo trước khi có trigger: tính tổng một lần
+            conn.execute("INSERT OR IGNORE INTO counters (name, value) SELECT 'total_bytes', COALESCE(SUM(size), 0) FROM entries")
+            conn.execute("INSERT OR IGNORE INTO counters (name, value) SELECT 'total_entries', COUNT(*) FROM entries")
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _create_triggers(conn):
+        def add(name, delta):
+            return (
+                "INSERT INTO counters (name, value) VALUES ('{0}', {1}) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + {1};"
+            ).format(name, delta)
+
+        conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN "
+            + add("total_bytes", "NEW.size") + add("total_entries", "1") + " END"
+        )
+        conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN "
+            + add("total_bytes", "-OLD.size") + add("total_entries", "-1") + " END"
+        )
+        conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS entries_resize AFTER UPDATE OF size ON entries BEGIN "
+            + add("total_bytes", "NEW.size - OLD.size") + " END"
+        )
+
+    def _connect(self):
+        """Return a connection owned by the current thread and process"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _count(self, name):
+        """Count a hit or miss, persisting the buffered counts when they are due"""
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+            self._pending[name] += 1
+            due = time.monotonic() - self._flushed_at >= COUNTER_FLUSH_INTERVAL
+        if due:
+            self.flush_counters()
+
+    def flush_counters(self):
+        """Add the buffered hit/miss counts to the counters shared by every process"""
+        with self._lock:
+            pending = {name: value for name, value in self._pending.items() if value}
+            self._pending = {"hits": 0, "misses": 0}
+            self._flushed_at = time.monotonic()
+        if not pending:
+            return
+        try:
+            self._connect().executemany(
+                "INSERT INTO counters (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                list(pending.items())
+            )
+        except sqlite3.Error as e:
+            logger.error("Error writing cache counters", extra={"path": self.path, "error": str(e)})
+            with self._lock:
+                for name, value in pending.items():
+                    self._pending[name] += value
+
+    def get(self, key):
+        """Return the cached value for key, or None on miss/expiry"""
+        try:
+            conn = self._connect()
+            row = conn.execute("SELECT value, created_at, accessed_at FROM entries WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+            if row is not None and self.max_age and now - row[1] > self.max_age:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                row = None
+
+            if row is None:
+                self._count("misses")
+                return None
+
+            if now - row[2] > ACCESS_RESOLUTION:
+                conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self._count("hits")
+            return json.loads(row[0])
+        except (sqlite3.Error, ValueError) as e:
+            logger.error("Error reading cache", extra={"path": self.path, "error": str(e)})
+            self._count("misses")
+            return None
+
+    @timed("persist")
+    def set(self, key, value, tag=None):
+        """Store a JSON-serialisable value and apply eviction limits"""
+        try:
+            payload = json.dumps(value, ensure_ascii=False)
+            now = time.time()
+            conn = self._connect()
+            # Upsert (không phải REPLACE) để trigger cập nhật tổng dung lượng theo chênh lệch size
+            conn.execute(
+                "INSERT INTO entries (key, value, tag, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, tag = excluded.tag, size = excluded.size, "
+                "created_at = excluded.created_at, accessed_at = excluded.accessed_at",
+                (key, payload, tag, len(payload.encode("utf-8")), now, now)
+            )
+            self._writes += 1
+            self.evict(conn, expire=self._writes % EXPIRE_EVERY == 0)
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.error("Error writing cache", extra={"path": self.path, "error": str(e)})
+
+    def delete(self, key):
+        """Remove a single entry"""
+        self._connect().execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def _totals(self, conn):
+        rows = dict(conn.execute(
+            "SELECT name, value FROM counters WHERE name IN ('total_bytes', 'total_entries')"
+        ).fetchall())
+        return rows.get("total_bytes", 0), rows.get("total_entries", 0)
+
+    def evict(self, conn=None, expire=True):
+        """Drop expired entries (when expire is set), then the least recently used ones while over the size limits"""
+        conn = conn or self._connect()
+        if expire and self.max_age:
+            conn.execute("DELETE FROM entries WHERE created_at < ?", (time.time() - self.max_age,))
+        if not self.max_entries and not self.max_bytes:
+            return
+        while True:
+            size, count = self._totals(conn)
+            over_bytes = self.max_bytes and size > self.max_bytes
+            over_entries = count - self.max_entries if self.max_entries and count > self.max_entries else 0
+            if not over_bytes and not over_entries:
+                return
+            # Chỉ vượt số entry: xóa đúng phần dư, không xóa luôn entry vừa ghi
+            cursor = conn.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed_at LIMIT ?)",
+                (EVICT_CHUNK if over_bytes else min(EVICT_CHUNK, over_entries),)
+            )
+            if cursor.rowcount <= 0:
+                return
+
+    def purge_tags(self, keep_tags):
+        """Delete every entry whose tag is not in keep_tags (one tag or several), return the number removed"""
+        keep_tags = [keep_tags] if isinstance(keep_tags, str) else list(keep_tags)
+        placeholders = ",".join("?" * len(keep_tags))
+        cursor = self._connect().execute(
+            f"DELETE FROM entries WHERE tag IS NULL OR tag NOT IN ({placeholders})", keep_tags
+        )
+        return cursor.rowcount
+
+    def clear(self):
+        """Remove all entries and reset the shared counters"""
+        conn = self._connect()
+        conn.execute("DELETE FROM entries")
+        conn.execute("DELETE FROM counters WHERE name IN ('hits', 'misses')")
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self._pending = {"hits": 0, "misses": 0}
+
+    def stats(self):
+        """Return entry count, size and hit/miss counters"""
+        self.flush_counters()
+        conn = self._connect()
+        counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+        entries, size = counters.get("total_entries", 0), counters.get("total_bytes", 0)
+        return {
+            "path": self.path,
+            "entries": entries,
+            "size_bytes": size,
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "process_hits": self.hits,
+            "process_misses": self.misses,
+        }
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache storing values as JSON snapshots"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            payload = self._data.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+        # Trả về bản copy để caller sửa kết quả không làm hỏng cache
+        return json.loads(payload)
+
+    def set(self, key, value):
+        payload = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._data[key] = payload
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class TieredCache:
+    """In-process LRU tier backed by a shared DiskCache"""
+
+    def __init__(self, memory, disk):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        value = self.disk.get(key)
+        if value is not None:
+            self.memory.set(key, value)
+        return value
+
+    def set(self, key, value, tag=None):
+        self.memory.set(key, value)
+        self.disk.set(key, value, tag=tag)
+
+    def delete(self, key):
+        self.memory.delete(key)
+        self.disk.delete(key)
+
+    def purge_tags(self, keep_tags):
+        """Drop disk entries from other prompt versions and reset the memory tier"""
+        self.memory.clear()
+        return self.disk.purge_tags(keep_tags)
+
+    def clear(self):
+        self.memory.clear()
+        self.disk.clear()
+
+    def stats(self):
+        return {"memory": self.memory.stats(), "disk": self.disk.stats()}
+
+
+_extraction_cache = None
+_match_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_extraction_cache():
+    """Return the process-wide CV extraction cache"""
+    global _extraction_cache
+    with _cache_lock:
+        if _extraction_cache is None:
+            _extraction_cache = DiskCache(
+                os.path.join(Config.CACHE_DIR, "extraction.sqlite"),
+                max_entries=Config.EXTRACTION_CACHE_MAX_ENTRIES,
+                max_bytes=Config.EXTRACTION_CACHE_MAX_BYTES,
+                max_age=Config.EXTRACTION_CACHE_MAX_AGE
+            )
+        return _extraction_cache
+
+
+def get_match_cache():
+    """Return the process-wide matching result cache (LRU + disk)"""
+    global _match_cache
+    with _cache_lock:
+        if _match_cache is None:
+            _match_cache = TieredCache(
+                LRUCache(Config.MATCH_CACHE_LRU_SIZE),
+                DiskCache(
+                    os.path.join(Config.CACHE_DIR, "matching.sqlite"),
+                    max_entries=Config.MATCH_CACHE_MAX_ENTRIES,
+                    max_bytes=Config.MATCH_CACHE_MAX_BYTES,
+                    max_age=Config.MATCH_CACHE_MAX_AGE
+                )
+            )
+        return _match_cache
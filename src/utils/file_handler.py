@@ -1,11 +1,20 @@
 import os
+import logging
 import json
+from .metrics import timed
+
+logger = logging.getLogger(__name__)
 
 def ensure_directory_exists(directory_path):
     """Ensure that a directory exists, create it if it doesn't"""
     if directory_path and not os.path.exists(directory_path):
         os.makedirs(directory_path)
-        print(f"Created directory: {directory_path}")
+        logger.info("Created directory", extra={"path": directory_path})
+
+def file_stem(file_path, prefix=""):
+    """File name without directory, extension and the given prefix"""
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    return stem[len(prefix):] if prefix and stem.startswith(prefix) else stem
 
 def load_json_file(file_path):
     """Load JSON file and return the data"""
@@ -13,18 +22,27 @@ def load_json_file(file_path):
         with open(file_path, 'r', encoding='utf-8') as f:
             return json.load(f)
     except FileNotFoundError:
-        print(f"File not found: {file_path}")
+        logger.error("File not found", extra={"path": file_path})
         return None
     except json.JSONDecodeError as e:
-        print(f"Error parsing JSON from {file_path}: {e}")
+        logger.error("Error parsing JSON", extra={"path": file_path, "error": str(e)})
         return None
 
 def save_json_file(data, file_path):
     """Save data to JSON file"""
     try:
         ensure_directory_exists(os.path.dirname(file_path))
-        with open(file_path, 'w', encoding='utf-8') as f:
+        with timed("persist"), open(file_path, 'w', encoding='utf-8') as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
-        print(f"Data saved to: {file_path}")
+        logger.info("Data saved", extra={"path": file_path})
+    except Exception as e:
+        logger.error("Error saving file", extra={"path": file_path, "error": str(e)})
+def save_text_file(text, file_path):
+    """Save text to a file"""
+    try:
+        ensure_directory_exists(os.path.dirname(file_path))
+        with timed("persist"), open(file_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        logger.info("Data saved", extra={"path": file_path})
     except Exception as e:
-        print(f"Error saving to {file_path}: {e}")
\ No newline at end of file
+        logger.error("Error saving file", extra={"path": file_path, "error": str(e)})
@@ -0,0 +1,74 @@
+import json
+import logging
+import contextvars
+from config.settings import Config
+
+# Id của request API hiện tại, gắn vào mọi log record
+_request_id = contextvars.ContextVar("request_id", default=None)
+
+# Thuộc tính có sẵn của LogRecord; mọi key khác trong extra={} là field structured
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+def set_request_id(request_id):
+    """Tag the log records of the current request; returns the token for reset_request_id"""
+    return _request_id.set(request_id)
+
+def reset_request_id(token):
+    _request_id.reset(token)
+
+def current_request_id():
+    return _request_id.get()
+
+def _fields(record):
+    fields = {key: value for key, value in vars(record).items() if key not in _RESERVED and not key.startswith("_")}
+    request_id = _request_id.get()
+    if request_id and "request_id" not in fields:
+        fields["request_id"] = request_id
+    return fields
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and the extra fields"""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **_fields(record)
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class TextFormatter(logging.Formatter):
+    """Human-readable line followed by the extra fields as key=value"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = _fields(record)
+        if fields:
+            line += " " + " ".join(
+                f"{key}={json.dumps(value, ensure_ascii=False, default=str) if not isinstance(value, str) else value}"
+                for key, value in fields.items()
+            )
+        return line
+
+_configured = False
+
+def configure_logging(level=None, fmt=None):
+    """Send the logs of the application to stderr (LOG_FORMAT: "text" or "json")"""
+    global _configured
+    if _configured:
+        return
+    _configured = True
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if (fmt or Config.LOG_FORMAT) == "json" else TextFormatter())
+    logger = logging.getLogger("src")
+    logger.addHandler(handler)
+    logger.setLevel((level or Config.LOG_LEVEL).upper())
+    # Không đẩy tiếp lên root logger để tránh in hai lần dưới uvicorn
+    logger.propagate = False
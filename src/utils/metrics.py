@@ -0,0 +1,185 @@
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Bucket (giây) cho mọi histogram, từ thao tác local vài ms tới LLM call vài chục giây
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key, *extra):
+        return list(zip(self.labelnames, key)) + list(extra)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+class Counter(_Metric):
+    """Monotonic counter, one series per label combination"""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self, key, value):
+        return [f"{self.name}_total{_format_labels(self._labels(key))} {_format_value(value)}"]
+
+class Gauge(_Metric):
+    """Value that can go up and down, e.g. a queue depth"""
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _samples(self, key, value):
+        return [f"{self.name}{_format_labels(self._labels(key))} {_format_value(value)}"]
+
+class Histogram(_Metric):
+    """Cumulative histogram of durations in seconds"""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # [count của từng bucket..., sum, count]
+                series = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def _samples(self, key, series):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, series):
+            cumulative += count
+            labels = _format_labels(self._labels(key, ("le", _format_value(bound))))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self._labels(key))
+        lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+        lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+class MetricsRegistry:
+    """Metrics of the process, rendered in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric_class, name, *args, **kwargs):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = metric_class(name, *args, **kwargs)
+            return self._metrics[name]
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "cvjd_stage_duration_seconds",
+    "Time spent in each processing stage (upload_read, pdf_parse, prompt_build, llm_queue_wait, llm_call, json_parse, persist)",
+    ["stage"]
+)
+LLM_QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "cvjd_llm_queue_wait_seconds", "Time LLM calls waited for the client-side rate budget", ["purpose", "lane"]
+)
+LLM_REQUEST_SECONDS = REGISTRY.histogram(
+    "cvjd_llm_request_duration_seconds", "Network time of LLM calls, including failed attempts", ["purpose", "outcome"]
+)
+LLM_REQUESTS = REGISTRY.counter("cvjd_llm_requests", "LLM call attempts by outcome (ok, error, rate_limited, cancelled)", ["purpose", "outcome"])
+LLM_TOKENS = REGISTRY.counter("cvjd_llm_tokens", "Tokens reported in response.usage", ["purpose", "kind"])
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "cvjd_http_request_duration_seconds", "API request latency until the response starts", ["method", "route", "status"]
+)
+
+# Thời gian từng stage của request hiện tại (dict dùng chung cho các task/thread con)
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+def start_request_timings():
+    """Collect stage timings of the current request; returns the token for end_request_timings"""
+    return _request_timings.set({})
+
+def end_request_timings(token):
+    _request_timings.reset(token)
+
+def request_timings():
+    """Stage -> seconds spent so far by the current request, or None outside a request"""
+    return _request_timings.get()
+
+def observe_stage(stage, seconds):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+@contextmanager
+def timed(stage):
+    """Time the enclosed block (or decorated function) as one stage"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
@@ -0,0 +1,120 @@
+import io
+import logging
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+def _reader(pdf_bytes):
+    # pypdf chỉ import khi parse lần đầu để app khởi động nhanh
+    from pypdf import PdfReader
+    return PdfReader(io.BytesIO(pdf_bytes))
+
+def _page_texts(reader, start, stop):
+    return [(reader.pages[index].extract_text() or "") + "\n" for index in range(start, stop)]
+
+def _truncate(text, max_chars):
+    return text[:max_chars] if max_chars else text
+
+def extract_pdf_text(pdf_bytes, max_pages=None, max_chars=None):
+    """Extract the text of a PDF held in memory, one block per page
+
+    max_pages and max_chars cap how much of a long document is read (None or 0 = no limit).
+    """
+    reader = _reader(pdf_bytes)
+    page_count = len(reader.pages)
+    if max_pages:
+        page_count = min(page_count, max_pages)
+    # join một lần thay vì nối chuỗi += trong vòng lặp
+    return _truncate("".join(_page_texts(reader, 0, page_count)), max_chars)
+
+def pdf_page_count(pdf_bytes):
+    """Number of pages in a PDF held in memory"""
+    return len(_reader(pdf_bytes).pages)
+
+def extract_page_range(pdf_bytes, start, stop):
+    """Text of pages [start, stop) of a PDF held in memory"""
+    reader = _reader(pdf_bytes)
+    return "".join(_page_texts(reader, start, min(stop, len(reader.pages))))
+
+class PDFParserPool:
+    """Parse PDFs in worker processes so text extraction never blocks the event loop
+
+    Documents longer than pages_per_task pages are split into page ranges that
+    are extracted in parallel. With workers=0 parsing runs in a thread instead.
+    """
+
+    def __init__(self, workers=2, pages_per_task=0, max_pages=0, max_chars=0):
+        self.workers = workers
+        self.pages_per_task = pages_per_task
+        self.max_pages = max_pages
+        self.max_chars = max_chars
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None and self.workers > 0:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def _reset_executor(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def parse(self, pdf_bytes):
+        """Extract text of a PDF in the pool, honouring the page/char caps"""
+        executor = self._get_executor()
+        if executor is None:
+            return await asyncio.to_thread(extract_pdf_text, pdf_bytes, self.max_pages, self.max_chars)
+        try:
+            return await self._parse_in(executor, pdf_bytes)
+        except BrokenProcessPool:
+            # Worker bị kill (OOM, segfault...): tạo pool mới cho lần sau, lần này parse trong thread
+            logger.warning("PDF parser pool is broken, restarting it")
+            self._reset_executor(executor)
+            return await asyncio.to_thread(extract_pdf_text, pdf_bytes, self.max_pages, self.max_chars)
+
+    async def _parse_in(self, executor, pdf_bytes):
+        loop = asyncio.get_running_loop()
+        if not self.pages_per_task:
+            return await loop.run_in_executor(executor, extract_pdf_text, pdf_bytes, self.max_pages, self.max_chars)
+
+        page_count = await loop.run_in_executor(executor, pdf_page_count, pdf_bytes)
+        if self.max_pages:
+            page_count = min(page_count, self.max_pages)
+        if page_count <= self.pages_per_task:
+            return await loop.run_in_executor(executor, extract_pdf_text, pdf_bytes, page_count, self.max_chars)
+
+        chunks = await asyncio.gather(*[
+            loop.run_in_executor(executor, extract_page_range, pdf_bytes, start, start + self.pages_per_task)
+            for start in range(0, page_count, self.pages_per_task)
+        ])
+        return _truncate("".join(chunks), self.max_chars)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+_parser_pool = None
+_parser_pool_lock = threading.Lock()
+
+def get_pdf_parser_pool():
+    """Return the process-wide PDF parser pool"""
+    global _parser_pool
+    with _parser_pool_lock:
+        if _parser_pool is None:
+            _parser_pool = PDFParserPool(
+                workers=Config.PDF_PARSE_WORKERS,
+                pages_per_task=Config.PDF_PAGES_PER_TASK,
+                max_pages=Config.PDF_MAX_PAGES,
+                max_chars=Config.PDF_MAX_CHARS
+            )
+        return _parser_pool
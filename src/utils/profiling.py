@@ -0,0 +1,203 @@
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import pstats
+import cProfile
+import logging
+import threading
+import contextvars
+from collections import Counter
+from config.settings import Config
+from .file_handler import ensure_directory_exists
+
+logger = logging.getLogger(__name__)
+
+MODES = ("cprofile", "sampling")
+_EXTENSIONS = {"cprofile": ".prof", "sampling": ".folded"}
+_IDLE_FILES = {"threading.py", "thread.py", "queue.py", "queues.py"}
+_PROFILE_ID = re.compile(r"\d{8}-\d{6}-[0-9a-f]{8}")
+
+# Request hiện tại có đang được profile không (để chạy các bước thường offload ngay trên thread này)
+_profiled = contextvars.ContextVar("profiled_request", default=False)
+
+def profiling_request():
+    """True inside a request that is being profiled"""
+    return _profiled.get()
+
+def _frame_name(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class _CProfileSession:
+    """Deterministic profile of the calling thread only (the event loop thread in the API)
+
+    Work handed to worker threads (asyncio.to_thread, SQLite stores, caches)
+    or processes does not show up; profiled requests parse their PDF inline
+    for that reason.
+    """
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def stop(self, path):
+        self.profile.disable()
+        self.profile.dump_stats(path)
+        stats = pstats.Stats(self.profile).stats
+        top = sorted(stats.items(), key=lambda item: -item[1][3])[:15]
+        return [
+            {"function": f"{func} ({os.path.basename(filename)}:{line})", "calls": calls, "cumulative_seconds": round(cumulative, 6)}
+            for (filename, line, func), (_, calls, _, cumulative, _) in top
+        ]
+
+class _SamplingSession:
+    """Statistical profile: stacks of every thread sampled every interval seconds"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                # Bỏ sampler và các thread đang ngồi chờ việc (thread pool, queue feeder)
+                if thread_id == own or os.path.basename(frame.f_code.co_filename) in _IDLE_FILES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame.f_code))
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self, path):
+        self._stop.set()
+        self._thread.join()
+        # Folded stacks: mở bằng speedscope hoặc flamegraph.pl
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return [{"function": function, "samples": count} for function, count in leaves.most_common(15)]
+
+class RequestProfiler:
+    """Opt-in per-request profiles stored as downloadable files with a JSON summary
+
+    One request is profiled at a time; start() returns None while another
+    profile is running. start() and finish() must run in the same context
+    (the request middleware), which profiling_request() reports as profiled.
+    mode "cprofile" writes a pstats .prof file of the event loop thread only
+    (snakeviz, pstats), "sampling" writes folded stacks of all threads. Only the newest
+    keep profiles are kept on disk.
+    """
+
+    def __init__(self, folder, mode="cprofile", interval=0.005, keep=50):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profile mode: {mode}. Available: {', '.join(MODES)}")
+        self.folder = folder
+        self.mode = mode
+        self.interval = interval
+        self.keep = keep
+        self._busy = threading.Lock()
+
+    def start(self):
+        """Start profiling, or return None if a profile is already running"""
+        if not self._busy.acquire(blocking=False):
+            return None
+        try:
+            session = _CProfileSession() if self.mode == "cprofile" else _SamplingSession(self.interval)
+            session.token = _profiled.set(True)
+            return session
+        except Exception as e:
+            self._busy.release()
+            logger.warning("Could not start profiler", extra={"error": str(e)})
+            return None
+
+    def finish(self, session, **info):
+        """Stop a session, write the profile and its summary, return the summary"""
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        try:
+            ensure_directory_exists(self.folder)
+            filename = profile_id + _EXTENSIONS[self.mode]
+            top_functions = session.stop(os.path.join(self.folder, filename))
+        finally:
+            _profiled.reset(session.token)
+            self._busy.release()
+        summary = {
+            "id": profile_id,
+            "mode": self.mode,
+            "file": filename,
+            "created_at": time.time(),
+            **info,
+            "top_functions": top_functions
+        }
+        with open(os.path.join(self.folder, profile_id + ".json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        self.prune()
+        logger.info("Request profile saved", extra={"profile_id": profile_id, "file": filename})
+        return summary
+
+    def _summary_paths(self):
+        if not os.path.isdir(self.folder):
+            return []
+        paths = [os.path.join(self.folder, name) for name in os.listdir(self.folder) if name.endswith(".json")]
+        # Id bắt đầu bằng timestamp nên sort theo tên là mới nhất trước
+        return sorted(paths, reverse=True)
+
+    def list(self, limit=50):
+        """Summaries of the most recent profiles, newest first"""
+        summaries = []
+        for path in self._summary_paths()[:limit]:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    summaries.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return summaries
+
+    def get(self, profile_id):
+        """Summary of one profile, or None"""
+        # Chỉ nhận id do finish() tạo ra, tránh path traversal
+        if not _PROFILE_ID.fullmatch(profile_id):
+            return None
+        try:
+            with open(os.path.join(self.folder, profile_id + ".json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def path(self, summary):
+        return os.path.join(self.folder, summary["file"])
+
+    def prune(self):
+        """Delete profiles beyond the newest keep"""
+        if not self.keep:
+            return
+        for path in self._summary_paths()[self.keep:]:
+            stem = os.path.splitext(path)[0]
+            for extension in (".json", *_EXTENSIONS.values()):
+                if os.path.exists(stem + extension):
+                    os.remove(stem + extension)
+
+_profiler = None
+_profiler_lock = threading.Lock()
+
+def get_request_profiler():
+    """Return the process-wide request profiler"""
+    global _profiler
+    with _profiler_lock:
+        if _profiler is None:
+            _profiler = RequestProfiler(
+                Config.PROFILE_DIR,
+                mode=Config.PROFILE_MODE,
+                interval=Config.PROFILE_INTERVAL,
+                keep=Config.PROFILE_KEEP
+            )
+        return _profiler
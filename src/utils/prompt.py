@@ -1,4 +1,11 @@
 # src/utils/prompt.py
+import hashlib
+
+
+def prompt_version(template):
+    """Short content hash of a prompt template, used to version cached LLM results"""
+    return hashlib.sha256(template.encode("utf-8")).hexdigest()[:12]
+
 
 # Prompts for Extractor
 EXTRACTOR_PROMPT = """
@@ -49,19 +56,8 @@ Your task is to analyze how well a candidate CV matches a job description (JD) b
 Below is the candidate CV (in JSON format) and the JD (free text format). Your goal is to:
 - Score each feature individually on a scale of 0–100
 - Justify each score briefly (1–2 sentences)
-- Calculate the final weighted matching score (0–100) based on the following weights:
-
-Scoring weights:
-- exp_years: 20%
-- prof_skill_advanced: 18%
-- soft_skill: 14%
-- education: 13%
-- prof_skill_basic: 10%
-- achievements: 8%
-- relevant_projects: 7%
-- certs: 5%
-- language: 4%
-- activities: 1%
+
+Do NOT compute an overall or weighted score; it is calculated separately from your feature scores.
 
 Scoring Guidelines:
 - exp_years: Compare candidate's years of experience with JD requirements
@@ -127,9 +123,86 @@ Scoring Guidelines:
     "score": 0,
     "justification": "Brief explanation here"
     }}
-}},
-"final_matching_score": 0.0
 }}
+}}
+"""
+
+# Lean matching: chỉ trả điểm số, không có justification, để giảm output tokens
+MATCHING_SCORES_PROMPT = """
+Score how well the candidate CV matches the job description on each feature, 0-100.
+exp_years: years of experience vs. JD requirement; prof_skill_advanced: advanced technical skills;
+soft_skill: communication, leadership, teamwork; education: degree level and field;
+prof_skill_basic: basic/fundamental skills; achievements: awards, notable accomplishments;
+relevant_projects: project relevance; certs: certifications; language: language requirements
+(100 if the JD mentions none); activities: extracurricular relevance.
+
+CV (JSON):
+{CV_JSON_HERE}
+
+JD:
+{JD_TEXT_HERE}
+
+Output ONLY compact JSON with integer scores, no explanations:
+{{"scores":{{"exp_years":0,"prof_skill_advanced":0,"soft_skill":0,"education":0,"prof_skill_basic":0,"achievements":0,"relevant_projects":0,"certs":0,"language":0,"activities":0}}}}
+"""
+
+# Justification cho các điểm số đã có (lean mode), chỉ gọi cho các cặp được shortlist
+MATCHING_JUSTIFY_PROMPT = """
+You are an AI Recruiter Assistant. A candidate CV was scored against a job description (JD) on 10 features (0-100).
+Justify each given score briefly (1-2 sentences) based on the CV and the JD. Do not change the scores.
+
+### 📄 CV (JSON format):
+{CV_JSON_HERE}
+
+### 📝 Job Description (JD):
+{JD_TEXT_HERE}
+
+### 🔢 Scores:
+{SCORES_HERE}
+
+### 🎯 Output ONLY valid JSON in this exact format:
+{{"justifications": {{"exp_years": "...", "prof_skill_advanced": "...", "soft_skill": "...", "education": "...", "prof_skill_basic": "...", "achievements": "...", "relevant_projects": "...", "certs": "...", "language": "...", "activities": "..."}}}}
+"""
+
+# Packed matching: một CV với nhiều JD trong cùng một call, CV chỉ gửi một lần
+MATCHING_PACKED_PROMPT = """
+You are an AI Recruiter Assistant. Score how well ONE candidate CV matches EACH of the job descriptions (JDs) below
+on 10 features, 0-100, and justify each score briefly (1 sentence). Score every JD independently.
+exp_years: years of experience vs. JD requirement; prof_skill_advanced: advanced technical skills;
+soft_skill: communication, leadership, teamwork; education: degree level and field;
+prof_skill_basic: basic/fundamental skills; achievements: awards, notable accomplishments;
+relevant_projects: project relevance; certs: certifications; language: language requirements
+(100 if the JD mentions none); activities: extracurricular relevance.
+Do NOT compute an overall or weighted score.
+
+### 📄 CV (JSON format):
+{CV_JSON_HERE}
+
+### 📝 Job Descriptions:
+{JDS_HERE}
+
+### 🎯 Output ONLY valid JSON with one entry per JD id ({JD_IDS_HERE}):
+{{"results": {{"JD_1": {{"scores": {{"exp_years": {{"score": 0, "justification": "..."}}, "prof_skill_advanced": {{"score": 0, "justification": "..."}}, "soft_skill": {{"score": 0, "justification": "..."}}, "education": {{"score": 0, "justification": "..."}}, "prof_skill_basic": {{"score": 0, "justification": "..."}}, "achievements": {{"score": 0, "justification": "..."}}, "relevant_projects": {{"score": 0, "justification": "..."}}, "certs": {{"score": 0, "justification": "..."}}, "language": {{"score": 0, "justification": "..."}}, "activities": {{"score": 0, "justification": "..."}}}}}}}}}}
+"""
+
+# Packed + lean: nhiều JD, chỉ trả điểm số
+MATCHING_PACKED_SCORES_PROMPT = """
+Score how well ONE candidate CV matches EACH of the job descriptions (JDs) below on each feature, 0-100.
+Score every JD independently.
+exp_years: years of experience vs. JD requirement; prof_skill_advanced: advanced technical skills;
+soft_skill: communication, leadership, teamwork; education: degree level and field;
+prof_skill_basic: basic/fundamental skills; achievements: awards, notable accomplishments;
+relevant_projects: project relevance; certs: certifications; language: language requirements
+(100 if the JD mentions none); activities: extracurricular relevance.
+
+CV (JSON):
+{CV_JSON_HERE}
+
+JDs:
+{JDS_HERE}
+
+Output ONLY compact JSON with integer scores and one entry per JD id ({JD_IDS_HERE}), no explanations:
+{{"results":{{"JD_1":{{"scores":{{"exp_years":0,"prof_skill_advanced":0,"soft_skill":0,"education":0,"prof_skill_basic":0,"achievements":0,"relevant_projects":0,"certs":0,"language":0,"activities":0}}}}}}}}
 """
 
 # Có thể bổ sung thêm các prompt khác nếu cần thiết
\ No newline at end of file
@@ -0,0 +1,109 @@
+import copy
+import asyncio
+import threading
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.task = None
+        self.waiters = 0
+        self.shared = None
+        self.error = None
+
+class SingleFlight:
+    """Run one call per key at a time and share its result with concurrent callers
+
+    Callers that arrive while a call with the same key is in flight wait for it
+    instead of starting their own. The first caller gets the result itself;
+    the others get their own deep copy, so every caller may modify what it
+    receives.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+
+    def _join(self, key):
+        """Return (call, leader) for key, registering a new call when none is in flight"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+                return call, True
+            call.waiters += 1
+            self.coalesced += 1
+            return call, False
+
+    def _finish(self, key, call, result=None, error=None):
+        with self._lock:
+            del self._calls[key]
+            waiters = call.waiters
+        # Snapshot trước khi leader trả kết quả về (và có thể sửa nó)
+        call.error = error
+        call.shared = copy.deepcopy(result) if waiters else None
+        call.done.set()
+
+    def do(self, key, func, *args):
+        """Call func(*args) unless another thread is already running it for key"""
+        call, leader = self._join(key)
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.shared)
+
+        try:
+            result = func(*args)
+        except Exception as e:
+            self._finish(key, call, error=e)
+            raise
+        self._finish(key, call, result)
+        return result
+
+    async def do_async(self, key, func, *args):
+        """Await func(*args) unless a task for key is already running in this event loop"""
+        # Future chỉ dùng được trong loop đã tạo ra nó
+        key = (id(asyncio.get_running_loop()), key)
+        call, leader = self._join(key)
+        if leader:
+            # Chạy trong task riêng: caller bị cancel không làm hỏng kết quả của những caller khác
+            call.task = asyncio.ensure_future(self._run_async(call, key, func, args))
+        result = await asyncio.shield(call.task)
+        return result if leader else copy.deepcopy(call.shared)
+
+    async def _run_async(self, call, key, func, args):
+        try:
+            result = await func(*args)
+        except BaseException as e:
+            self._finish(key, call, error=e)
+            raise
+        self._finish(key, call, result)
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls)
+            }
+
+_groups = {}
+_groups_lock = threading.Lock()
+
+def get_singleflight(name):
+    """Return the process-wide SingleFlight group for name"""
+    with _groups_lock:
+        if name not in _groups:
+            _groups[name] = SingleFlight(name)
+        return _groups[name]
+
+def singleflight_stats():
+    """Executed/coalesced counters of every group"""
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {group.name: group.stats() for group in groups}
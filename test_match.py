@@ -1,151 +1,128 @@
-from src.extractors.cv_extractor import CVExtractor
-from src.extractors.jd_loader import JDLoader
-from src.matching.matching_engine import MatchingCV
-from src.utils.file_handler import ensure_directory_exists
-import os
-import glob
+"""
+Bulk CV-JD matching CLI: extract every CV/JD in the input folders and score the cross product
+"""
+import argparse
+from config.settings import Config
+from src.pipeline.bulk_runner import BulkRunner, print_report
+from src.matching.rerank import rerank_results
+from src.matching.weights import load_weight_profiles, resolve_weight_profile
+from src.storage import FileResultsStore, get_results_store, copy_store
+from src.utils.log import configure_logging
 
-def get_cv_files(cv_folder_path):
-    """Get all PDF files in the CV folder"""
-    cv_files = glob.glob(os.path.join(cv_folder_path, "*.pdf"))
-    return [os.path.basename(cv_file) for cv_file in cv_files]
+def parse_args():
+    parser = argparse.ArgumentParser(description="Bulk CV-JD matching with a worker pool and resumable checkpoints")
+    parser.add_argument("--cv-dir", default="data/input/CV", help="Folder containing CV PDFs")
+    parser.add_argument("--jd-dir", default="data/input/JD", help="Folder containing JD TXT files")
+    parser.add_argument("--extracted-dir", default="data/output/extracted_info", help="Where extracted CV/JD info is written (files backend)")
+    parser.add_argument("--results-dir", default="data/output/matching_results", help="Where {cv}_{jd}.json results are written (files backend)")
+    parser.add_argument("--results-backend", choices=["sqlite", "files"], default=Config.RESULTS_BACKEND,
+                        help="Store extractions and results in the indexed SQLite store or as one file per item")
+    parser.add_argument("--export-results", action="store_true",
+                        help="Only export the SQLite results store to the legacy file layout in --extracted-dir/--results-dir")
+    parser.add_argument("--import-results", action="store_true",
+                        help="Only import the legacy files in --extracted-dir/--results-dir into the SQLite results store")
+    parser.add_argument("--workers", type=int, default=4, help="Number of concurrent workers (LLM calls in flight)")
+    parser.add_argument("--parse-workers", type=int, default=2, help="Number of PDF parsing workers")
+    parser.add_argument("--queue-size", type=int, default=None, help="Bound of the queues between pipeline stages (default: 2 x workers)")
+    parser.add_argument("--manifest", default=None, help="Checkpoint manifest path (default: data/output/bulk_manifest.jsonl)")
+    parser.add_argument("--prescore-threshold", type=float, default=None,
+                        help="Only send pairs whose local pre-score is at least this value (0-100) to the LLM")
+    parser.add_argument("--shortlist", type=int, default=None, metavar="K",
+                        help="Only send the K best indexed CVs of each JD to the LLM (top-K shortlist then rerank)")
+    parser.add_argument("--index", default=Config.SHORTLIST_INDEX_PATH, help="Shortlist index path")
+    parser.add_argument("--weight-profile", default=None, help="Weight profile for final scores (default: per-JD/tenant assignment)")
+    parser.add_argument("--lean", action="store_true",
+                        help="Scores-only matching: skip the per-feature justifications to cut output tokens")
+    parser.add_argument("--justify-top", type=int, default=0, metavar="K",
+                        help="After a lean run, add justifications to the K best CVs of each JD")
+    parser.add_argument("--pack-size", type=int, default=Config.MATCH_PACK_SIZE, metavar="N",
+                        help="Score each CV against up to N JDs per LLM call (0/1 = one pair per call)")
+    parser.add_argument("--rerank", action="store_true",
+                        help="Only re-apply the weight profile to the stored results (no API calls) and print the ranking")
+    parser.add_argument("--top", type=int, default=None, metavar="K",
+                        help="Only print the K best stored CVs of each JD (leaderboards, no API calls)")
+    parser.add_argument("--force", action="store_true", help="Ignore the manifest and redo all work")
+    args = parser.parse_args()
+    if args.weight_profile:
+        try:
+            resolve_weight_profile(args.weight_profile)
+        except ValueError as e:
+            parser.error(f"{e}. Available: {', '.join(load_weight_profiles()['profiles'])}")
+    return args
 
-def get_jd_files(jd_folder_path):
-    """Get all TXT files in the JD folder"""
-    jd_files = glob.glob(os.path.join(jd_folder_path, "*.txt"))
-    return [os.path.basename(jd_file) for jd_file in jd_files]
+def rerank(args):
+    """Re-weight every stored result in one vectorized pass"""
+    store = get_results_store(args.extracted_dir, args.results_dir, args.results_backend)
+    ranking = rerank_results(store, weight_profile=args.weight_profile)
+    store.flush()
+    print(f"Re-ranked {len(ranking)} results ({args.results_backend} store)")
+    print(f"{'JD Name':<20} {'CV Name':<15} {'Score':<8} {'Profile':<12} {'Result File'}")
+    print("-" * 80)
+    for item in ranking:
+        print(f"{item['jd_name']:<20} {item['cv_name']:<15} {item['score']:<8} {item['weight_profile']:<12} {item['result_file']}")
+
+def print_top(args):
+    """Print the leaderboard of every stored JD"""
+    store = get_results_store(args.extracted_dir, args.results_dir, args.results_backend)
+    for jd_id in store.result_jd_ids():
+        entries = store.top_for_jd(jd_id, args.top)
+        print(f"🏆 {entries[0]['jd_name'] if entries else jd_id} ({jd_id})")
+        for rank, entry in enumerate(entries, 1):
+            print(f"  {rank:>3}. {entry['cv_name']:<20} {entry['final_matching_score']}")
+
+def export_results(args, to_files):
+    """Copy between the SQLite results store and the legacy file layout"""
+    files = FileResultsStore(args.extracted_dir, args.results_dir)
+    database = get_results_store(backend="sqlite")
+    counts = copy_store(database, files) if to_files else copy_store(files, database)
+    target = f"{args.extracted_dir} and {args.results_dir}" if to_files else Config.RESULTS_DB_PATH
+    print(f"Copied {counts['extractions']} extractions, {counts['jds']} JDs and {counts['results']} results to {target}")
 
-def get_filename_without_extension(filepath):
-    """Get filename without extension"""
-    return os.path.splitext(os.path.basename(filepath))[0]
-  
 def main():
-    # Initialize components
-    cv_extractor = CVExtractor()
-    jd_loader = JDLoader()
-    matching_cv = MatchingCV()
-    
-    # Define folder paths
-    cv_folder = "data/input/CV"
-    jd_folder = "data/input/JD"
-    extracted_info_folder = "data/output/extracted_info"
-    matching_results_folder = "data/output/matching_results"
-    
-    # Ensure output directories exist
-    ensure_directory_exists(extracted_info_folder)
-    ensure_directory_exists(matching_results_folder)
-    
-    print("Starting CV-JD Matching Process...")
-    print("=" * 60)
-    
-    # Get all CV and JD files
-    cv_files = get_cv_files(cv_folder)
-    jd_files = get_jd_files(jd_folder)
-    
-    if not cv_files:
-        print("❌ No CV files found in the CV folder.")
+    args = parse_args()
+    configure_logging()
+    if args.rerank:
+        rerank(args)
+        return
+    if args.top:
+        print_top(args)
         return
-    
-    if not jd_files:
-        print("❌ No JD files found in the JD folder.")
+    if args.export_results or args.import_results:
+        export_results(args, to_files=args.export_results)
         return
-    
-    print(f"Found {len(cv_files)} CV files and {len(jd_files)} JD files")
-    print(f"CV files: {cv_files}")
-    print(f"JD files: {jd_files}")
+
+    print("Starting CV-JD Matching Process...")
     print("=" * 60)
-    
-    # Dictionary to store extracted information to avoid re-processing
-    extracted_cvs = {}
-    extracted_jds = {}
-    
-    # Process all CVs
-    print("\n1. Processing all CVs...")
-    for cv_file in cv_files:
-        cv_path = os.path.join(cv_folder, cv_file)
-        cv_name = get_filename_without_extension(cv_file)
-        extracted_cv_path = os.path.join(extracted_info_folder, f"extracted_{cv_name}.json")
-        
-        print(f"   Processing CV: {cv_file}...")
-        cv_info = cv_extractor.process_cv(cv_path)
-        if cv_info:
-            cv_extractor.save_extracted_info(cv_info, extracted_cv_path)
-            extracted_cvs[cv_name] = extracted_cv_path
-            print(f"   ✅ CV {cv_file} processed successfully")
-        else:
-            print(f"   ❌ Failed to extract CV {cv_file}")
-    
-    # Process all JDs
-    print("\n2. Processing all Job Descriptions...")
-    for jd_file in jd_files:
-        jd_path = os.path.join(jd_folder, jd_file)
-        jd_name = get_filename_without_extension(jd_file)
-        extracted_jd_path = os.path.join(extracted_info_folder, f"extracted_{jd_name}.txt")
-        
-        print(f"   Processing JD: {jd_file}...")
-        jd_info = jd_loader.load_pdf(jd_path)
-        if jd_info:
-            jd_loader.save_loaded_info(jd_info, extracted_jd_path)
-            extracted_jds[jd_name] = extracted_jd_path
-            print(f"   ✅ JD {jd_file} processed successfully")
-        else:
-            print(f"   ❌ Failed to extract JD {jd_file}")
-    
-    # Perform matching for each CV-JD pair
-    print("\n3. Calculating Matching Scores for all CV-JD pairs...")
-    total_pairs = len(extracted_cvs) * len(extracted_jds)
-    current_pair = 0
-    
-    matching_results_summary = []
-    
-    for cv_name, cv_json_path in extracted_cvs.items():
-        for jd_name, jd_text_path in extracted_jds.items():
-            current_pair += 1
-            print(f"   [{current_pair}/{total_pairs}] Matching {cv_name} with {jd_name}...")
-            
-            # Create result filename: CVname_JDname.json
-            result_filename = f"{cv_name}_{jd_name}.json"
-            matching_result_path = os.path.join(matching_results_folder, result_filename)
-            
-            matching_result = matching_cv.process_matching(
-                cv_json_path=cv_json_path,
-                jd_text_path=jd_text_path
-            )
-            
-            if matching_result:
-                # Add CV and JD names to the result for easier identification
-                matching_result['cv_name'] = cv_name
-                matching_result['jd_name'] = jd_name
-                matching_result['cv_file'] = f"{cv_name}.pdf"
-                matching_result['jd_file'] = f"{jd_name}.pdf"
-                
-                matching_cv.save_matching_result(matching_result, matching_result_path)
-                print(f"   ✅ Matching completed - Score: {matching_result.get('overall_score', 'N/A')}%")
-                
-                # Store summary for final display
-                matching_results_summary.append({
-                    'cv_name': cv_name,
-                    'jd_name': jd_name,
-                    'score': matching_result.get('overall_score', 'N/A'),
-                    'result_file': result_filename
-                })
-            else:
-                print(f"   ❌ Failed to calculate matching score for {cv_name} and {jd_name}")
-    
-    # Display final summary
-    print("\n" + "=" * 80)
-    print("MATCHING RESULTS SUMMARY")
-    print("=" * 80)
-    if matching_results_summary:
-        print(f"{'CV Name':<15} {'JD Name':<20} {'Score':<10} {'Result File'}")
-        print("-" * 80)
-        for result in matching_results_summary:
-            print(f"{result['cv_name']:<15} {result['jd_name']:<20} {result['score']:<10} {result['result_file']}")
-        
-        print(f"\n✅ Successfully processed {len(matching_results_summary)} CV-JD pairs")
-        print(f"📁 Results saved in: {matching_results_folder}")
+
+    runner = BulkRunner(
+        cv_folder=args.cv_dir,
+        jd_folder=args.jd_dir,
+        extracted_info_folder=args.extracted_dir,
+        matching_results_folder=args.results_dir,
+        workers=args.workers,
+        parse_workers=args.parse_workers,
+        queue_size=args.queue_size,
+        manifest_path=args.manifest,
+        force=args.force,
+        prescore_threshold=args.prescore_threshold,
+        shortlist_k=args.shortlist,
+        index_path=args.index,
+        weight_profile=args.weight_profile,
+        lean=args.lean,
+        justify_top=args.justify_top,
+        pack_size=args.pack_size,
+        store=get_results_store(args.extracted_dir, args.results_dir, args.results_backend)
+    )
+    try:
+        report = runner.run()
+    finally:
+        runner.close()
+
+    print_report(report)
+    if args.results_backend == "files":
+        print(f"📁 Results saved in: {args.results_dir}")
     else:
-        print("❌ No successful matches were completed")
+        print(f"📁 Results saved in: {Config.RESULTS_DB_PATH} (export with --export-results)")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,50 @@
+import os
+import sys
+import tempfile
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# config.settings đọc biến môi trường lúc import: đặt trước khi test nào import src
+_TEST_DIR = tempfile.mkdtemp(prefix="cvjd-tests-")
+os.environ.update({
+    "OPENAI_API_KEY": "test-key",
+    "OPENAI_BASE_URL": "http://127.0.0.1:9/v1",
+    "CACHE_DIR": os.path.join(_TEST_DIR, "cache"),
+    "RESULTS_DB_PATH": os.path.join(_TEST_DIR, "results.sqlite"),
+    "JOB_DB_PATH": os.path.join(_TEST_DIR, "jobs.sqlite"),
+    "LLM_BUDGET_SHARED": "false",
+    "LLM_CASSETTE_MODE": "off",
+    "API_WARMUP": "false",
+    "LOG_LEVEL": "WARNING"
+})
+
+from benchmarks.fake_openai import fake_content  # noqa: E402
+
+SAMPLE_CV = os.path.join(ROOT, "data", "input", "CV", "cv1.pdf")
+SAMPLE_JD = os.path.join(ROOT, "data", "input", "JD", "data_scientist.txt")
+
+class FakeGateway:
+    """Stand-in for LLMGateway answering every prompt with benchmarks/fake_openai.py content"""
+
+    model = "fake-model"
+
+    def __init__(self):
+        self.calls = 0
+
+    def complete(self, messages, max_tokens, temperature=0, model=None, purpose="default", **extra):
+        self.calls += 1
+        return fake_content(messages)
+
+    async def acomplete(self, messages, max_tokens, temperature=0, model=None, purpose="default", **extra):
+        return self.complete(messages, max_tokens, temperature, model, purpose, **extra)
+
+    async def astream(self, messages, max_tokens, temperature=0, model=None, purpose="default", **extra):
+        content = self.complete(messages, max_tokens, temperature, model, purpose, **extra)
+        for start in range(0, len(content), 16):
+            yield content[start:start + 16]
+
+@pytest.fixture
+def fake_gateway():
+    return FakeGateway()
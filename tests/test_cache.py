@@ -0,0 +1,49 @@
+from src.extractors import CVExtractor
+from src.matching.matching_engine import MatchingCV
+from src.utils import prompt
+from src.utils.cache import DiskCache
+
+CV_JSON = {"exp": "5 năm Python", "language": "IELTS 7.0"}
+
+def test_disk_cache_round_trip_and_eviction(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    cache.set("a", {"value": 1})
+    cache.set("b", {"value": 2})
+    cache.set("c", {"value": 3})
+    assert cache.get("c") == {"value": 3}
+    assert cache.stats()["entries"] == 2
+    assert cache.get("missing") is None
+
+def test_purge_tags_keeps_only_current_versions(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.sqlite"))
+    cache.set("old", 1, tag="v1")
+    cache.set("current", 2, tag="v2")
+    cache.set("untagged", 3)
+    assert cache.purge_tags("v2") == 2
+    assert cache.get("current") == 2
+    assert cache.get("old") is None and cache.get("untagged") is None
+
+def test_matching_cache_key_follows_content_and_prompt_version(fake_gateway, monkeypatch):
+    matching = MatchingCV(use_cache=False, gateway=fake_gateway)
+    key = matching.cache_key(CV_JSON, "Python   developer\n")
+    # Thứ tự key JSON và khoảng trắng của JD không đổi cache key
+    assert key == matching.cache_key(dict(reversed(list(CV_JSON.items()))), "Python developer")
+    assert key != matching.cache_key(CV_JSON, "Java developer")
+    assert key != matching.cache_key(CV_JSON, "Python developer", lean=True)
+    monkeypatch.setattr(prompt, "MATCHING_PROMPT", prompt.MATCHING_PROMPT + "\nBe strict.")
+    assert MatchingCV(use_cache=False, gateway=fake_gateway).cache_key(CV_JSON, "Python developer") != key
+
+def test_extraction_cache_key_follows_prompt_version(fake_gateway, monkeypatch):
+    key = CVExtractor(use_cache=False, gateway=fake_gateway).cache_key(b"%PDF-1.4")
+    monkeypatch.setattr(prompt, "EXTRACTOR_PROMPT", prompt.EXTRACTOR_PROMPT + "\nBe strict.")
+    assert CVExtractor(use_cache=False, gateway=fake_gateway).cache_key(b"%PDF-1.4") != key
+
+def test_invalidate_cache_drops_other_prompt_versions(tmp_path, fake_gateway):
+    extractor = CVExtractor(use_cache=False, gateway=fake_gateway)
+    extractor.cache = DiskCache(str(tmp_path / "extraction.sqlite"))
+    current = extractor.cache_key(b"%PDF-1.4")
+    extractor.store_extraction(current, CV_JSON)
+    extractor.cache.set("stale", CV_JSON, tag="0ld-version")
+    extractor.invalidate_cache()
+    assert extractor.cached_extraction(current) == CV_JSON
+    assert extractor.cache.get("stale") is None
@@ -0,0 +1,32 @@
+from types import SimpleNamespace
+from src.llm.gateway import LLMGateway
+from src.llm.scheduler import RateScheduler
+
+class _ServerError(Exception):
+    status_code = 503
+
+class _FlakyClient:
+    """Client giả: lỗi 5xx vài lần đầu rồi trả lời bình thường"""
+
+    def __init__(self, failures, total_tokens):
+        self.failures = failures
+        self.total_tokens = total_tokens
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **request):
+        if self.failures:
+            self.failures -= 1
+            raise _ServerError("upstream unavailable")
+        message = SimpleNamespace(content="ok")
+        usage = SimpleNamespace(prompt_tokens=self.total_tokens, completion_tokens=0, total_tokens=self.total_tokens)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+def test_failed_attempts_give_their_token_reservation_back():
+    scheduler = RateScheduler(tpm=100000)
+    gateway = LLMGateway(api_key="x", max_retries=3, scheduler=scheduler)
+    gateway.backoff_base = 0
+    gateway._sync_client = _FlakyClient(failures=2, total_tokens=10)
+
+    assert gateway.complete([{"role": "user", "content": "hi"}], max_tokens=20000) == "ok"
+    # Hai lần lỗi không được giữ lại 2 x 20000 token, chỉ tính usage thật của lần thành công
+    assert scheduler.tokens.level >= scheduler.tokens.capacity - 10
@@ -0,0 +1,67 @@
+import asyncio
+import socket
+import pytest
+from src.jobs import JobStore, JobQueue, check_webhook_url, QUEUED, RUNNING, SUCCEEDED
+from src.jobs import queue as job_queue
+
+def _fake_resolver(*answers):
+    """getaddrinfo trả lần lượt từng địa chỉ, giả lập DNS rebinding"""
+    answers = list(answers)
+    def getaddrinfo(host, port, *args, **kwargs):
+        address = answers.pop(0) if len(answers) > 1 else answers[0]
+        return [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", (address, port))]
+    return getaddrinfo
+
+def test_job_is_leased_to_one_worker(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    job = store.create("match", b"payload", {"jd": "data_scientist"})
+    assert store.start(job["id"], "worker-a")
+    assert not store.start(job["id"], "worker-b")
+    finished = store.finish(job["id"], "worker-a", result={"score": 70})
+    assert finished["status"] == SUCCEEDED and finished["result"] == {"score": 70}
+    assert store.payload(job["id"]) is None
+
+def test_expired_lease_is_requeued_and_the_old_worker_cannot_finish(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"), lease_seconds=-1)
+    job = store.create("match", b"payload", {})
+    store.start(job["id"], "dead-worker")
+    assert store.requeue_expired() == [job["id"]]
+    assert store.get(job["id"])["status"] == QUEUED
+    store.start(job["id"], "worker-b")
+    # Worker cũ đã mất lease: kết quả của nó bị bỏ qua
+    assert store.finish(job["id"], "dead-worker", result={"score": 1}) is None
+    assert store.get(job["id"])["status"] == RUNNING
+    assert store.get(job["id"])["attempts"] == 2
+
+def test_live_lease_is_renewed_and_kept(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"), lease_seconds=60)
+    job = store.create("match", b"payload", {})
+    store.start(job["id"], "worker-a")
+    assert store.renew_leases("worker-a") == 1
+    assert store.requeue_expired() == []
+    assert store.release("worker-a") == [job["id"]]
+    assert store.requeue_interrupted() == [job["id"]]
+
+def test_submit_before_start_raises_runtime_error(tmp_path):
+    jobs = JobQueue(JobStore(str(tmp_path / "jobs.sqlite")))
+    jobs.register("noop", lambda payload, params: None)
+    with pytest.raises(RuntimeError, match="before start"):
+        asyncio.run(jobs.submit("noop", b"", {}))
+
+@pytest.mark.parametrize("url", ["http://127.0.0.1/hook", "http://10.0.0.5/hook", "http://169.254.169.254/", "ftp://example.com/"])
+def test_webhook_url_rejects_internal_targets(url):
+    with pytest.raises(ValueError):
+        check_webhook_url(url, allowed_hosts=[])
+
+def test_webhook_connects_to_the_checked_address(monkeypatch):
+    # Lần phân giải đầu ra IP công khai, lần sau ra loopback: phải kết nối tới IP đã kiểm tra
+    monkeypatch.setattr(socket, "getaddrinfo", _fake_resolver("93.184.216.34", "127.0.0.1"))
+    monkeypatch.setattr(job_queue.Config, "JOB_WEBHOOK_ALLOWED_HOSTS", [])
+    connected = []
+    def create_connection(address, *args, **kwargs):
+        connected.append(address)
+        raise ConnectionRefusedError
+    monkeypatch.setattr(socket, "create_connection", create_connection)
+    with pytest.raises(ConnectionRefusedError):
+        job_queue._post_json("http://hooks.example.com:8080/done", {"ok": True}, timeout=1)
+    assert connected == [("93.184.216.34", 8080)]
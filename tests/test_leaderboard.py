@@ -0,0 +1,77 @@
+import asyncio
+import shutil
+from src.extractors import CVExtractor, JDLoader
+from src.matching.matching_engine import MatchingCV, AsyncMatchingCV
+from src.pipeline.bulk_runner import BulkRunner
+from src.storage import ResultsStore, FileResultsStore
+from conftest import SAMPLE_CV, SAMPLE_JD
+
+def _bulk_run(tmp_path, gateway, store):
+    cv_dir, jd_dir = tmp_path / "cv", tmp_path / "jd"
+    cv_dir.mkdir()
+    jd_dir.mkdir()
+    shutil.copy(SAMPLE_CV, cv_dir / "cv1.pdf")
+    shutil.copy(SAMPLE_JD, jd_dir / "data_scientist.txt")
+    runner = BulkRunner(
+        cv_folder=str(cv_dir),
+        jd_folder=str(jd_dir),
+        extracted_info_folder=str(tmp_path / "extracted_info"),
+        matching_results_folder=str(tmp_path / "matching_results"),
+        workers=1,
+        manifest_path=str(tmp_path / "bulk_manifest.jsonl"),
+        store=store,
+        cv_extractor=CVExtractor(use_cache=False, gateway=gateway),
+        jd_loader=JDLoader(),
+        matching_cv=MatchingCV(use_cache=False, gateway=gateway)
+    )
+    try:
+        report = runner.run()
+    finally:
+        runner.close()
+    return report
+
+def test_bulk_and_api_results_share_one_leaderboard(tmp_path, fake_gateway):
+    store = ResultsStore(str(tmp_path / "results.sqlite"))
+    report = _bulk_run(tmp_path, fake_gateway, store)
+    assert report["match"].get("done") == 1
+
+    jd_text = open(SAMPLE_JD, encoding="utf-8").read()
+    api = AsyncMatchingCV(use_cache=False, gateway=fake_gateway, leaderboard=store)
+    result = asyncio.run(api.calculate_matching_score(
+        {"exp": "5 years of Python", "prof_skill_advanced": ["Python"]}, jd_text, cv_name="CV", jd_name="data_scientist"
+    ))
+
+    bulk_summary = report["results"][0]
+    assert bulk_summary["jd_id"] == result["jd_id"]
+    entries = store.top_for_jd(result["jd_id"])
+    assert {entry["cv_name"] for entry in entries} == {"cv1", "CV"}
+    assert [entry["final_matching_score"] for entry in entries] == sorted(
+        (entry["final_matching_score"] for entry in entries), reverse=True
+    )
+    # Tên hiển thị cũng tra được id
+    assert store.resolve_id("jd", "data_scientist") == [result["jd_id"]]
+    assert store.resolve_id("cv", "CV") == [result["cv_id"]]
+    assert store.top_for_cv(result["cv_id"])[0]["jd_id"] == result["jd_id"]
+
+def test_same_file_name_different_content_gets_separate_rows(tmp_path, fake_gateway):
+    store = ResultsStore(str(tmp_path / "results.sqlite"), write_batch=1)
+    matching_cv = MatchingCV(use_cache=False, gateway=fake_gateway, leaderboard=store)
+    jd_text = open(SAMPLE_JD, encoding="utf-8").read()
+    first = matching_cv.calculate_matching_score({"exp": "Python"}, jd_text, cv_name="CV.pdf")
+    second = matching_cv.calculate_matching_score({"exp": "Java"}, jd_text, cv_name="CV.pdf")
+    assert first["cv_id"] != second["cv_id"]
+    assert len(store.top_for_jd(first["jd_id"])) == 2
+    assert sorted(store.resolve_id("cv", "CV.pdf")) == sorted([first["cv_id"], second["cv_id"]])
+
+def test_leaderboard_filters(tmp_path):
+    for store in (ResultsStore(str(tmp_path / "results.sqlite")), FileResultsStore(str(tmp_path / "ext"), str(tmp_path / "res"))):
+        for cv_id, score in (("cv_a", 90), ("cv_b", 60), ("cv_c", 75)):
+            store.save_result(cv_id, "jd_x", {
+                "cv_name": cv_id, "jd_name": "jd_x", "final_matching_score": score, "weight_profile": "default",
+                "scores": {"exp_years": {"score": score}, "certs": {"score": 100 - score}}
+            })
+        store.flush()
+        assert [entry["cv_id"] for entry in store.top_for_jd("jd_x", k=2)] == ["cv_a", "cv_c"]
+        assert [entry["cv_id"] for entry in store.top_for_jd("jd_x", min_scores={"certs": 25})] == ["cv_c", "cv_b"]
+        assert [entry["cv_id"] for entry in store.top_for_jd("jd_x", min_final=70)] == ["cv_a", "cv_c"]
+        assert store.top_for_cv("cv_b")[0]["final_matching_score"] == 60
@@ -0,0 +1,45 @@
+from src.llm.scheduler import RateScheduler, INTERACTIVE, BULK, current_lane, llm_lane
+
+def test_bulk_lane_leaves_the_interactive_reserve():
+    scheduler = RateScheduler(rpm=10, interactive_reserve=0.2)
+    for _ in range(8):
+        assert scheduler._try_acquire(0, BULK) == 0
+    # Bulk không được xuống dưới 20% capacity, interactive vẫn dùng được phần đó
+    assert scheduler._try_acquire(0, BULK) > 0
+    assert scheduler._try_acquire(0, INTERACTIVE) == 0
+    assert scheduler._try_acquire(0, INTERACTIVE) == 0
+
+def test_bulk_lane_yields_to_waiting_interactive_calls():
+    scheduler = RateScheduler(rpm=100)
+    scheduler._set_waiting(INTERACTIVE, 1)
+    assert scheduler._try_acquire(0, BULK) > 0
+    assert scheduler._try_acquire(0, INTERACTIVE) == 0
+    scheduler._set_waiting(INTERACTIVE, -1)
+    assert scheduler._try_acquire(0, BULK) == 0
+
+def test_pause_blocks_every_lane():
+    scheduler = RateScheduler(rpm=100)
+    scheduler.pause(30)
+    assert scheduler._try_acquire(0, INTERACTIVE) > 0
+    assert scheduler._try_acquire(0, BULK) > 0
+    assert scheduler.stats()["rate_limited"] == 1
+
+def test_settle_corrects_the_token_estimate():
+    scheduler = RateScheduler(tpm=60000)
+    scheduler.acquire(10000, lane=INTERACTIVE)
+    scheduler.settle(10000, 2000)
+    assert scheduler.tokens.level >= 58000
+
+def test_shared_budget_is_seen_by_every_process(tmp_path):
+    path = str(tmp_path / "llm_budget.sqlite")
+    first = RateScheduler(rpm=10, interactive_reserve=0.0, shared_path=path, key="k")
+    second = RateScheduler(rpm=10, interactive_reserve=0.0, shared_path=path, key="k")
+    for _ in range(10):
+        first.acquire(0, lane=INTERACTIVE)
+    assert second._try_acquire(0, INTERACTIVE) > 0
+
+def test_llm_lane_sets_the_current_lane():
+    assert current_lane() == INTERACTIVE
+    with llm_lane(BULK):
+        assert current_lane() == BULK
+    assert current_lane() == INTERACTIVE
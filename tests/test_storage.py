@@ -0,0 +1,94 @@
+import json
+import sqlite3
+import pytest
+from src.extractors import CVExtractor
+from src.extractors.jd_loader import JDLoader
+from src.matching.matching_engine import MatchingCV
+from src.storage import ResultsStore, FileResultsStore
+
+RESULT = {
+    "cv_name": "cv1", "jd_name": "data_scientist", "final_matching_score": 72.5,
+    "scores": {"exp_years": {"score": 80, "justification": "5 năm"}}
+}
+
+@pytest.fixture(params=["sqlite", "files"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        store = ResultsStore(str(tmp_path / "results.sqlite"), write_batch=50)
+    else:
+        store = FileResultsStore(str(tmp_path / "extracted_info"), str(tmp_path / "matching_results"))
+    yield store
+    store.close()
+
+class _LockedConnection:
+    """Connection giả: BEGIN luôn lỗi như khi database đang bị process khác khóa"""
+
+    in_transaction = False
+
+    def execute(self, sql, *args):
+        raise sqlite3.OperationalError("database is locked")
+
+def test_store_round_trip(store):
+    store.save_extraction("cv1", {"exp": "5 năm"})
+    store.save_jd("data_scientist", "Python, SQL")
+    store.save_result("cv1", "data_scientist", RESULT)
+    assert store.get_extraction("cv1") == {"exp": "5 năm"}
+    assert store.get_jd("data_scientist") == "Python, SQL"
+    assert store.get_result("cv1", "data_scientist") == RESULT
+    assert store.has_result("cv1", "data_scientist")
+    assert not store.has_result("cv1", "backend_dev")
+
+def test_reads_see_buffered_writes(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.sqlite"), write_batch=100)
+    store.save_result("cv1", "data_scientist", RESULT)
+    # Chưa đủ batch nên chưa ghi, nhưng đọc phải flush trước
+    assert store._pending["results"]
+    assert store.get_result("cv1", "data_scientist") == RESULT
+    assert not store._pending["results"]
+
+def test_flush_keeps_records_when_the_database_is_locked(tmp_path, monkeypatch):
+    store = ResultsStore(str(tmp_path / "results.sqlite"))
+    store.save_result("cv1", "data_scientist", RESULT)
+    connect = store._connect
+    monkeypatch.setattr(store, "_connect", lambda: _LockedConnection())
+    store.flush()
+    assert len(store._pending["results"]) == 1
+    monkeypatch.setattr(store, "_connect", connect)
+    assert store.get_result("cv1", "data_scientist") == RESULT
+
+def test_save_helpers_need_a_target(fake_gateway):
+    with pytest.raises(ValueError):
+        CVExtractor(use_cache=False, gateway=fake_gateway).save_extracted_info({"exp": "5 năm"})
+    with pytest.raises(ValueError):
+        JDLoader().save_loaded_info("Python, SQL")
+    with pytest.raises(ValueError):
+        MatchingCV(use_cache=False, gateway=fake_gateway).save_matching_result(RESULT)
+
+def test_save_helpers_honour_output_path(tmp_path, fake_gateway):
+    cv_path = tmp_path / "out" / "my_cv.json"
+    jd_path = tmp_path / "out" / "my_jd.txt"
+    result_path = tmp_path / "out" / "my_result.json"
+    CVExtractor(use_cache=False, gateway=fake_gateway).save_extracted_info({"exp": "5 năm"}, str(cv_path))
+    JDLoader().save_loaded_info("Python, SQL", str(jd_path))
+    MatchingCV(use_cache=False, gateway=fake_gateway).save_matching_result(RESULT, str(result_path))
+    assert json.loads(cv_path.read_text(encoding="utf-8")) == {"exp": "5 năm"}
+    assert jd_path.read_text(encoding="utf-8") == "Python, SQL"
+    assert json.loads(result_path.read_text(encoding="utf-8")) == RESULT
+
+def test_save_helpers_key_store_records(store, fake_gateway):
+    CVExtractor(use_cache=False, gateway=fake_gateway).save_extracted_info(
+        {"exp": "5 năm"}, "data/extracted_info/extracted_cv1.json", store=store
+    )
+    JDLoader().save_loaded_info("Python, SQL", store=store, jd_id="data_scientist")
+    matching = MatchingCV(use_cache=False, gateway=fake_gateway)
+    # Kết quả không có cv_id/jd_id: dùng cv_name/jd_name
+    matching.save_matching_result(RESULT, store=store)
+    unnamed = {key: value for key, value in RESULT.items() if key not in ("cv_name", "jd_name")}
+    # Không có cả tên: lấy id từ tên file {cv}_{jd}.json
+    matching.save_matching_result(unnamed, "out/cv2_backend.json", store=store)
+    assert store.get_extraction("cv1") == {"exp": "5 năm"}
+    assert store.get_jd("data_scientist") == "Python, SQL"
+    assert store.get_result("cv1", "data_scientist") == RESULT
+    assert store.get_result("cv2", "backend") == unnamed
+    with pytest.raises(ValueError):
+        matching.save_matching_result(unnamed, store=store)
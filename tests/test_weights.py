@@ -0,0 +1,48 @@
+import json
+import shutil
+import pytest
+from config.settings import Config
+from src.extractors import CVExtractor
+from src.matching.matching_engine import MatchingCV
+from src.matching.weights import resolve_weight_profile, compute_final_score
+from src.pipeline.bulk_runner import BulkRunner
+from src.storage import ResultsStore
+from conftest import SAMPLE_CV, SAMPLE_JD
+
+def _runner(tmp_path, gateway, **options):
+    cv_dir, jd_dir = tmp_path / "cv", tmp_path / "jd"
+    cv_dir.mkdir(exist_ok=True)
+    jd_dir.mkdir(exist_ok=True)
+    shutil.copy(SAMPLE_CV, cv_dir / "cv1.pdf")
+    shutil.copy(SAMPLE_JD, jd_dir / "data_scientist.txt")
+    return BulkRunner(
+        str(cv_dir), str(jd_dir), str(tmp_path / "extracted_info"), str(tmp_path / "matching_results"),
+        workers=1, manifest_path=str(tmp_path / "bulk_manifest.jsonl"), store=ResultsStore(str(tmp_path / "results.sqlite")),
+        cv_extractor=CVExtractor(use_cache=False, gateway=gateway), matching_cv=MatchingCV(use_cache=False, gateway=gateway),
+        **options
+    )
+
+def test_unknown_weight_profile_fails_before_any_llm_call(tmp_path, fake_gateway):
+    with pytest.raises(ValueError, match="Unknown weight profile"):
+        _runner(tmp_path, fake_gateway, weight_profile="tehcnical")
+    assert fake_gateway.calls == 0
+
+def test_jd_assigned_to_unknown_profile_is_not_scored(tmp_path, fake_gateway, monkeypatch):
+    profiles = tmp_path / "weight_profiles.json"
+    profiles.write_text(json.dumps({"profiles": {}, "jds": {"data_scientist": "missing"}}))
+    monkeypatch.setattr(Config, "WEIGHT_PROFILES_PATH", str(profiles))
+    runner = _runner(tmp_path, fake_gateway)
+    try:
+        report = runner.run()
+    finally:
+        runner.close()
+    assert report["jd"].get("failed") == 1
+    assert not report["match"].get("done")
+    # Chỉ còn call extract CV, không có call chấm điểm nào
+    assert fake_gateway.calls == 1
+
+def test_final_score_is_the_weighted_sum():
+    name, weights = resolve_weight_profile({"exp_years": 3, "certs": 1})
+    assert name == "custom"
+    scores = {"exp_years": {"score": 80}, "certs": {"score": 40}}
+    assert compute_final_score(scores, weights) == 70.0